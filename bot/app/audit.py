@@ -0,0 +1,141 @@
+# app/audit.py
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from loguru import logger
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .db import SessionLocal
+from .models import AnswerRevision, Question, Response
+
+
+# Журнал значений ответов (answer_revisions). В answers хранится только
+# последнее значение (upsert), а каждое записанное значение уходит сюда —
+# но не в транзакции ответа: repo.add_answers_batch отдаёт строки в
+# revision_log.record() без ожидания, фоновая задача пишет их пачкой раз в
+# AUDIT_FLUSH_SEC или по накоплении AUDIT_BATCH_SIZE строк. Пока журнал не
+# запущен (скрипты, тесты), repo пишет строки сам в той же транзакции.
+# Анкету или вопрос могут удалить раньше, чем до их строк дойдёт очередь:
+# тогда пачка падает на внешнем ключе, и повторно пишутся только строки,
+# чьи response и question ещё существуют.
+
+
+class RevisionLog:
+    def __init__(self, session_factory=SessionLocal, batch_size: Optional[int] = None,
+                 flush_sec: Optional[float] = None, max_pending: Optional[int] = None) -> None:
+        self._session_factory = session_factory
+        self.batch_size = batch_size or settings.AUDIT_BATCH_SIZE
+        self.flush_sec = flush_sec if flush_sec is not None else settings.AUDIT_FLUSH_SEC
+        self._pending: Deque[Dict[str, Any]] = deque(maxlen=max_pending or settings.AUDIT_MAX_PENDING)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        # метрики
+        self.written = 0
+        self.dropped = 0
+        self.orphaned = 0
+        self.failed_batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def record(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """Поставить строки (response_id, question_id, value, recorded_at) в очередь записи."""
+        overflow = len(self._pending) + len(rows) - (self._pending.maxlen or 0)
+        if overflow > 0:
+            self.dropped += overflow
+        self._pending.extend(rows)
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Записать всё накопленное; вернуть число записанных строк."""
+        total = 0
+        while self._pending:
+            batch: List[Dict[str, Any]] = [
+                self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))
+            ]
+            try:
+                written = await self._write(batch)
+            except Exception as e:  # noqa: BLE001 — журнал не должен останавливать бота
+                self.failed_batches += 1
+                logger.warning("Answer revisions batch of {} lost: {}", len(batch), e)
+                continue
+            total += written
+            self.written += written
+        return total
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> int:
+        async with self._session_factory() as db:
+            try:
+                await db.execute(insert(AnswerRevision), batch)
+            except IntegrityError:
+                await db.rollback()
+                alive = await _without_orphans(db, batch)
+                self.orphaned += len(batch) - len(alive)
+                logger.warning("Answer revisions of deleted responses/questions skipped: {}",
+                               len(batch) - len(alive))
+                batch = alive
+                if batch:
+                    await db.execute(insert(AnswerRevision), batch)
+            await db.commit()
+        return len(batch)
+
+    async def _loop(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_sec)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._loop(), name="revision-log")
+
+    async def stop(self) -> None:
+        """Остановить задачу и дописать очередь."""
+        if self._task is not None:
+            # не cancel: пачка, уже взятая из очереди, должна дописаться
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+        if self.dropped:
+            logger.warning("Answer revisions dropped on overflow: {}", self.dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped,
+            "orphaned": self.orphaned,
+            "failed_batches": self.failed_batches,
+        }
+
+
+async def _without_orphans(db: AsyncSession, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Строки пачки, у которых response и question ещё есть в базе."""
+    responses = set((await db.execute(
+        select(Response.id).where(Response.id.in_({r["response_id"] for r in batch}))
+    )).scalars())
+    questions = set((await db.execute(
+        select(Question.id).where(Question.id.in_({r["question_id"] for r in batch}))
+    )).scalars())
+    return [r for r in batch if r["response_id"] in responses and r["question_id"] in questions]
+
+
+revision_log = RevisionLog()
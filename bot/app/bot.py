@@ -1,21 +1,37 @@
 from __future__ import annotations
 
 import asyncio
+import io
+from functools import partial
+from tempfile import SpooledTemporaryFile
+from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from telegram import Update
+from telegram import Document, InlineQueryResultsButton, InputFile, Message, Update
+from telegram.constants import ChatType
 from telegram.ext import (
     Application,
+    CallbackQueryHandler,
     CommandHandler,
     ContextTypes,
+    InlineQueryHandler,
     MessageHandler,
     filters,
 )
+from telegram.request import BaseRequest
 
 from .config import settings
 from .db import SessionLocal
-from . import repo
-from .utils import parse_meeting_form, require_login, require_role
+from .cache import identity_cache
+from .models import User
+from .security import login_limiter
+from . import (
+    audit, broadcast, catalog, export, fsm, importer, ingest, lookup, maintenance, metrics, provisioning, questionnaire, repo,
+    results, scheduler, search, webhook,
+)
+from .localapi import LocalTelegramRequest
+from .updates import ChatOrderedUpdateProcessor, make_processor
+from .utils import parse_meeting_form, parse_when, require_login, require_role, resolve_user
 
 
 # ---------------------------- auth -----------------------------
@@ -27,31 +43,32 @@ async def login_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
     username, password = context.args[0], context.args[1]
 
+    tid = update.effective_user.id
+    if not login_limiter.allow(tid):
+        wait = int(login_limiter.retry_after(tid)) + 1
+        await update.message.reply_text(f"⏳ Слишком много попыток входа. Повторите через {wait} с.")
+        return
+
     async with SessionLocal() as db:
         user = await repo.authenticate_user(db, username, password)
         if not user:
             await update.message.reply_text("❌ Неверный логин или пароль")
             return
 
+        login_limiter.reset(tid)
         await repo.set_active_session(db, update.effective_user.id, user.id)
         await update.message.reply_text(f"✅ Успешный вход. Ваша роль: {user.role.name}")
 
 
 @require_login
-async def logout_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    async with SessionLocal() as db:
-        await repo.logout(db, update.effective_user.id)
+async def logout_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    await repo.logout(db, update.effective_user.id)
     await update.message.reply_text("ℹ️ Вы вышли из системы")
 
 
 @require_login
-async def whoami_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    async with SessionLocal() as db:
-        user = await repo.get_active_user(db, update.effective_user.id)
-        if user:
-            await update.message.reply_text(f"👤 Вы вошли как {user.username}, роль: {user.role.name}")
-        else:
-            await update.message.reply_text("⚠️ Вы не вошли в систему")
+async def whoami_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    await update.message.reply_text(f"👤 Вы вошли как {user.username}, роль: {user.role.name}")
 
 
 # ---------------------------- user commands -----------------------------
@@ -62,30 +79,99 @@ async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 
 @require_login
-async def my_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    async with SessionLocal() as db:
-        user = await repo.get_active_user(db, update.effective_user.id)
-        if user:
-            await update.message.reply_text(f"👤 {user.username}, роль: {user.role.name}")
-        else:
-            await update.message.reply_text("⚠️ Вы не авторизованы.")
+async def my_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    await update.message.reply_text(f"👤 {user.username}, роль: {user.role.name}")
 
 
 # ---------------------------- meetings -----------------------------
 
 @require_login
-async def meetings_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def meetings_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """
+    Список встреч постранично: /meetings [open] [status=…] [dept=…] [country=…]
+    Листание — кнопками под сообщением.
+    """
+    try:
+        flt = catalog.MeetingFilter.parse(context.args or [])
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    page = await catalog.get_page(db, flt)
+    await update.message.reply_text(page.text, reply_markup=page.markup)
+
+
+async def meetings_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    parsed = catalog.parse_callback(query.data)
+    flt = catalog.resolve_filter(parsed[0]) if parsed else None
+    if flt is None:
+        await query.answer("Список устарел, повторите /meetings.")
+        return
     async with SessionLocal() as db:
-        meetings = await repo.list_meetings(db)
-        if not meetings:
-            await update.message.reply_text("Встреч нет.")
+        if not await resolve_user(db, update.effective_user.id):
+            await query.answer("Вы не авторизованы. Используйте /login.", show_alert=True)
             return
-        text = "\n".join(f"{m.id}: {m.title} [{m.status}]" for m in meetings)
-        await update.message.reply_text(f"📅 Встречи:\n{text}")
+        page = await catalog.get_page(db, flt, parsed[1], parsed[2])
+    await query.answer()
+    await query.edit_message_text(page.text, reply_markup=page.markup)
+
 
+# ---------------------------- search -----------------------------
 
 @require_role("Модератор")
-async def newmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def search_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """
+    Полнотекстовый поиск по встречам, вопросам и ответам: /search <слова>
+    Слова ищутся по началу («улучш» найдёт «улучшить»), листание — кнопками.
+    """
+    query = " ".join(context.args or [])
+    try:
+        page = await search.get_page(db, query)
+    except ValueError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    await update.message.reply_text(page.text, reply_markup=page.markup, parse_mode="HTML")
+
+
+async def search_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    parsed = search.parse_callback(query.data)
+    text = search.resolve_query(parsed[0]) if parsed else None
+    if text is None:
+        await query.answer("Результаты устарели, повторите /search.")
+        return
+    async with SessionLocal() as db:
+        user = await resolve_user(db, update.effective_user.id)
+        role = user.role.name if user and user.role else ""
+        if role not in ("Администратор", "Модератор"):
+            await query.answer("⛔ Недостаточно прав.", show_alert=True)
+            return
+        try:
+            page = await search.get_page(db, text, parsed[1])
+        except ValueError as e:
+            await query.answer(f"❌ {e}", show_alert=True)
+            return
+    await query.answer()
+    await query.edit_message_text(page.text, reply_markup=page.markup, parse_mode="HTML")
+
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    @bot <часть названия, отдела или страны> — выбор встречи в любом чате.
+    Ответы личные (is_personal): неавторизованным вместо списка — кнопка входа.
+    """
+    query = update.inline_query
+    async with SessionLocal() as db:
+        if not await resolve_user(db, update.effective_user.id):
+            await query.answer([], cache_time=0, is_personal=True,
+                               button=InlineQueryResultsButton("Войдите через /login", start_parameter="login"))
+            return
+        results = await lookup.inline_results(db, query.query)
+    await query.answer(results, cache_time=settings.INLINE_CACHE_TIME, is_personal=True)
+
+
+@require_role("Модератор")
+async def newmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
     """
     Создание новой встречи.
     Формат: /newmeeting Title | Desc | Dept | Country | Deadline
@@ -103,25 +189,18 @@ async def newmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text(f"❌ Ошибка: {e}")
         return
 
-    async with SessionLocal() as db:
-        # получаем текущего пользователя
-        user = await repo.get_active_user(db, update.effective_user.id)
-        if not user:
-            await update.message.reply_text("⚠️ Вы не авторизованы.")
-            return
-
-        # создаём встречу с указанием автора
-        meeting = await repo.create_meeting(
-            db=db,
-            title=title,
-            description=description,
-            department=department,
-            country=country,
-            deadline_at=deadline_at,
-            created_by=user.id  # ← добавлено
-        )
+    # создаём встречу с указанием автора (пользователь уже получен декоратором)
+    meeting = await repo.create_meeting(
+        db=db,
+        title=title,
+        description=description,
+        department=department,
+        country=country,
+        deadline_at=deadline_at,
+        created_by=user.id
+    )
 
-        await update.message.reply_text(f"✅ Встреча '{meeting.title}' создана (id={meeting.id})")
+    await update.message.reply_text(f"✅ Встреча '{meeting.title}' создана (id={meeting.id})")
 
 
 @require_role("Модератор")
@@ -139,15 +218,82 @@ async def addquestion_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             await update.message.reply_text("❌ Встреча не найдена.")
 
 
+async def _attached_document(msg: Message, command: str, what: str) -> Optional[Document]:
+    """Файл из сообщения с подписью-командой или из сообщения, на которое ответили командой."""
+    doc = msg.document or (msg.reply_to_message.document if msg.reply_to_message else None)
+    if doc is None:
+        await msg.reply_text(f"Использование: пришлите {what} с подписью {command} "
+                             f"или ответьте {command} на сообщение с файлом")
+        return None
+    if doc.file_size and doc.file_size > settings.IMPORT_MAX_BYTES:
+        await msg.reply_text(f"❌ Файл больше {settings.IMPORT_MAX_BYTES // (1024 * 1024)} МБ")
+        return None
+    return doc
+
+
 @require_role("Модератор")
-async def openmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def importmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """
+    Импорт встреч с анкетами из JSON/CSV (формат — в app/importer.py): файл
+    с подписью /importmeeting или ответ этой командой на сообщение с файлом.
+    """
+    msg = update.message
+    doc = await _attached_document(msg, "/importmeeting", "JSON/CSV-файл")
+    if doc is None:
+        return
+    data = bytes(await (await doc.get_file()).download_as_bytearray())
+    try:
+        items = importer.parse(data, doc.file_name or "")
+    except importer.QuestionnaireError as e:
+        await msg.reply_text(f"❌ Файл не импортирован:\n{str(e)[:3500]}")
+        return
+    ids = await importer.import_questionnaires(db, items, created_by=user.id)
+    await msg.reply_text(
+        f"📥 Импортировано встреч: {len(ids)} (id: {', '.join(map(str, ids))}), "
+        f"вопросов: {sum(len(m.questions) for m in items)}. Встречи — черновики, открыть: /openmeeting <id>"
+    )
+
+
+@require_role("Модератор")
+async def openmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
     if not context.args:
         await update.message.reply_text("Использование: /openmeeting <id>")
         return
     meeting_id = int(context.args[0])
-    async with SessionLocal() as db:
-        ok = await repo.set_meeting_status(db, meeting_id, "open")
-        await update.message.reply_text("✅ Открыта" if ok else "❌ Не найдена")
+    # объявление — только при фактическом открытии: повторный /openmeeting не рассылает его снова
+    if not await repo.transition_meeting(db, meeting_id, ("draft", "scheduled"), "open"):
+        row = await repo.get_meeting_schedule(db, meeting_id)
+        if row is None:
+            await update.message.reply_text("❌ Не найдена")
+        elif row.status.value == "open":
+            await update.message.reply_text("ℹ️ Встреча уже открыта, объявление повторно не отправлено")
+        else:
+            await update.message.reply_text("⛔ Встреча закрыта и заново не открывается")
+        return
+    b = await broadcast.announce_meeting(db, meeting_id)
+    await update.message.reply_text(f"✅ Открыта, объявление поставлено в рассылку #{b.id} ({b.total} получателей)")
+
+
+@require_role("Модератор")
+async def nudge_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """Напомнить о встрече всем, у кого по ней ещё нет анкеты: /nudge <id>."""
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("Использование: /nudge <id>")
+        return
+    b = await broadcast.nudge_meeting(db, int(context.args[0]))
+    if b is None:
+        await update.message.reply_text("❌ Не найдена")
+        return
+    await update.message.reply_text(f"📨 Напоминание поставлено в рассылку #{b.id} ({b.total} получателей)")
+
+
+@require_role("Администратор")
+async def broadcasts_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """Последние рассылки: прогресс и скорость отправки."""
+    items = []
+    for b in await repo.list_broadcasts(db):
+        items.append(broadcast.format_progress(await broadcast.progress(db, b.id)))
+    await update.message.reply_text("📨 Рассылки:\n" + "\n".join(items) if items else "Рассылок не было.")
 
 
 @require_role("Модератор")
@@ -161,6 +307,44 @@ async def closemeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await update.message.reply_text("✅ Закрыта" if ok else "❌ Не найдена")
 
 
+async def _schedule_args(update: Update, context: ContextTypes.DEFAULT_TYPE, usage: str):
+    if len(context.args) < 2 or not context.args[0].isdigit():
+        await update.message.reply_text(usage)
+        return None
+    try:
+        return int(context.args[0]), parse_when(" ".join(context.args[1:]))
+    except ValueError as e:
+        await update.message.reply_text(str(e))
+        return None
+
+
+@require_role("Модератор")
+async def schedule_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """Открыть встречу автоматически: /schedule <id> <YYYY-MM-DD[ HH:MM]> (UTC)."""
+    args = await _schedule_args(update, context, "Использование: /schedule <id> <YYYY-MM-DD[ HH:MM]>")
+    if args is None:
+        return
+    meeting_id, opens_at = args
+    ok = await repo.set_meeting_schedule(db, meeting_id, opens_at=opens_at)
+    await update.message.reply_text(
+        f"🗓 Встреча откроется {opens_at:%Y-%m-%d %H:%M} UTC" if ok
+        else "❌ Встреча не найдена или уже открыта/закрыта: по расписанию открываются только черновики"
+    )
+
+
+@require_role("Модератор")
+async def deadline_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """Дедлайн, после которого встреча закроется сама: /deadline <id> <YYYY-MM-DD[ HH:MM]> (UTC)."""
+    args = await _schedule_args(update, context, "Использование: /deadline <id> <YYYY-MM-DD[ HH:MM]>")
+    if args is None:
+        return
+    meeting_id, deadline_at = args
+    ok = await repo.set_meeting_schedule(db, meeting_id, deadline_at=deadline_at)
+    await update.message.reply_text(
+        f"⏳ Встреча закроется {deadline_at:%Y-%m-%d %H:%M} UTC" if ok else "❌ Не найдена"
+    )
+
+
 @require_role("Администратор")
 async def delmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not context.args:
@@ -172,15 +356,42 @@ async def delmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("🗑 Удалена" if ok else "❌ Не найдена")
 
 
+@require_role("Модератор")
+async def results_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """Сводка ответов встречи: распределения, числовые сводки, доля ответивших."""
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("Использование: /results <meeting_id>")
+        return
+    res = await results.get_results(db, int(context.args[0]))
+    if res is None:
+        await update.message.reply_text("❌ Встреча не найдена")
+        return
+    for text in results.render(res):
+        await update.message.reply_text(text)
+
+
 @require_role("Администратор")
-async def exportmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def exportmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """
+    CSV-выгрузка ответов встречи: строка на участника, колонка на вопрос.
+    /exportmeeting <id> gz — то же, сжатое gzip.
+    """
     if not context.args:
-        await update.message.reply_text("Использование: /exportmeeting <id>")
+        await update.message.reply_text("Использование: /exportmeeting <id> [gz]")
         return
     meeting_id = int(context.args[0])
-    async with SessionLocal() as db:
-        # здесь должна быть логика экспорта в CSV
-        await update.message.reply_text(f"📤 Экспорт встречи {meeting_id} (заглушка)")
+    compress = len(context.args) > 1 and context.args[1].lower() in ("gz", "gzip")
+    result = await export.export_meeting(db, meeting_id, compress=compress)
+    if result is None:
+        await update.message.reply_text("❌ Встреча не найдена")
+        return
+    fp, filename = result
+    with fp:
+        # файл отдаётся потоком; у SpooledTemporaryFile в памяти нет имени, его берём из filename
+        await update.message.reply_document(
+            document=InputFile(fp, filename=filename, read_file_handle=False),
+            caption=f"📤 Экспорт встречи {meeting_id} в CSV"
+        )
 
 
 # ---------------------------- roles -----------------------------
@@ -189,6 +400,11 @@ async def exportmeeting_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE)
 # ---------------------------- misc -----------------------------
 
 async def text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # текст во время /fill — ответ на текущий вопрос анкеты
+    st = await fsm.get_state(update.effective_chat.id) if _private_chat(update) else None
+    if st is not None:
+        await fill_text(update, st)
+        return
     await update.message.reply_text("Неизвестная команда. Используйте /help.")
 
 # команды управления ролями
@@ -240,15 +456,85 @@ async def setrole_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     username = context.args[0]
     role_id = int(context.args[1])
     async with SessionLocal() as db:
-        u = await repo.get_user_by_username(db, username)
-        if not u:
+        ok = await repo.set_user_role(db, username, role_id)
+        if not ok:
             await update.message.reply_text("❌ Пользователь не найден")
             return
-        u.role_id = role_id
-        await db.commit()
         await update.message.reply_text(f"✅ Пользователь {username} теперь имеет роль {role_id}")
 
 
+@require_role("Администратор")
+async def provisionusers_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Массовое создание пользователей из CSV (username, fio, email, role[, password]),
+    формат — в app/provisioning.py. Сгенерированные пароли возвращаются файлом.
+    """
+    msg = update.message
+    doc = await _attached_document(msg, "/provisionusers", "CSV-файл")
+    if doc is None:
+        return
+    src = SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_BYTES, mode="w+b")
+    creds = SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_BYTES, mode="w+b")
+    with src, creds:
+        await (await doc.get_file()).download_to_memory(out=src)
+        src.seek(0)
+        lines = io.TextIOWrapper(src, encoding="utf-8-sig", newline="")
+        out = io.TextIOWrapper(creds, encoding="utf-8", newline="")
+        try:
+            report = await provisioning.provision_users(lines, credentials=out)
+        except (ValueError, UnicodeDecodeError) as e:
+            await msg.reply_text(f"❌ Файл не обработан: {e}")
+            return
+        finally:
+            lines.detach()
+            out.flush()
+            out.detach()
+
+        text = (f"👥 Создано пользователей: {report.created}, уже существовали или повторялись: "
+                f"{report.conflicts}, ошибок в строках: {report.errors}")
+        if report.problems:
+            text += "\n" + "\n".join(report.problems)[:3500]
+        await msg.reply_text(text)
+        if report.generated:
+            creds.seek(0)
+            await msg.reply_document(
+                document=InputFile(creds, filename="credentials.csv", read_file_handle=False),
+                caption=f"🔑 Временные пароли ({report.generated}): передайте пользователям и удалите это сообщение",
+            )
+
+
+@require_role("Администратор")
+async def cachestats_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    st = identity_cache.stats()
+    fs = fsm.memory_stats()
+    ix = lookup.meeting_index.stats()
+    ic = lookup.inline_cache.stats()
+    await update.message.reply_text(
+        "🧠 Кэш пользователей:\n"
+        f"записей: {st['size']}/{st['maxsize']}\n"
+        f"попаданий: {st['hits']}, промахов: {st['misses']} (hit ratio {st['hit_ratio']})\n"
+        f"вытеснено: {st['evictions']}\n\n"
+        f"📝 Анкеты в процессе ({fs['backend']}): {fs['states']}, ~{fs['approx_bytes'] // 1024} КиБ\n\n"
+        f"🔎 Inline-индекс: встреч {ix['meetings']}, n-грамм {ix['grams']}"
+        + ("" if ix["ready"] else " (не загружен)")
+        + f"; кэш запросов: {ic['size']}, hit ratio {ic['hit_ratio']}"
+        + _queue_stats_text()
+    )
+
+
+def _queue_stats_text() -> str:
+    if update_processor is None:
+        return "\n\n📥 Апдейты обрабатываются последовательно"
+    q = update_processor.stats()
+    return (
+        "\n\n📥 Очередь апдейтов:\n"
+        f"в ожидании: {q['queued']} (макс. {q['max_queued']}), чатов: {q['chats']}\n"
+        f"выполняется: {q['running']}/{q['max_concurrent']}, тяжёлых: {q['heavy_running']}/{q['heavy_concurrent']}\n"
+        f"ожидание: среднее {q['wait_avg_ms']} мс, p95 {q['wait_p95_ms']} мс, макс. {q['wait_max_ms']} мс\n"
+        f"обработано: {q['processed']}"
+    )
+
+
 from telegram import ReplyKeyboardMarkup
 # остальное у тебя уже есть
 
@@ -256,43 +542,38 @@ from telegram import ReplyKeyboardMarkup
 
 COMMANDS_BY_ROLE = {
     "Администратор": [
-        "/roles", "/addrole", "/renamerole", "/delrole", "/setrole",
-        "/meetings", "/newmeeting", "/addquestion", "/openmeeting", "/closemeeting",
-        "/delmeeting", "/exportmeeting",
-        "/questions", "/answer",
+        "/roles", "/addrole", "/renamerole", "/delrole", "/setrole", "/provisionusers", "/cachestats",
+        "/meetings", "/newmeeting", "/addquestion", "/importmeeting", "/openmeeting", "/closemeeting",
+        "/schedule", "/deadline", "/nudge", "/broadcasts", "/delmeeting", "/exportmeeting", "/results", "/search",
+        "/questions", "/answer", "/fill",
         "/whoami", "/logout",
     ],
     "Модератор": [
-        "/meetings", "/newmeeting", "/addquestion", "/openmeeting", "/closemeeting",
-        "/questions", "/answer",
+        "/meetings", "/newmeeting", "/addquestion", "/importmeeting", "/openmeeting", "/closemeeting", "/results", "/search",
+        "/schedule", "/deadline", "/nudge",
+        "/questions", "/answer", "/fill",
         "/whoami", "/logout",
     ],
     "Участник": [
-        "/meetings", "/questions", "/answer", "/whoami", "/logout",
+        "/meetings", "/questions", "/answer", "/fill", "/whoami", "/logout",
     ],
 }
 
 
 
 @require_login
-async def menu_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    async with SessionLocal() as db:
-        user = await repo.get_active_user(db, update.effective_user.id)
-        if not user:
-            await update.message.reply_text("⚠️ Вы не авторизованы")
-            return
-
-        role = user.role.name
-        commands = COMMANDS_BY_ROLE.get(role, ["/meetings", "/logout"])
-        # делим список на строки по 2 кнопки
-        keyboard = [[cmd for cmd in commands[i:i + 2]] for i in range(0, len(commands), 2)]
-
-        reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
-        await update.message.reply_text(
-            f"📋 Доступные команды для роли *{role}*:",
-            reply_markup=reply_markup,
-            parse_mode="Markdown"
-        )
+async def menu_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    role = user.role.name
+    commands = COMMANDS_BY_ROLE.get(role, ["/meetings", "/logout"])
+    # делим список на строки по 2 кнопки
+    keyboard = [[cmd for cmd in commands[i:i + 2]] for i in range(0, len(commands), 2)]
+
+    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    await update.message.reply_text(
+        f"📋 Доступные команды для роли *{role}*:",
+        reply_markup=reply_markup,
+        parse_mode="Markdown"
+    )
 
 # показать вопросы встречи
 @require_login
@@ -310,7 +591,7 @@ async def questions_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db:
 
 # ответить на вопрос
 @require_login
-async def answer_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def answer_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
     """Добавить ответ на вопрос."""
     if len(context.args) < 2:
         await update.message.reply_text("❌ Используйте: /answer <question_id> <текст>")
@@ -324,19 +605,151 @@ async def answer_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
 
     text = " ".join(context.args[1:])
 
+    # сохраняем ответ (пачкой через фонового писателя; ответ — после коммита пачки)
+    answer = await ingest.save_answer(db, user.id, qid, text)
+    if not answer:
+        await update.message.reply_text("❌ Не удалось сохранить ответ.")
+    else:
+        await update.message.reply_text("✅ Ответ сохранён успешно.")
+
+
+# ---------------------------- fill -----------------------------
+
+# Состояние анкеты хранится по chat_id, а пишется она от имени того, кто ответил
+# на последний вопрос, — поэтому /fill и его кнопки работают только в личном чате.
+FILL_PRIVATE_ONLY = "ℹ️ Анкету можно заполнить только в личном чате с ботом."
+
+
+def _private_chat(update: Update) -> bool:
+    return update.effective_chat is not None and update.effective_chat.type == ChatType.PRIVATE
+
+
+@require_login
+async def fill_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User) -> None:
+    """
+    Пошаговое заполнение анкеты встречи: /fill <meeting_id>.
+    choice/multi/bool — кнопками, text/int — сообщением. Ответы копятся
+    в состоянии анкеты и записываются одной пачкой после последнего вопроса.
+    """
+    if not _private_chat(update):
+        await update.message.reply_text(FILL_PRIVATE_ONLY)
+        return
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("Использование: /fill <meeting_id>")
+        return
+    qs = await questionnaire.get_question_set(db, int(context.args[0]))
+    if qs is None:
+        await update.message.reply_text("❌ Встреча не найдена.")
+        return
+    if not qs.is_open:
+        await update.message.reply_text("⛔ Встреча не открыта для ответов.")
+        return
+    if not qs.questions:
+        await update.message.reply_text("Нет вопросов для этой встречи.")
+        return
+    st = await fsm.start_fill(update.effective_chat.id, qs.meeting_id)
+    await update.message.reply_text(f"📝 Анкета «{qs.title}». /cancel — прервать.")
+    await _fill_next(update.message.reply_text, db, user, update.effective_chat.id, st)
+
+
+@require_login
+async def cancel_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await fsm.clear_state(update.effective_chat.id)
+    await update.message.reply_text("ℹ️ Заполнение анкеты прервано, ответы не сохранены.")
+
+
+async def _fill_next(send, db: AsyncSession, user: User, chat_id: int, st: fsm.FillState) -> None:
+    """Показать следующий вопрос или, если вопросы кончились, отправить анкету."""
+    qs = await questionnaire.get_question_set(db, st.meeting_id)
+    if qs is None or not qs.is_open:
+        await fsm.clear_state(chat_id)
+        await send("⛔ Встреча закрыта или удалена, анкета отменена.")
+        return
+    idx = st.current_q_idx
+    if idx < len(qs.questions):
+        q = qs.questions[idx]
+        await send(questionnaire.prompt(qs, idx), reply_markup=questionnaire.keyboard(q, idx))
+        return
+
+    ids = {q.id for q in qs.questions}
+    items = [(user.id, qid, value) for qid, value in st.answers.items() if qid in ids]
+    if items:
+        await repo.add_answers_batch(db, items, submit=True)
+    await fsm.clear_state(chat_id)
+    await send(f"✅ Анкета отправлена.\n{questionnaire.summary(qs, st.answers)}")
+
+
+async def fill_text(update: Update, st: fsm.FillState) -> None:
+    chat_id = update.effective_chat.id
+    async with SessionLocal() as db:
+        user = await resolve_user(db, update.effective_user.id)
+        if not user:
+            await update.message.reply_text("❌ Вы не авторизованы. Используйте /login.")
+            return
+        qs = await questionnaire.get_question_set(db, st.meeting_id)
+        if qs is None or st.current_q_idx >= len(qs.questions):
+            await _fill_next(update.message.reply_text, db, user, chat_id, st)
+            return
+        q = qs.questions[st.current_q_idx]
+        try:
+            value = questionnaire.validate(q, update.message.text)
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {e}")
+            return
+        st = await fsm.record_answer(chat_id, q.id, value)
+        if st is not None:
+            await _fill_next(update.message.reply_text, db, user, chat_id, st)
+
+
+async def fill_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    if not _private_chat(update):
+        await query.answer(FILL_PRIVATE_ONLY, show_alert=True)
+        return
+    chat_id = update.effective_chat.id
+    parsed = questionnaire.parse_callback(query.data)
     async with SessionLocal() as db:
-        # получаем текущего пользователя
-        user = await repo.get_active_user(db, update.effective_user.id)
+        user = await resolve_user(db, update.effective_user.id)
         if not user:
-            await update.message.reply_text("⚠️ Вы не авторизованы.")
+            await query.answer("Вы не авторизованы. Используйте /login.", show_alert=True)
+            return
+        st = await fsm.get_state(chat_id)
+        if parsed is None or st is None or parsed[1] != st.current_q_idx:
+            await query.answer("Этот вопрос уже неактуален.")
             return
+        action, idx, arg = parsed
+        qs = await questionnaire.get_question_set(db, st.meeting_id)
+        if qs is None or idx >= len(qs.questions):
+            await query.answer()
+            await _fill_next(query.message.reply_text, db, user, chat_id, st)
+            return
+        q = qs.questions[idx]
 
-        # сохраняем ответ
-        answer = await repo.add_answer(db, user.id, qid, text)
-        if not answer:
-            await update.message.reply_text("❌ Не удалось сохранить ответ.")
+        if action == "m":
+            # переключение варианта — только перерисовываем клавиатуру
+            await query.answer()
+            await query.edit_message_reply_markup(questionnaire.keyboard(q, idx, arg))
+            return
+        if action == "c" and 0 <= arg < len(q.options):
+            value = q.options[arg].value
+        elif action == "b":
+            value = "yes" if arg else "no"
+        elif action == "d":
+            value = questionnaire.multi_value(q, arg)
+        elif action == "s":
+            value = ""
         else:
-            await update.message.reply_text("✅ Ответ сохранён успешно.")
+            await query.answer()
+            return
+        if not value and q.is_required:
+            await query.answer("Это обязательный вопрос.", show_alert=True)
+            return
+
+        st = await (fsm.record_answer(chat_id, q.id, value) if value else fsm.advance(chat_id))
+        await query.answer()
+        await query.edit_message_reply_markup(None)
+        if st is not None:
+            await _fill_next(query.message.reply_text, db, user, chat_id, st)
 
 
 # ---------------------------- help -----------------------------
@@ -350,22 +763,35 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         "  /logout — выход\n"
         "  /whoami — информация о текущем пользователе\n\n"
         "📅 Встречи:\n"
-        "  /meetings — список встреч\n"
+        "  /meetings [status=…] [dept=…] [country=…] — список встреч\n"
         "  /newmeeting <данные> — создать встречу (модератор)\n"
         "  /addquestion <meeting_id> <текст> — добавить вопрос (модератор)\n"
-        "  /openmeeting <id> — открыть встречу (модератор)\n"
+        "  /importmeeting — импорт встреч с анкетами из JSON/CSV-файла (модератор)\n"
+        "  /openmeeting <id> — открыть встречу и разослать объявление (модератор)\n"
         "  /closemeeting <id> — закрыть встречу (модератор)\n"
+        "  /schedule <id> <дата> — открыть встречу автоматически (модератор)\n"
+        "  /deadline <id> <дата> — закрыть встречу автоматически (модератор)\n"
+        "  /nudge <id> — напомнить не ответившим (модератор)\n"
+        "  /broadcasts — прогресс рассылок (админ)\n"
         "  /delmeeting <id> — удалить встречу (админ)\n"
-        "  /exportmeeting <id> — экспорт встречи (админ)\n\n"
+        "  /results <id> — сводка ответов встречи (модератор)\n"
+        "  /search <слова> — поиск по встречам, вопросам и ответам (модератор)\n"
+        "  @бот <название> — выбрать встречу в любом чате (inline-режим)\n"
+        "  /exportmeeting <id> [gz] — экспорт ответов встречи в CSV (админ)\n"
+        "  /exportjson [ndjson] — экспорт всех встреч (админ)\n\n"
         "❓ Вопросы:\n"
         "  /questions <meeting_id> — список вопросов\n"
-        "  /answer <question_id> <текст> — ответить на вопрос\n\n"
+        "  /answer <question_id> <текст> — ответить на вопрос\n"
+        "  /fill <meeting_id> — заполнить анкету встречи по шагам\n"
+        "  /cancel — прервать заполнение анкеты\n\n"
         "👥 Роли:\n"
         "  /roles — список ролей\n"
         "  /addrole <название> — добавить роль (админ)\n"
         "  /renamerole <id> <название> — переименовать роль (админ)\n"
         "  /delrole <id> — удалить роль (админ)\n"
-        "  /setrole <username> <role_id> — назначить роль (админ)\n\n"
+        "  /setrole <username> <role_id> — назначить роль (админ)\n"
+        "  /provisionusers — создать пользователей из CSV-файла (админ)\n"
+        "  /cachestats — статистика кэшей и анкет в памяти (админ)\n\n"
         "📋 Другое:\n"
         "  /menu — показать меню\n"
         "  /help — помощь\n\n"
@@ -375,83 +801,86 @@ async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 # ---------------------------- exportjson -----------------------------
 
-import json
-import os
-from io import BytesIO
-from telegram import InputFile
-from sqlalchemy import select
-
 
-@require_login
+@require_role("Администратор")
 async def exportjson_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE, db: AsyncSession, user: User):
     """
     Экспорт всех встреч, вопросов и ответов в JSON.
+    /exportjson ndjson — то же в виде NDJSON, сжатого gzip.
     Доступно только администратору.
     """
-    from .models import Meeting, Question, Answer, Response
-
-    meetings_data = []
-
-    meetings = (await db.execute(select(Meeting))).scalars().all()
-    for m in meetings:
-        meeting_dict = {
-            "id": m.id,
-            "title": m.title,
-            "description": m.description,
-            "department": m.department,
-            "country": m.country,
-            "status": m.status.value if hasattr(m.status, "value") else m.status,
-            "created_at": str(m.created_at),
-            "questions": [],
-        }
-
-        questions = (await db.execute(select(Question).where(Question.meeting_id == m.id))).scalars().all()
-        for q in questions:
-            q_dict = {
-                "id": q.id,
-                "text": q.text,
-                "order_idx": q.order_idx,
-                "is_required": getattr(q, "is_required", None),
-                "answers": [],
-            }
-
-            # ищем все ответы через response + user_id
-            answers = (await db.execute(select(Answer).where(Answer.question_id == q.id))).scalars().all()
-            for a in answers:
-                response = (await db.execute(select(Response).where(Response.id == a.response_id))).scalar_one_or_none()
-                user_id = response.user_id if response else None
-                submitted_at = response.submitted_at if response else None
-
-                q_dict["answers"].append({
-                    "user_id": user_id,
-                    "value": a.value,
-                    "submitted_at": str(submitted_at) if submitted_at else None,
-                })
-
-            meeting_dict["questions"].append(q_dict)
-
-        meetings_data.append(meeting_dict)
-
-    # сериализация
-    json_data = json.dumps(meetings_data, indent=4, ensure_ascii=False)
-    json_bytes = BytesIO(json_data.encode('utf-8'))
-    json_bytes.name = "meetings_export.json"
-
-    await update.message.reply_document(
-        document=InputFile(json_bytes, filename="meetings_export.json"),
-        caption="📦 Экспорт всех встреч в формате JSON выполнен успешно."
-    )
+    fmt = "ndjson" if context.args and context.args[0].lower() in ("ndjson", "gz") else "json"
+    fp, filename = await export.export_all(db, fmt)
+    with fp:
+        await update.message.reply_document(
+            document=InputFile(fp, filename=filename, read_file_handle=False),
+            caption=f"📦 Экспорт всех встреч в формате {fmt.upper()} выполнен успешно."
+        )
 
 
 # ---------------------------- init -----------------------------
 
+async def _notify_meeting(app: Application, kind: str, meeting_id: int) -> None:
+    """Уведомления планировщика: объявление при открытии, напоминание перед дедлайном."""
+    async with SessionLocal() as db:
+        if kind == scheduler.OPEN:
+            await broadcast.announce_meeting(db, meeting_id)
+        elif kind == scheduler.REMIND:
+            await broadcast.nudge_meeting(db, meeting_id)
+
+
+_status_server: Optional[webhook.WebhookServer] = None
+
+
 async def _on_startup(app: Application) -> None:
+    global _status_server
     from .db import init_db
     await init_db()
-
-
-def build_app() -> Application:
-    app = Application.builder().token(settings.BOT_TOKEN).build()
+    await ingest.answer_writer.start()
+    audit.revision_log.start()
+    maintenance.session_compactor.start()
+    broadcast.broadcaster.sender = app.bot.send_message
+    broadcast.broadcaster.start()
+    scheduler.deadline_scheduler.notifier = partial(_notify_meeting, app)
+    await scheduler.deadline_scheduler.start()
+    if settings.BOT_MODE != "webhook" and settings.STATUS_SERVER:
+        _status_server = webhook.WebhookServer(app, accept_updates=False)
+        await _status_server.start()
+
+
+async def _on_shutdown(app: Application) -> None:
+    global _status_server
+    from . import security
+    if _status_server is not None:
+        await _status_server.close()
+        _status_server = None
+    await scheduler.deadline_scheduler.stop()
+    await broadcast.broadcaster.stop()
+    await maintenance.session_compactor.stop()
+    await ingest.answer_writer.stop()
+    await audit.revision_log.stop()  # после писателя: его последние пачки тоже в журнал
+    security.shutdown()
+
+
+update_processor: Optional[ChatOrderedUpdateProcessor] = None
+
+
+def build_app(request: Optional[BaseRequest] = None) -> Application:
+    """
+    Собрать приложение. request — транспорт Bot API (по умолчанию HTTPX,
+    при BOT_LOCAL_API=1 — локальная заглушка без сети).
+    """
+    global update_processor
+    if request is None and settings.BOT_LOCAL_API:
+        request = LocalTelegramRequest()
+    local = isinstance(request, LocalTelegramRequest)
+    builder = Application.builder().token(settings.BOT_TOKEN or ("0:local" if local else ""))
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    update_processor = make_processor()
+    if update_processor is not None:
+        builder = builder.concurrent_updates(update_processor)
+    app = builder.build()
 
     # auth
     app.add_handler(CommandHandler("login", login_cmd))
@@ -464,12 +893,25 @@ def build_app() -> Application:
 
     # meetings
     app.add_handler(CommandHandler("meetings", meetings_cmd))
+    app.add_handler(CallbackQueryHandler(meetings_callback, pattern=f"^{catalog.CALLBACK_PREFIX}"))
+    app.add_handler(CommandHandler("search", search_cmd))
+    app.add_handler(InlineQueryHandler(inline_query))
+    app.add_handler(CallbackQueryHandler(search_callback, pattern=f"^{search.CALLBACK_PREFIX}"))
     app.add_handler(CommandHandler("newmeeting", newmeeting_cmd))
     app.add_handler(CommandHandler("addquestion", addquestion_cmd))
+    app.add_handler(CommandHandler("importmeeting", importmeeting_cmd))
+    app.add_handler(MessageHandler(
+        filters.Document.ALL & filters.CaptionRegex(r"^/importmeeting\b"), importmeeting_cmd,
+    ))
     app.add_handler(CommandHandler("openmeeting", openmeeting_cmd))
     app.add_handler(CommandHandler("closemeeting", closemeeting_cmd))
+    app.add_handler(CommandHandler("schedule", schedule_cmd))
+    app.add_handler(CommandHandler("deadline", deadline_cmd))
+    app.add_handler(CommandHandler("nudge", nudge_cmd))
+    app.add_handler(CommandHandler("broadcasts", broadcasts_cmd))
     app.add_handler(CommandHandler("delmeeting", delmeeting_cmd))
     app.add_handler(CommandHandler("exportmeeting", exportmeeting_cmd))
+    app.add_handler(CommandHandler("results", results_cmd))
 
     # roles (из этапа 5)
     app.add_handler(CommandHandler("roles", roles_cmd))
@@ -477,9 +919,17 @@ def build_app() -> Application:
     app.add_handler(CommandHandler("renamerole", renamerole_cmd))
     app.add_handler(CommandHandler("delrole", delrole_cmd))
     app.add_handler(CommandHandler("setrole", setrole_cmd))
+    app.add_handler(CommandHandler("provisionusers", provisionusers_cmd))
+    app.add_handler(MessageHandler(
+        filters.Document.ALL & filters.CaptionRegex(r"^/provisionusers\b"), provisionusers_cmd,
+    ))
+    app.add_handler(CommandHandler("cachestats", cachestats_cmd))
 
     app.add_handler(CommandHandler("questions", questions_cmd))
     app.add_handler(CommandHandler("answer", answer_cmd))
+    app.add_handler(CommandHandler("fill", fill_cmd))
+    app.add_handler(CommandHandler("cancel", cancel_cmd))
+    app.add_handler(CallbackQueryHandler(fill_callback, pattern=f"^{questionnaire.CALLBACK_PREFIX}"))
 
     # misc
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_handler))
@@ -492,14 +942,52 @@ def build_app() -> Application:
     app.add_handler(CommandHandler("exportjson", exportjson_cmd))
 
     app.post_init = _on_startup
+    app.post_shutdown = _on_shutdown
+
+    metrics.instrument_engine(SessionLocal.kw["bind"])  # текущий движок (db.bind_engine)
+    metrics.instrument_app(app)
+    _register_gauges(app)
     return app
 
 
+def _register_gauges(app: Application) -> None:
+    proc = update_processor
+
+    def queue():
+        out = {(("stage", "fetch"),): app.update_queue.qsize()}
+        if proc is not None:
+            out[(("stage", "waiting"),)] = proc.queued
+        return out
+
+    def running():
+        if proc is None:
+            return {}
+        return {(("lane", lane),): n for lane, n in proc.running.items()}
+
+    def wait_p95():
+        return {(): proc.stats()["wait_p95_ms"] / 1000} if proc is not None else {}
+
+    metrics.register_gauge("bot_update_queue_size", "Апдейтов в очереди: получено / ждут слота", queue)
+    metrics.register_gauge("bot_updates_running", "Апдейтов в обработке по полосам", running)
+    metrics.register_gauge("bot_update_wait_p95_seconds", "p95 ожидания апдейта до начала обработки", wait_p95)
+
+
+def start(app: Application) -> None:
+    """Запустить бота в режиме из настроек: BOT_MODE=polling (по умолчанию) или webhook."""
+    if settings.BOT_MODE == "webhook":
+        asyncio.run(webhook.serve(app))
+    else:
+        app.run_polling()
+
+
 async def run() -> None:
     app = build_app()
+    if settings.BOT_MODE == "webhook":
+        await webhook.serve(app)
+        return
 
     await app.run_polling()
 
 
 if __name__ == "__main__":
-    asyncio.run(run())
+    start(build_app())
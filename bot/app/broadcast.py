@@ -0,0 +1,262 @@
+# app/broadcast.py
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram.error import BadRequest, ChatMigrated, Forbidden, RetryAfter
+
+from .cache import TTLCache
+from .config import settings
+from .db import SessionLocal
+from .questionnaire import get_question_set
+from . import repo
+
+
+# Рассылки. Получатели фиксируются в таблице outbox при создании рассылки
+# (INSERT … SELECT), фоновый отправитель забирает их порциями и шлёт с учётом
+# лимитов Telegram: общий token bucket на бота и по одному на чат. Статусы
+# пишутся в БД после каждой порции, поэтому после перезапуска рассылка
+# продолжается с места остановки (сообщения порции, прерванной падением,
+# могут уйти повторно — доставка «хотя бы один раз»).
+
+Sender = Callable[[int, str], Awaitable[Any]]
+
+
+class TokenBucket:
+    """
+    Token bucket с резервированием: reserve() сразу списывает токен (уходя
+    в минус) и возвращает, сколько ждать. Без блокировок — в рамках event loop.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._stamp = clock()
+
+    def _refill(self, now: float) -> None:
+        if now > self._stamp:
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+
+    def reserve(self) -> float:
+        now = self._clock()
+        self._refill(now)
+        self._tokens -= 1
+        return max(0.0, self._stamp - now) + max(0.0, -self._tokens) / self.rate
+
+    async def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Не выдавать токены seconds секунд (ответ Telegram RetryAfter)."""
+        now = self._clock()
+        self._refill(now)
+        self._tokens = min(self._tokens, 0.0)
+        self._stamp = max(self._stamp, now + seconds)
+
+
+def _seconds(value) -> float:
+    # RetryAfter.retry_after: int в PTB 21, timedelta в более новых версиях
+    return value.total_seconds() if hasattr(value, "total_seconds") else float(value)
+
+
+class BroadcastEngine:
+    def __init__(self, session_factory=SessionLocal, sender: Optional[Sender] = None,
+                 global_rate: Optional[float] = None, per_chat_rate: Optional[float] = None,
+                 concurrency: Optional[int] = None, batch_size: Optional[int] = None,
+                 max_attempts: Optional[int] = None) -> None:
+        self._session_factory = session_factory
+        self.sender = sender
+        self.bucket = TokenBucket(global_rate or settings.BROADCAST_GLOBAL_RATE)
+        self.per_chat_rate = per_chat_rate or settings.BROADCAST_PER_CHAT_RATE
+        self._chat_buckets: TTLCache[int, TokenBucket] = TTLCache(maxsize=100_000, ttl=60)
+        self.concurrency = concurrency or settings.BROADCAST_CONCURRENCY
+        self.batch_size = batch_size or settings.BROADCAST_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.BROADCAST_MAX_ATTEMPTS
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # метрики
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.flood_waits = 0
+
+    # ---------- отправка ----------
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        b = self._chat_buckets.get(chat_id)
+        if b is None:
+            b = TokenBucket(self.per_chat_rate, capacity=1)
+            self._chat_buckets.set(chat_id, b)
+        return b
+
+    async def _send_one(self, row, slots: asyncio.Semaphore) -> Dict:
+        msg_id, _, chat_id, attempts, text = row
+        result = {"id": msg_id, "attempts": attempts + 1, "status": "pending",
+                  "next_attempt_at": None, "sent_at": None, "error": None}
+        async with slots:
+            await self._chat_bucket(chat_id).acquire()
+            await self.bucket.acquire()
+            try:
+                await self.sender(chat_id, text)
+            except RetryAfter as e:
+                # flood control действует на весь бот: останавливаем общий поток
+                wait = _seconds(e.retry_after)
+                self.bucket.pause(wait)
+                self.flood_waits += 1
+                result.update(attempts=attempts, error=f"RetryAfter {wait:.0f}s",
+                              next_attempt_at=datetime.utcnow() + timedelta(seconds=wait))
+                return result
+            except (Forbidden, BadRequest, ChatMigrated) as e:
+                # бот заблокирован, чат не найден и т.п. — повтор не поможет
+                self.failed += 1
+                result.update(status="failed", error=str(e)[:500])
+                return result
+            except Exception as e:  # noqa: BLE001 — сетевые сбои: повтор с экспоненциальной паузой
+                if attempts + 1 >= self.max_attempts:
+                    self.failed += 1
+                    result.update(status="failed", error=str(e)[:500])
+                else:
+                    self.retried += 1
+                    result.update(error=str(e)[:500],
+                                  next_attempt_at=datetime.utcnow() + timedelta(seconds=2 ** attempts))
+                return result
+        self.sent += 1
+        result.update(status="sent", sent_at=datetime.utcnow())
+        return result
+
+    async def run_once(self) -> int:
+        """Отправить одну порцию наступивших сообщений; вернуть их число."""
+        now = datetime.utcnow()
+        async with self._session_factory() as db:
+            rows = await repo.due_outbox(db, now, self.batch_size)
+            if not rows:
+                return 0
+            await repo.mark_broadcasts_started(db, {r.broadcast_id for r in rows}, now)
+        slots = asyncio.Semaphore(self.concurrency)
+        results = await asyncio.gather(*(self._send_one(r, slots) for r in rows))
+        async with self._session_factory() as db:
+            await repo.save_outbox_results(db, results)
+        return len(rows)
+
+    # ---------- фоновая задача ----------
+
+    def wake(self) -> None:
+        """Разбудить отправителя (создана новая рассылка)."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _idle_timeout(self) -> Optional[float]:
+        async with self._session_factory() as db:
+            nxt = await repo.next_outbox_due(db)
+        if nxt is None:
+            return None
+        return max(0.0, (nxt.replace(tzinfo=None) - datetime.utcnow()).total_seconds())
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                if await self.run_once():
+                    continue
+                timeout = await self._idle_timeout()
+            except Exception as e:  # noqa: BLE001 — отправитель не должен умирать из-за сбоя БД
+                logger.warning("Broadcast batch failed: {}", e)
+                timeout = 5.0
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="broadcast-engine")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wake = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "flood_waits": self.flood_waits,
+        }
+
+
+broadcaster = BroadcastEngine()
+
+
+# ---------- Рассылки по встречам ----------
+
+async def announce_meeting(db: AsyncSession, meeting_id: int):
+    """Объявление об открытии встречи всем пользователям с telegram_id."""
+    qs = await get_question_set(db, meeting_id)
+    if qs is None:
+        return None
+    b = await repo.create_broadcast(
+        db, "announce", f"📢 Открыта встреча «{qs.title}». Заполните анкету: /fill {meeting_id}",
+        repo.audience_all(), meeting_id=meeting_id,
+    )
+    broadcaster.wake()
+    return b
+
+
+async def nudge_meeting(db: AsyncSession, meeting_id: int):
+    """Напоминание тем, у кого по встрече ещё нет анкеты."""
+    qs = await get_question_set(db, meeting_id)
+    if qs is None:
+        return None
+    b = await repo.create_broadcast(
+        db, "nudge", f"⏰ Вы ещё не ответили по встрече «{qs.title}». Заполните анкету: /fill {meeting_id}",
+        repo.audience_non_responders(meeting_id), meeting_id=meeting_id,
+    )
+    broadcaster.wake()
+    return b
+
+
+async def progress(db: AsyncSession, broadcast_id: int) -> Optional[Dict[str, Any]]:
+    """Прогресс рассылки и скорость отправки (сообщений/с) по отметкам времени в БД."""
+    p = await repo.broadcast_progress(db, broadcast_id)
+    if p is None:
+        return None
+    b = p.pop("broadcast")
+    done = p["sent"] + p["failed"]
+    rate = 0.0
+    if b.started_at is not None and done:
+        end = (b.finished_at or datetime.utcnow()).replace(tzinfo=None)
+        elapsed = (end - b.started_at.replace(tzinfo=None)).total_seconds()
+        rate = done / elapsed if elapsed > 0 else float(done)
+    return {
+        "id": b.id, "kind": b.kind, "meeting_id": b.meeting_id, "total": b.total, **p,
+        "done_pct": round(100 * done / b.total, 1) if b.total else 100.0,
+        "rate": round(rate, 2), "finished": b.finished_at is not None,
+    }
+
+
+def format_progress(p: Dict[str, Any]) -> str:
+    state = "✅ завершена" if p["finished"] else f"⏳ {p['done_pct']}%"
+    return (
+        f"#{p['id']} {p['kind']} (встреча {p['meeting_id']}): {state}\n"
+        f"  отправлено {p['sent']}/{p['total']}, ошибок {p['failed']}, в очереди {p['pending']}, "
+        f"{p['rate']} сообщ./с"
+    )
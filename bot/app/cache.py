@@ -0,0 +1,186 @@
+# app/cache.py
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+from .config import settings
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Простой in-process кэш с вытеснением по LRU и временем жизни записей.
+    Рассчитан на работу внутри одного event loop (без блокировок).
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[K, tuple[float, V]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = item
+        if expires_at <= self._clock():
+            # запись протухла — считаем это промахом
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = (self._clock() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[V], bool]) -> int:
+        """Удалить все записи, значения которых удовлетворяют условию."""
+        keys = [k for k, (_, v) in self._data.items() if predicate(v)]
+        for k in keys:
+            del self._data[k]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# ---------- Identity cache ----------
+
+# telegram_id → User (с загруженной ролью, отвязан от сессии).
+# Инвалидируется в repo при логине/логауте и изменении ролей.
+identity_cache: TTLCache[int, Any] = TTLCache(
+    maxsize=settings.IDENTITY_CACHE_SIZE,
+    ttl=settings.IDENTITY_CACHE_TTL,
+)
+
+
+def invalidate_identity(telegram_id: int) -> None:
+    identity_cache.pop(telegram_id)
+
+
+def invalidate_user(user_id: int) -> None:
+    identity_cache.discard_where(lambda u: u.id == user_id)
+
+
+def invalidate_role(role_id: int) -> None:
+    identity_cache.discard_where(lambda u: u.role_id == role_id)
+
+
+# ---------- Question sets ----------
+
+# meeting_id → QuestionSet (снимок встречи, вопросов и вариантов для /fill).
+# Инвалидируется в repo при любом изменении встречи.
+question_set_cache: TTLCache[int, Any] = TTLCache(
+    maxsize=settings.QUESTION_SET_CACHE_SIZE,
+    ttl=settings.QUESTION_SET_CACHE_TTL,
+)
+
+
+# подписчики на изменения встреч (планировщик дедлайнов перевзводит таймеры)
+_meeting_listeners: List[Callable[[int], None]] = []
+
+
+def subscribe_meeting_changes(listener: Callable[[int], None]) -> None:
+    if listener not in _meeting_listeners:
+        _meeting_listeners.append(listener)
+
+
+def unsubscribe_meeting_changes(listener: Callable[[int], None]) -> None:
+    if listener in _meeting_listeners:
+        _meeting_listeners.remove(listener)
+
+
+def invalidate_meeting(meeting_id: int) -> None:
+    question_set_cache.pop(meeting_id)
+    results_cache.pop(meeting_id)
+    for listener in list(_meeting_listeners):
+        listener(meeting_id)
+
+
+# ---------- Meeting catalogue ----------
+
+# (версия, фильтр, курсор) → готовая страница /meetings.
+# Любое изменение списка встреч увеличивает версию: страница, собранная
+# по данным до изменения, не попадёт под ключ новой версии.
+catalog_pages: TTLCache[tuple, Any] = TTLCache(
+    maxsize=settings.CATALOG_CACHE_SIZE,
+    ttl=settings.CATALOG_CACHE_TTL,
+)
+_catalog_version = 0
+
+
+def catalog_version() -> int:
+    return _catalog_version
+
+
+def invalidate_catalog() -> None:
+    global _catalog_version
+    _catalog_version += 1
+    catalog_pages.clear()
+
+
+# ---------- Results ----------
+
+# meeting_id → MeetingResults (агрегаты /results). Обновляются на месте при
+# записи ответов (repo.add_answers_batch), сбрасываются при изменении встречи.
+results_cache: TTLCache[int, Any] = TTLCache(
+    maxsize=settings.RESULTS_CACHE_SIZE,
+    ttl=settings.RESULTS_CACHE_TTL,
+)
+# счётчик записей: агрегат, посчитанный во время записи, в кэш не кладётся
+_results_writes = 0
+
+
+def results_writes() -> int:
+    return _results_writes
+
+
+def record_results(meeting_id: int, answers=(), new_responses: int = 0, submitted: int = 0,
+                   replaced=()) -> None:
+    """
+    Применить записанные ответы (question_id, value) к закэшированным агрегатам;
+    replaced — прежние значения, которые они заменили.
+    """
+    global _results_writes
+    _results_writes += 1
+    agg = results_cache.get(meeting_id)
+    if agg is not None:
+        agg.apply(answers, new_responses, submitted, replaced)
@@ -0,0 +1,162 @@
+# app/catalog.py
+from __future__ import annotations
+
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from .cache import TTLCache, catalog_pages, catalog_version
+from .config import settings
+from .models import MeetingStatus
+from . import repo
+
+
+# Каталог встреч для /meetings: постраничный вывод по ключу (id), фильтры
+# по статусу, отделу и стране. Готовые страницы кэшируются по ключу
+# (версия каталога, фильтр, курсор); repo увеличивает версию при создании,
+# смене статуса и удалении встречи.
+
+
+# ---------- Фильтр ----------
+
+_KEYS = {
+    "status": "status",
+    "dept": "department",
+    "department": "department",
+    "country": "country",
+}
+_STATUSES = {s.value for s in MeetingStatus}
+
+
+@dataclass(frozen=True, slots=True)
+class MeetingFilter:
+    status: Optional[str] = None
+    department: Optional[str] = None
+    country: Optional[str] = None
+
+    @classmethod
+    def parse(cls, args: Sequence[str]) -> "MeetingFilter":
+        """
+        /meetings [open] [status=open] [dept=Отдел продаж] [country=Россия]
+        Значение может состоять из нескольких слов — до следующего key=.
+        """
+        values = {}
+        key = None
+        for token in args:
+            name, eq, value = token.partition("=")
+            if eq:
+                key = _KEYS.get(name.lower())
+                if key is None:
+                    raise ValueError(f"Неизвестный фильтр: {name}. Доступны: status, dept, country")
+                values[key] = value
+            elif key is not None:
+                values[key] = f"{values[key]} {token}"
+            elif token.lower() in _STATUSES:
+                values["status"] = token.lower()
+            else:
+                raise ValueError(f"Не понял «{token}». Пример: /meetings status=open country=Россия")
+        values = {k: v.strip() for k, v in values.items() if v.strip()}
+        if values.get("status") and values["status"] not in _STATUSES:
+            raise ValueError(f"Статус — один из: {', '.join(sorted(_STATUSES))}")
+        return cls(**values)
+
+    def describe(self) -> str:
+        parts = [f"{k}={v}" for k, v in (
+            ("status", self.status), ("dept", self.department), ("country", self.country),
+        ) if v]
+        return ", ".join(parts)
+
+
+# callback_data ограничена 64 байтами, поэтому фильтр в кнопках передаётся
+# коротким ключом, а сам хранится здесь.
+_filters: TTLCache[str, MeetingFilter] = TTLCache(maxsize=4096, ttl=24 * 3600)
+
+
+def filter_token(flt: MeetingFilter) -> str:
+    if flt == MeetingFilter():
+        return "0"
+    token = format(zlib.crc32(repr(flt).encode("utf-8")), "x")
+    _filters.set(token, flt)
+    return token
+
+
+def resolve_filter(token: str) -> Optional[MeetingFilter]:
+    if token == "0":
+        return MeetingFilter()
+    return _filters.get(token)
+
+
+# ---------- Страницы ----------
+
+@dataclass(frozen=True, slots=True)
+class Page:
+    text: str
+    markup: Optional[InlineKeyboardMarkup]
+    ids: Tuple[int, ...] = ()
+
+
+CALLBACK_PREFIX = "mt:"
+TITLE_MAX = 100  # чтобы страница гарантированно укладывалась в 4096 символов
+
+
+def _line(row) -> str:
+    status = getattr(row.status, "value", row.status)
+    title = row.title if len(row.title) <= TITLE_MAX else row.title[:TITLE_MAX - 1] + "…"
+    extra = " · ".join(x for x in (row.department, row.country) if x)
+    return f"{row.id}: {title} [{status}]" + (f" — {extra}" if extra else "")
+
+
+def _render(flt: MeetingFilter, rows: List, has_prev: bool, has_next: bool) -> Page:
+    head = "📅 Встречи" + (f" ({flt.describe()})" if flt.describe() else "")
+    if not rows:
+        return Page(f"{head}:\nВстреч нет.", None)
+    token = filter_token(flt)
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=f"mt:{token}:b:{rows[0].id}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton("Вперёд ▶️", callback_data=f"mt:{token}:a:{rows[-1].id}"))
+    text = f"{head}:\n" + "\n".join(_line(r) for r in rows)
+    return Page(text, InlineKeyboardMarkup([buttons]) if buttons else None, tuple(r.id for r in rows))
+
+
+async def get_page(
+    db: AsyncSession, flt: MeetingFilter, direction: str = "a", cursor: Optional[int] = None,
+) -> Page:
+    """
+    Страница каталога: direction="a" — встречи после cursor (или первая страница),
+    "b" — перед cursor. Повторные запросы той же страницы идут из кэша.
+    """
+    key = (catalog_version(), flt, direction, cursor)
+    page = catalog_pages.get(key)
+    if page is not None:
+        return page
+
+    size = settings.MEETINGS_PAGE_SIZE
+    before = cursor if direction == "b" else None
+    after = cursor if direction != "b" else None
+    rows = await repo.list_meetings_page(
+        db, size, after_id=after, before_id=before,
+        status=flt.status, department=flt.department, country=flt.country,
+    )
+    if direction == "b":
+        has_prev, rows, has_next = len(rows) > size, rows[-size:], True
+    else:
+        has_prev, rows, has_next = cursor is not None, rows[:size], len(rows) > size
+    page = _render(flt, rows, has_prev, has_next)
+    catalog_pages.set(key, page)
+    return page
+
+
+def parse_callback(data: str) -> Optional[Tuple[str, str, int]]:
+    """'mt:0:a:10' → ('0', 'a', 10); некорректные данные → None."""
+    parts = (data or "").split(":")
+    if len(parts) != 4 or parts[0] != "mt" or parts[2] not in ("a", "b"):
+        return None
+    try:
+        return parts[1], parts[2], int(parts[3])
+    except ValueError:
+        return None
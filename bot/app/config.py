@@ -14,10 +14,130 @@ class Settings(BaseModel):
     ]
     DB_DSN: str = os.getenv("DB_DSN", "sqlite+aiosqlite:///./data/bot.db")
 
+    # SQLite: PRAGMA-профиль для каждого соединения и настройки пула
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))  # <0 — в КиБ
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    SQLITE_TEMP_STORE: str = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
     # учётка для первичного администратора
     ADMIN_USERNAME: str = os.getenv("ADMIN_USERNAME", "admin")
     ADMIN_PASSWORD: str = os.getenv("ADMIN_PASSWORD", "admin123")
 
+    # кэш «telegram_id → пользователь» для require_login/require_role
+    IDENTITY_CACHE_TTL: float = float(os.getenv("IDENTITY_CACHE_TTL", "60"))
+    IDENTITY_CACHE_SIZE: int = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+    # кэш вопросов встречи для /fill (сбрасывается при изменении встречи)
+    QUESTION_SET_CACHE_TTL: float = float(os.getenv("QUESTION_SET_CACHE_TTL", "3600"))
+    QUESTION_SET_CACHE_SIZE: int = int(os.getenv("QUESTION_SET_CACHE_SIZE", "256"))
+    # каталог встреч /meetings: размер страницы и кэш готовых страниц
+    MEETINGS_PAGE_SIZE: int = int(os.getenv("MEETINGS_PAGE_SIZE", "10"))
+    CATALOG_CACHE_TTL: float = float(os.getenv("CATALOG_CACHE_TTL", "600"))
+    CATALOG_CACHE_SIZE: int = int(os.getenv("CATALOG_CACHE_SIZE", "512"))
+    # полнотекстовый поиск /search: размер страницы и длина фрагмента текста
+    SEARCH_PAGE_SIZE: int = int(os.getenv("SEARCH_PAGE_SIZE", "10"))
+    SEARCH_SNIPPET_CHARS: int = int(os.getenv("SEARCH_SNIPPET_CHARS", "120"))
+    # сколько последних совпадений каждого индекса ранжировать по bm25
+    SEARCH_CANDIDATES: int = int(os.getenv("SEARCH_CANDIDATES", "2000"))
+    # inline-режим (@bot запрос): результатов в ответе (Telegram принимает до 50),
+    # cache_time для Telegram и локальный кэш ответов по строке запроса
+    INLINE_MAX_RESULTS: int = int(os.getenv("INLINE_MAX_RESULTS", "20"))
+    INLINE_CACHE_TIME: int = int(os.getenv("INLINE_CACHE_TIME", "30"))
+    INLINE_QUERY_CACHE_SIZE: int = int(os.getenv("INLINE_QUERY_CACHE_SIZE", "2048"))
+    INLINE_QUERY_CACHE_TTL: float = float(os.getenv("INLINE_QUERY_CACHE_TTL", "600"))
+    # агрегаты /results: обновляются при записи ответов, TTL — страховка
+    RESULTS_CACHE_TTL: float = float(os.getenv("RESULTS_CACHE_TTL", "3600"))
+    RESULTS_CACHE_SIZE: int = int(os.getenv("RESULTS_CACHE_SIZE", "128"))
+    RESULTS_HIST_BINS: int = int(os.getenv("RESULTS_HIST_BINS", "10"))
+
+    # сессии Telegram: срок жизни (0 — бессрочно), хранение неактивных, период очистки
+    SESSION_TTL_HOURS: float = float(os.getenv("SESSION_TTL_HOURS", "720"))
+    SESSION_RETENTION_DAYS: float = float(os.getenv("SESSION_RETENTION_DAYS", "30"))
+    SESSION_COMPACT_INTERVAL_SEC: float = float(os.getenv("SESSION_COMPACT_INTERVAL_SEC", "3600"))
+
+    # состояния анкет: "memory" или "sqlite"; лимит записей в памяти и срок жизни
+    FSM_BACKEND: str = os.getenv("FSM_BACKEND", "memory")
+    FSM_MAX_STATES: int = int(os.getenv("FSM_MAX_STATES", "10000"))
+    FSM_TTL_SEC: float = float(os.getenv("FSM_TTL_SEC", str(24 * 3600)))
+
+    # дедлайны встреч: напоминание за N часов до закрытия (0 — не напоминать),
+    # максимальный сон планировщика (страховка от перевода системных часов)
+    REMINDER_BEFORE_HOURS: float = float(os.getenv("REMINDER_BEFORE_HOURS", "24"))
+    SCHEDULER_MAX_SLEEP_SEC: float = float(os.getenv("SCHEDULER_MAX_SLEEP_SEC", "300"))
+
+    # рассылки: общий лимит бота и лимит на чат (сообщений/с), параллельность,
+    # размер порции outbox, число попыток при сетевых ошибках
+    BROADCAST_GLOBAL_RATE: float = float(os.getenv("BROADCAST_GLOBAL_RATE", "25"))
+    BROADCAST_PER_CHAT_RATE: float = float(os.getenv("BROADCAST_PER_CHAT_RATE", "1"))
+    BROADCAST_CONCURRENCY: int = int(os.getenv("BROADCAST_CONCURRENCY", "8"))
+    BROADCAST_BATCH_SIZE: int = int(os.getenv("BROADCAST_BATCH_SIZE", "50"))
+    BROADCAST_MAX_ATTEMPTS: int = int(os.getenv("BROADCAST_MAX_ATTEMPTS", "5"))
+
+    # пароли: стоимость bcrypt, пул для хеширования ("thread" | "process")
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_POOL: str = os.getenv("PASSWORD_POOL", "thread")
+    PASSWORD_WORKERS: int = int(os.getenv("PASSWORD_WORKERS", "2"))
+    # массовое создание пользователей (/provisionusers): строк CSV на пачку,
+    # процессов для bcrypt (отдельный пул на время импорта), стоимость bcrypt —
+    # при входе хеш с другой стоимостью перехешируется с BCRYPT_ROUNDS
+    PROVISION_BATCH_SIZE: int = int(os.getenv("PROVISION_BATCH_SIZE", "1000"))
+    PROVISION_WORKERS: int = int(os.getenv("PROVISION_WORKERS", str(os.cpu_count() or 2)))
+    PROVISION_BCRYPT_ROUNDS: int = int(os.getenv("PROVISION_BCRYPT_ROUNDS", os.getenv("BCRYPT_ROUNDS", "12")))
+    # не более LOGIN_MAX_ATTEMPTS попыток /login за LOGIN_WINDOW_SEC с одного telegram_id
+    LOGIN_MAX_ATTEMPTS: int = int(os.getenv("LOGIN_MAX_ATTEMPTS", "5"))
+    LOGIN_WINDOW_SEC: float = float(os.getenv("LOGIN_WINDOW_SEC", "60"))
+
+    # обработка апдейтов: параллельно между чатами (<= 1 — последовательно, как в PTB),
+    # отдельная полоса для тяжёлых команд, предел принятых, но не начатых апдейтов
+    UPDATE_CONCURRENCY: int = int(os.getenv("UPDATE_CONCURRENCY", "16"))
+    UPDATE_HEAVY_CONCURRENCY: int = int(os.getenv("UPDATE_HEAVY_CONCURRENCY", "2"))
+    UPDATE_MAX_PENDING: int = int(os.getenv("UPDATE_MAX_PENDING", "1000"))
+    UPDATE_HEAVY_COMMANDS: str = os.getenv(
+        "UPDATE_HEAVY_COMMANDS", "exportjson,exportmeeting,importmeeting,provisionusers,results",
+    )
+
+    # получение апдейтов: polling (getUpdates) или webhook (встроенный HTTP-сервер)
+    BOT_MODE: str = os.getenv("BOT_MODE", "polling").lower()
+    WEBHOOK_URL: str = os.getenv("WEBHOOK_URL", "")  # публичный https-адрес; пусто — setWebhook не вызывается
+    WEBHOOK_PATH: str = os.getenv("WEBHOOK_PATH", "/telegram")
+    WEBHOOK_LISTEN: str = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    WEBHOOK_PORT: int = int(os.getenv("WEBHOOK_PORT", "8080"))
+    WEBHOOK_SECRET: str = os.getenv("WEBHOOK_SECRET", "")
+    WEBHOOK_DEDUP_SIZE: int = int(os.getenv("WEBHOOK_DEDUP_SIZE", "10000"))
+    WEBHOOK_MAX_BODY: int = int(os.getenv("WEBHOOK_MAX_BODY", str(1024 * 1024)))
+    WEBHOOK_DRAIN_TIMEOUT: float = float(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30"))
+    # локальная заглушка Bot API вместо сети (нагрузочные прогоны)
+    BOT_LOCAL_API: bool = os.getenv("BOT_LOCAL_API", "0") == "1"
+
+    # метрики: порог «медленного» запроса для лога; HTTP-сервер состояния
+    # (/healthz, /readyz, /metrics) и в режиме polling — на WEBHOOK_LISTEN:WEBHOOK_PORT
+    SLOW_REQUEST_MS: float = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+    STATUS_SERVER: bool = os.getenv("STATUS_SERVER", "0") == "1"
+    # профиль SQL по запросам (app/querylog.py): off | prod | dev
+    QUERY_PROFILE: str = os.getenv("QUERY_PROFILE", "prod").lower()
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "200"))
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+    # запись ответов пачками: размер пачки, ожидание добора (мс), предел очереди
+    ANSWER_BATCH_SIZE: int = int(os.getenv("ANSWER_BATCH_SIZE", "100"))
+    ANSWER_FLUSH_MS: float = float(os.getenv("ANSWER_FLUSH_MS", "20"))
+    ANSWER_QUEUE_MAX: int = int(os.getenv("ANSWER_QUEUE_MAX", "1000"))
+    # журнал значений ответов (answer_revisions) пишется фоном: размер пачки,
+    # период сброса, предел несброшенных строк (сверх него старые теряются)
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+    AUDIT_FLUSH_SEC: float = float(os.getenv("AUDIT_FLUSH_SEC", "1"))
+    AUDIT_MAX_PENDING: int = int(os.getenv("AUDIT_MAX_PENDING", "100000"))
+
+    # экспорт: размер порции курсора и порог сброса временного файла на диск
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    EXPORT_SPOOL_MAX_BYTES: int = int(os.getenv("EXPORT_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+    # импорт анкет (/importmeeting): предельный размер файла
+    IMPORT_MAX_BYTES: int = int(os.getenv("IMPORT_MAX_BYTES", str(10 * 1024 * 1024)))
 
 
 settings = Settings()
@@ -3,10 +3,12 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from typing import Any, Dict, Optional
+
+from loguru import logger
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import select
-from passlib.hash import bcrypt
 
 from .config import settings
 
@@ -29,7 +31,70 @@ if dsn and dsn.startswith("sqlite+aiosqlite:///"):
     dsn = f"sqlite+aiosqlite:///{abs_path}"
 
 
-engine = create_async_engine(dsn, echo=False, future=True)
+# ---------- SQLite performance profile ----------
+
+# Применяется к каждому новому соединению через событие "connect".
+# WAL позволяет читать параллельно с записью, busy_timeout — ждать снятия
+# блокировки вместо мгновенного "database is locked".
+def sqlite_pragmas() -> Dict[str, Any]:
+    return {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE,
+        "synchronous": settings.SQLITE_SYNCHRONOUS,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "temp_store": settings.SQLITE_TEMP_STORE,
+        "foreign_keys": "ON",
+    }
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def _is_memory(url: str) -> bool:
+    return ":memory:" in url or url.rstrip("/").endswith("sqlite+aiosqlite:")
+
+
+def make_engine(url: str, profile: bool = True, **kw) -> AsyncEngine:
+    """
+    Создаёт async-движок. Для SQLite (profile=True) навешивает PRAGMA-профиль
+    и настройки пула из settings.
+    """
+    if _is_sqlite(url) and not _is_memory(url):
+        kw.setdefault("pool_size", settings.DB_POOL_SIZE)
+        kw.setdefault("max_overflow", settings.DB_MAX_OVERFLOW)
+        kw.setdefault("pool_timeout", settings.DB_POOL_TIMEOUT)
+        kw.setdefault("connect_args", {"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000})
+    eng = create_async_engine(url, echo=False, future=True, **kw)
+
+    if profile and _is_sqlite(url):
+        pragmas = sqlite_pragmas()
+        if _is_memory(url):
+            pragmas.pop("journal_mode")
+            pragmas.pop("mmap_size")
+
+        @event.listens_for(eng.sync_engine, "connect")
+        def _apply_pragmas(dbapi_connection, connection_record):
+            cur = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cur.execute(f"PRAGMA {name}={value}")
+            cur.close()
+
+    return eng
+
+
+async def effective_pragmas(eng: Optional[AsyncEngine] = None) -> Dict[str, Any]:
+    """Фактические значения PRAGMA на соединении из пула."""
+    eng = eng or engine
+    out: Dict[str, Any] = {}
+    async with eng.connect() as conn:
+        for name in sqlite_pragmas():
+            out[name] = (await conn.exec_driver_sql(f"PRAGMA {name}")).scalar()
+    return out
+
+
+engine = make_engine(dsn)
 
 SessionLocal = async_sessionmaker(
     bind=engine,
@@ -38,6 +103,17 @@ SessionLocal = async_sessionmaker(
 )
 
 
+def bind_engine(new: AsyncEngine) -> AsyncEngine:
+    """
+    Переключает SessionLocal (и db.engine) на другой движок, возвращает прежний.
+    Тесты так получают свою копию базы, бенчмарки — временную базу.
+    """
+    global engine
+    old, engine = engine, new
+    SessionLocal.configure(bind=new)
+    return old
+
+
 class Base(DeclarativeBase):
     """Базовый класс для ORM-моделей."""
     pass
@@ -57,9 +133,14 @@ async def init_db() -> None:
             os.makedirs(db_dir, exist_ok=True)
 
     from . import models  # noqa: F401
+    from .migrations import run_migrations
 
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
+
+    if _is_sqlite(dsn):
+        logger.info("SQLite pragmas: {}", await effective_pragmas())
 
     await seed_defaults()
 
@@ -69,6 +150,7 @@ async def init_db() -> None:
 async def seed_defaults() -> None:
     """Создание базовых ролей и администратора"""
     from .models import Role, User
+    from .security import hash_password
 
     async with SessionLocal() as s:
         # роли
@@ -89,7 +171,7 @@ async def seed_defaults() -> None:
                 admin_role = (await s.execute(select(Role).where(Role.name == "Администратор"))).scalar_one()
                 s.add(User(
                     username=settings.ADMIN_USERNAME,
-                    password_hash=bcrypt.hash(settings.ADMIN_PASSWORD or "admin123"),
+                    password_hash=await hash_password(settings.ADMIN_PASSWORD or "admin123"),
                     role_id=admin_role.id,
                     fio="Default Admin",
                     is_active=True
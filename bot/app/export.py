@@ -0,0 +1,363 @@
+# app/export.py
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from typing import IO, Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .models import Answer, Meeting, Option, Question, QuestionType, Response, User
+
+
+# Экспорт строится за фиксированное число запросов (встречи, вопросы, варианты,
+# поток ответов), а не по запросу на каждую встречу/вопрос/ответ.
+# Ответы читаются курсором порциями по EXPORT_BATCH_SIZE строк и сразу пишутся
+# в файл, поэтому потребление памяти не зависит от их количества.
+# Все запросы выгрузки идут в одной read-транзакции (одном снимке базы),
+# иначе ответ, записанный между чтением вопросов и ответов, ссылался бы
+# на вопрос, которого в выгрузке нет.
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, default=str)
+
+
+def _enum(v: Any) -> Any:
+    return v.value if hasattr(v, "value") else v
+
+
+def _iso(v: Optional[datetime]) -> Optional[str]:
+    return str(v) if v else None
+
+
+# ---------- Загрузка данных ----------
+
+@asynccontextmanager
+async def _read_snapshot(db: AsyncSession):
+    """
+    Чтения внутри блока видят один снимок базы. pysqlite не открывает
+    транзакцию перед SELECT, поэтому без явного BEGIN каждый запрос
+    читал бы свою версию данных.
+    """
+    conn = await db.connection()
+    try:
+        await conn.exec_driver_sql("BEGIN")
+    except OperationalError:
+        # сессия уже внутри транзакции — её чтения и так согласованы
+        yield
+        return
+    try:
+        yield
+    finally:
+        await conn.exec_driver_sql("ROLLBACK")
+
+
+async def _load_meetings(db: AsyncSession) -> List[Dict[str, Any]]:
+    rows = await db.execute(
+        select(
+            Meeting.id, Meeting.title, Meeting.description, Meeting.department,
+            Meeting.country, Meeting.status, Meeting.deadline_at, Meeting.created_at,
+        ).order_by(Meeting.id)
+    )
+    return [
+        {
+            "id": r.id,
+            "title": r.title,
+            "description": r.description,
+            "department": r.department,
+            "country": r.country,
+            "status": _enum(r.status),
+            "deadline_at": _iso(r.deadline_at),
+            "created_at": _iso(r.created_at),
+        }
+        for r in rows
+    ]
+
+
+async def _load_questions(db: AsyncSession) -> Dict[int, List[Dict[str, Any]]]:
+    """Все вопросы (с вариантами ответа), сгруппированные по встрече."""
+    options: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for r in await db.execute(
+        select(Option.question_id, Option.value, Option.label).order_by(Option.question_id, Option.id)
+    ):
+        options[r.question_id].append({"value": r.value, "label": r.label})
+
+    by_meeting: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for r in await db.execute(
+        select(
+            Question.id, Question.meeting_id, Question.text, Question.order_idx,
+            Question.is_required, Question.type,
+        ).order_by(Question.meeting_id, Question.order_idx, Question.id)
+    ):
+        by_meeting[r.meeting_id].append({
+            "id": r.id,
+            "text": r.text,
+            "order_idx": r.order_idx,
+            "is_required": r.is_required,
+            "type": _enum(r.type),
+            "options": options.get(r.id, []),
+        })
+    return by_meeting
+
+
+async def _stream_answers(db: AsyncSession):
+    """
+    Поток ответов в том же порядке, что и вопросы в _load_questions:
+    (meeting_id, order_idx, question_id), внутри вопроса — по id ответа.
+    """
+    stmt = (
+        select(
+            Answer.question_id, Answer.value, Response.user_id, Response.submitted_at,
+        )
+        .join(Question, Question.id == Answer.question_id)
+        .outerjoin(Response, Response.id == Answer.response_id)
+        .order_by(Question.meeting_id, Question.order_idx, Question.id, Answer.id)
+        .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+    result = await db.stream(stmt)
+    async for r in result:
+        yield r
+
+
+def _question_order(meetings: List[Dict[str, Any]], questions: Dict[int, List[Dict[str, Any]]]) -> List[int]:
+    """id вопросов в порядке выгрузки: по встречам, внутри — как в _load_questions."""
+    return [q["id"] for m in meetings for q in questions.get(m["id"], [])]
+
+
+class _AnswerCursor:
+    """
+    Обёртка над потоком ответов с заглядыванием на одну строку вперёд.
+    order — id вопросов в порядке выгрузки. Ответ на вопрос, которого нет
+    в order или который выгрузка уже прошла, пропускается с предупреждением,
+    а не останавливает курсор.
+    """
+
+    def __init__(self, db: AsyncSession, order: Iterable[int]) -> None:
+        self._it = _stream_answers(db).__aiter__()
+        self._pos = {qid: i for i, qid in enumerate(order)}
+        self._head = None
+        self._done = False
+        self.skipped = 0
+
+    async def take(self, question_id: int):
+        """Отдаёт подряд идущие ответы на вопрос question_id."""
+        pos = self._pos[question_id]
+        while not self._done:
+            if self._head is None:
+                self._head = await anext(self._it, None)
+                if self._head is None:
+                    self._done = True
+                    return
+            head_pos = self._pos.get(self._head.question_id)
+            if head_pos is not None and head_pos > pos:
+                return
+            row, self._head = self._head, None
+            if head_pos != pos:
+                self.skipped += 1
+                logger.warning("Export: skipped answer to question {} (not in export order)", row.question_id)
+                continue
+            yield {
+                "user_id": row.user_id,
+                "value": row.value,
+                "submitted_at": _iso(row.submitted_at),
+            }
+
+
+# ---------- Форматы ----------
+
+def _open_object(head: Dict[str, Any], key: str) -> str:
+    """'{"a": 1, "key": [' — начало объекта с вложенным массивом."""
+    body = _dumps(head)[:-1]
+    sep = ", " if head else ""
+    return f"{body}{sep}{_dumps(key)}: ["
+
+
+async def write_json(db: AsyncSession, fp: IO[bytes]) -> int:
+    """
+    Пишет в fp JSON-массив встреч с вложенными вопросами и ответами.
+    Возвращает количество выгруженных ответов.
+    """
+    async with _read_snapshot(db):
+        return await _write_json(db, fp)
+
+
+async def _write_json(db: AsyncSession, fp: IO[bytes]) -> int:
+    meetings = await _load_meetings(db)
+    questions = await _load_questions(db)
+    answers = _AnswerCursor(db, _question_order(meetings, questions))
+    total = 0
+
+    def w(s: str) -> None:
+        fp.write(s.encode("utf-8"))
+
+    w("[")
+    for mi, m in enumerate(meetings):
+        w(("," if mi else "") + "\n  " + _open_object(m, "questions"))
+        for qi, q in enumerate(questions.get(m["id"], [])):
+            w(("," if qi else "") + "\n    " + _open_object(q, "answers"))
+            ai = 0
+            async for a in answers.take(q["id"]):
+                w(("," if ai else "") + "\n      " + _dumps(a))
+                ai += 1
+            total += ai
+            w("\n    ]}" if ai else "]}")
+        w("\n  ]}" if questions.get(m["id"]) else "]}")
+    w("\n]\n" if meetings else "]\n")
+    return total
+
+
+async def write_ndjson(db: AsyncSession, fp: IO[bytes]) -> int:
+    """
+    NDJSON: по одной записи на строку, записи типизированы полем "type"
+    (meeting → его question → их answer). Удобно для потоковой обработки.
+    """
+    async with _read_snapshot(db):
+        return await _write_ndjson(db, fp)
+
+
+async def _write_ndjson(db: AsyncSession, fp: IO[bytes]) -> int:
+    meetings = await _load_meetings(db)
+    questions = await _load_questions(db)
+    answers = _AnswerCursor(db, _question_order(meetings, questions))
+    total = 0
+
+    for m in meetings:
+        fp.write((_dumps({"type": "meeting", **m}) + "\n").encode("utf-8"))
+        for q in questions.get(m["id"], []):
+            fp.write((_dumps({"type": "question", "meeting_id": m["id"], **q}) + "\n").encode("utf-8"))
+            async for a in answers.take(q["id"]):
+                fp.write((_dumps({"type": "answer", "question_id": q["id"], **a}) + "\n").encode("utf-8"))
+                total += 1
+    return total
+
+
+async def export_all(db: AsyncSession, fmt: str = "json") -> tuple[IO[bytes], str]:
+    """
+    Выгрузка всех встреч во временный файл (в памяти до EXPORT_SPOOL_MAX_BYTES,
+    дальше — на диске). Возвращает файл, перемотанный в начало, и имя для отправки.
+    fmt: "json" или "ndjson" (сжимается gzip).
+    """
+    fp = SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_BYTES, mode="w+b")
+    if fmt == "ndjson":
+        with gzip.GzipFile(fileobj=fp, mode="wb") as gz:
+            await write_ndjson(db, gz)
+        filename = "meetings_export.ndjson.gz"
+    else:
+        await write_json(db, fp)
+        filename = "meetings_export.json"
+    fp.seek(0)
+    return fp, filename
+
+
+# ---------- CSV по одной встрече ----------
+
+MULTI_SEPARATOR = "; "
+
+
+async def _stream_response_rows(db: AsyncSession, meeting_id: int):
+    """Ответы встречи, сгруппированные по Response (по строке на анкету)."""
+    stmt = (
+        select(
+            Response.id, Response.user_id, User.username, Response.status, Response.submitted_at,
+            Answer.question_id, Answer.value,
+        )
+        .outerjoin(User, User.id == Response.user_id)
+        .outerjoin(Answer, Answer.response_id == Response.id)
+        .where(Response.meeting_id == meeting_id)
+        .order_by(Response.id)
+        .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    )
+    result = await db.stream(stmt)
+    current = None
+    values: Dict[int, Optional[str]] = {}
+    async for r in result:
+        if current is not None and current.id != r.id:
+            yield current, values
+            values = {}
+        current = r
+        if r.question_id is not None:
+            values[r.question_id] = r.value  # ответ на вопрос в анкете один (upsert)
+    if current is not None:
+        yield current, values
+
+
+def _cell(qtype: Any, value: Optional[str]) -> str:
+    if not value:
+        return ""
+    if qtype == QuestionType.multi:
+        # множественный выбор: выбранные варианты без повторов
+        seen: List[str] = []
+        for part in value.split(","):
+            part = part.strip()
+            if part and part not in seen:
+                seen.append(part)
+        return MULTI_SEPARATOR.join(seen)
+    return value
+
+
+async def write_meeting_csv(db: AsyncSession, meeting_id: int, fp: IO[bytes]) -> Optional[int]:
+    """
+    CSV в «широком» формате: строка на Response, колонка на Question (по order_idx).
+    Возвращает число строк или None, если встречи нет.
+    """
+    async with _read_snapshot(db):
+        return await _write_meeting_csv(db, meeting_id, fp)
+
+
+async def _write_meeting_csv(db: AsyncSession, meeting_id: int, fp: IO[bytes]) -> Optional[int]:
+    exists = (await db.execute(select(Meeting.id).where(Meeting.id == meeting_id))).scalar_one_or_none()
+    if exists is None:
+        return None
+
+    questions = (await db.execute(
+        select(Question.id, Question.text, Question.type)
+        .where(Question.meeting_id == meeting_id)
+        .order_by(Question.order_idx, Question.id)
+    )).all()
+
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(
+        ["response_id", "user_id", "username", "status", "submitted_at"]
+        + [f"{q.id}. {q.text}" for q in questions]
+    )
+    rows = 0
+    async for r, values in _stream_response_rows(db, meeting_id):
+        writer.writerow(
+            [r.id, r.user_id, r.username or "", r.status, _iso(r.submitted_at) or ""]
+            + [_cell(q.type, values.get(q.id)) for q in questions]
+        )
+        rows += 1
+    text.flush()
+    text.detach()  # fp закрывает вызывающий
+    return rows
+
+
+async def export_meeting(
+    db: AsyncSession, meeting_id: int, compress: bool = False,
+) -> Optional[tuple[IO[bytes], str]]:
+    """CSV-выгрузка встречи во временный файл (опционально gzip)."""
+    fp = SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_BYTES, mode="w+b")
+    if compress:
+        with gzip.GzipFile(fileobj=fp, mode="wb") as gz:
+            rows = await write_meeting_csv(db, meeting_id, gz)
+        filename = f"meeting_{meeting_id}.csv.gz"
+    else:
+        rows = await write_meeting_csv(db, meeting_id, fp)
+        filename = f"meeting_{meeting_id}.csv"
+    if rows is None:
+        fp.close()
+        return None
+    fp.seek(0)
+    return fp, filename
@@ -1,38 +1,257 @@
 # app/fsm.py
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional, Dict
 
+import sys
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
 
-@dataclass
+from .cache import TTLCache
+from .config import settings
+from .db import SessionLocal
+from . import repo
+
+
+@dataclass(slots=True)
 class FillState:
     """Состояние прохождения анкеты пользователем."""
     meeting_id: int
     current_q_idx: int = 0  # индекс текущего вопроса (0..n-1)
+    updated_at: float = field(default_factory=time.time)
+    answers: Dict[int, str] = field(default_factory=dict)  # question_id → значение (до отправки)
+    stamp: Optional[datetime] = None  # updated_at строки fsm_states (SqliteStateStore)
+
+
+# ---------- Хранилища ----------
+
+class StateStore(ABC):
+    """
+    Интерфейс хранилища состояний анкет (ключ — chat_id).
+    Все операции асинхронные; advance атомарен относительно других вызовов
+    для того же chat_id, поэтому параллельные апдейты PTB не теряют шаги.
+    """
+
+    @abstractmethod
+    async def get(self, chat_id: int) -> Optional[FillState]:
+        ...
+
+    @abstractmethod
+    async def set(self, chat_id: int, state: FillState) -> None:
+        ...
+
+    @abstractmethod
+    async def advance(self, chat_id: int) -> Optional[FillState]:
+        ...
+
+    @abstractmethod
+    async def record_answer(self, chat_id: int, question_id: int, value: str) -> Optional[FillState]:
+        """Запомнить ответ на вопрос и перейти к следующему (атомарно)."""
+
+    @abstractmethod
+    async def delete(self, chat_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+
+def _approx_bytes(cache: TTLCache) -> int:
+    """
+    Оценка памяти под состояния: записи (__slots__) + ключи + служебные кортежи
+    + накопленные ответы. Проходит по всем записям — для статистики, не для горячего пути.
+    """
+    n = len(cache)
+    if not n:
+        return 0
+    per_item = (
+        sys.getsizeof(FillState(0))
+        + sys.getsizeof(0) * 2        # chat_id, время истечения
+        + sys.getsizeof((0.0, None))  # (expires_at, state) в TTLCache
+        + 100                         # слот OrderedDict
+    )
+    answers = sum(
+        sys.getsizeof(st.answers) + sum(sys.getsizeof(v) for v in st.answers.values())
+        for _, st in cache._data.values()
+    )
+    return n * per_item + answers
+
+
+class MemoryStateStore(StateStore):
+    """Состояния в памяти процесса: LRU с ограничением размера и TTL."""
+
+    def __init__(self, maxsize: Optional[int] = None, ttl: Optional[float] = None) -> None:
+        self._cache: TTLCache[int, FillState] = TTLCache(
+            maxsize=maxsize or settings.FSM_MAX_STATES,
+            ttl=ttl if ttl is not None else settings.FSM_TTL_SEC,
+        )
+
+    async def get(self, chat_id: int) -> Optional[FillState]:
+        return self._cache.get(chat_id)
+
+    async def set(self, chat_id: int, state: FillState) -> None:
+        state.updated_at = time.time()
+        self._cache.set(chat_id, state)
+
+    async def advance(self, chat_id: int) -> Optional[FillState]:
+        # без await внутри — атомарно в рамках event loop
+        st = self._cache.get(chat_id)
+        if st is None:
+            return None
+        st.current_q_idx += 1
+        st.updated_at = time.time()
+        self._cache.set(chat_id, st)
+        return st
+
+    async def record_answer(self, chat_id: int, question_id: int, value: str) -> Optional[FillState]:
+        st = self._cache.get(chat_id)
+        if st is None:
+            return None
+        st.answers[question_id] = value
+        return await self.advance(chat_id)
 
+    async def delete(self, chat_id: int) -> None:
+        self._cache.pop(chat_id)
 
-# Простое хранилище состояний в памяти процесса.
-# Для продакшена можно заменить на Redis/БД.
-_STATE: Dict[int, FillState] = {}
+    def stats(self) -> Dict[str, Any]:
+        st = self._cache.stats()
+        return {"backend": "memory", "states": st["size"], "approx_bytes": _approx_bytes(self._cache), **st}
 
 
-def start_fill(chat_id: int, meeting_id: int) -> None:
+class SqliteStateStore(StateStore):
+    """
+    Состояния в таблице fsm_states: запись сквозная (write-through), чтение —
+    из локального LRU-кэша с ленивой подгрузкой из БД при промахе.
+    Переживает перезапуск и доступно другим процессам с той же базой: запись
+    из кэша отдаётся, только если updated_at строки совпадает с её stamp
+    (один запрос по ключу), иначе состояние перечитывается.
+    """
+
+    def __init__(self, session_factory=SessionLocal, maxsize: Optional[int] = None,
+                 ttl: Optional[float] = None) -> None:
+        self._session_factory = session_factory
+        self.ttl = ttl if ttl is not None else settings.FSM_TTL_SEC
+        self._cache: TTLCache[int, FillState] = TTLCache(
+            maxsize=maxsize or settings.FSM_MAX_STATES, ttl=self.ttl,
+        )
+        self.db_loads = 0
+
+    def _expired(self, stamp: datetime) -> bool:
+        return stamp < datetime.utcnow() - timedelta(seconds=self.ttl)
+
+    async def get(self, chat_id: int) -> Optional[FillState]:
+        cached = self._cache.get(chat_id)
+        async with self._session_factory() as db:
+            if cached is not None:
+                # строку мог изменить или удалить другой процесс
+                stamp = await repo.get_fill_state_stamp(db, chat_id)
+                if stamp is not None and stamp == cached.stamp:
+                    return None if self._expired(stamp) else cached
+                self._cache.pop(chat_id)
+                if stamp is None:
+                    return None
+            row = await repo.get_fill_state(db, chat_id)
+        self.db_loads += 1
+        if row is None or self._expired(row.updated_at):
+            return None
+        st = FillState(row.meeting_id, row.current_q_idx, time.time(), repo.decode_fill_answers(row.answers),
+                       row.updated_at)
+        self._cache.set(chat_id, st)
+        return st
+
+    async def set(self, chat_id: int, state: FillState) -> None:
+        state.updated_at = time.time()
+        async with self._session_factory() as db:
+            state.stamp = await repo.save_fill_state(
+                db, chat_id, state.meeting_id, state.current_q_idx, state.answers,
+            )
+        self._cache.set(chat_id, state)
+
+    async def advance(self, chat_id: int) -> Optional[FillState]:
+        st = await self.get(chat_id)
+        if st is None:
+            return None
+        # инкремент выполняет БД (UPDATE ... SET idx = idx + 1 RETURNING idx)
+        async with self._session_factory() as db:
+            res = await repo.advance_fill_state(db, chat_id)
+        if res is None:
+            self._cache.pop(chat_id)
+            return None
+        st.current_q_idx, st.stamp = res
+        st.updated_at = time.time()
+        self._cache.set(chat_id, st)
+        return st
+
+    async def record_answer(self, chat_id: int, question_id: int, value: str) -> Optional[FillState]:
+        st = await self.get(chat_id)
+        if st is None:
+            return None
+        async with self._session_factory() as db:
+            res = await repo.record_fill_answer(db, chat_id, question_id, value)
+        if res is None:
+            self._cache.pop(chat_id)
+            return None
+        st.current_q_idx, st.answers, st.stamp = res
+        st.updated_at = time.time()
+        self._cache.set(chat_id, st)
+        return st
+
+    async def delete(self, chat_id: int) -> None:
+        self._cache.pop(chat_id)
+        async with self._session_factory() as db:
+            await repo.delete_fill_state(db, chat_id)
+
+    def stats(self) -> Dict[str, Any]:
+        st = self._cache.stats()
+        return {
+            "backend": "sqlite", "states": st["size"], "approx_bytes": _approx_bytes(self._cache),
+            "db_loads": self.db_loads, **st,
+        }
+
+
+def make_store(backend: Optional[str] = None) -> StateStore:
+    backend = backend or settings.FSM_BACKEND
+    if backend == "sqlite":
+        return SqliteStateStore()
+    if backend == "memory":
+        return MemoryStateStore()
+    raise ValueError(f"Неизвестный FSM_BACKEND: {backend}")
+
+
+store: StateStore = make_store()
+
+
+# ---------- API анкет ----------
+
+async def start_fill(chat_id: int, meeting_id: int) -> FillState:
     """Начать заполнение анкеты по встрече."""
-    _STATE[chat_id] = FillState(meeting_id=meeting_id, current_q_idx=0)
+    st = FillState(meeting_id=meeting_id, current_q_idx=0)
+    await store.set(chat_id, st)
+    return st
 
 
-def get_state(chat_id: int) -> Optional[FillState]:
+async def get_state(chat_id: int) -> Optional[FillState]:
     """Получить состояние пользователя (или None)."""
-    return _STATE.get(chat_id)
+    return await store.get(chat_id)
 
 
-def advance(chat_id: int) -> None:
+async def advance(chat_id: int) -> Optional[FillState]:
     """Перейти к следующему вопросу."""
-    st = _STATE.get(chat_id)
-    if st:
-        st.current_q_idx += 1
+    return await store.advance(chat_id)
+
+
+async def record_answer(chat_id: int, question_id: int, value: str) -> Optional[FillState]:
+    """Сохранить ответ на текущий вопрос и перейти к следующему."""
+    return await store.record_answer(chat_id, question_id, value)
 
 
-def clear_state(chat_id: int) -> None:
+async def clear_state(chat_id: int) -> None:
     """Сбросить состояние пользователя."""
-    _STATE.pop(chat_id, None)
+    await store.delete(chat_id)
+
+
+def memory_stats() -> Dict[str, Any]:
+    """Сколько анкет «в процессе» держит этот воркер и сколько памяти они занимают."""
+    return store.stats()
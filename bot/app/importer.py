@@ -0,0 +1,209 @@
+# app/importer.py
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import invalidate_catalog, invalidate_meeting
+from .lookup import meeting_index
+from .models import Meeting, MeetingStatus, Option, Question, QuestionType
+from .questionnaire import MULTI_JOIN
+from .schemas import QuestionnaireImport
+
+
+# Массовый импорт встреч с анкетами из JSON или CSV. Описание проверяется
+# целиком (schemas.QuestionnaireImport / QuestionCreate) до записи, затем всё
+# пишется одной транзакцией: встречи — по INSERT на каждую (их единицы),
+# вопросы и варианты — пакетными INSERT, а не по запросу с commit на вопрос,
+# как в repo.add_question.
+#
+# JSON: объект встречи или массив встреч; у встречи поля MeetingCreate и
+# "questions": [{"text", "type", "is_required", "order_idx", "options"}].
+# Выгрузка /exportjson подходит как есть (лишние поля игнорируются).
+#
+# CSV (заголовок обязателен): meeting, description, department, country,
+# deadline_at, question, type, required, order_idx, options — по строке на
+# вопрос, вопросы одной встречи — строки с одинаковым meeting; варианты
+# ответа через "|".
+
+CSV_OPTION_SEP = "|"
+_TRUE = {"1", "true", "yes", "y", "да", "+"}
+
+
+class QuestionnaireError(ValueError):
+    """Описание анкеты не прошло проверку; в args[0] — все найденные ошибки."""
+
+
+# ---------- Разбор ----------
+
+def _option_text(o: Any) -> Any:
+    # варианты из выгрузки — {"value", "label"}
+    if isinstance(o, dict):
+        return o.get("label") or o.get("value")
+    return o
+
+
+def option_values(labels: Sequence[str]) -> List[str]:
+    """
+    Хранимые значения вариантов. Обычно значение совпадает с текстом, но
+    ответ на multi-вопрос хранится как значения через MULTI_JOIN, поэтому
+    вариант с этим символом в тексте получает значение «oN» (текст — в label).
+    """
+    taken = {t for t in labels if MULTI_JOIN not in t}
+    values: List[str] = []
+    for i, text in enumerate(labels, start=1):
+        if MULTI_JOIN in text:
+            value = f"o{i}"
+            while value in taken:
+                value += "_"
+            taken.add(value)
+            text = value
+        values.append(text)
+    return values
+
+
+def validate(raw: Sequence[Dict[str, Any]]) -> List[QuestionnaireImport]:
+    """Проверка уже разобранных описаний (список словарей встреч)."""
+    items: List[QuestionnaireImport] = []
+    errors: List[str] = []
+    for i, m in enumerate(raw, start=1):
+        if not isinstance(m, dict):
+            errors.append(f"встреча #{i}: ожидался объект")
+            continue
+        m = dict(m)
+        m["questions"] = [
+            {**q, "options": [_option_text(o) for o in q.get("options") or []] or None}
+            if isinstance(q, dict) else q
+            for q in m.get("questions") or []
+        ]
+        try:
+            items.append(QuestionnaireImport.model_validate(m))
+        except ValidationError as e:
+            for err in e.errors():
+                where = ".".join(str(x) for x in err["loc"])
+                errors.append(f"встреча #{i} ({m.get('title') or '?'}): {where}: {err['msg']}")
+    if errors:
+        raise QuestionnaireError("\n".join(errors))
+    return items
+
+
+def parse_json(data: bytes) -> List[QuestionnaireImport]:
+    try:
+        raw = json.loads(data.decode("utf-8-sig"))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise QuestionnaireError(f"некорректный JSON: {e}") from e
+    return validate(raw if isinstance(raw, list) else [raw])
+
+
+def parse_csv(data: bytes) -> List[QuestionnaireImport]:
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise QuestionnaireError(f"файл не в UTF-8: {e}") from e
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or "meeting" not in reader.fieldnames or "question" not in reader.fieldnames:
+        raise QuestionnaireError("в заголовке CSV нужны как минимум колонки meeting и question")
+
+    meetings: Dict[str, Dict[str, Any]] = {}
+    for row in reader:
+        title = (row.get("meeting") or "").strip()
+        m = meetings.get(title)
+        if m is None:
+            m = meetings[title] = {
+                "title": title,
+                "description": row.get("description") or None,
+                "department": row.get("department") or None,
+                "country": row.get("country") or None,
+                "deadline_at": row.get("deadline_at") or None,
+                "questions": [],
+            }
+        options = [o for o in (row.get("options") or "").split(CSV_OPTION_SEP) if o.strip()]
+        q: Dict[str, Any] = {
+            "text": (row.get("question") or "").strip(),
+            "type": (row.get("type") or "text").strip().lower(),
+            "options": options or None,
+        }
+        if (row.get("required") or "").strip():
+            q["is_required"] = row["required"].strip().lower() in _TRUE
+        if (row.get("order_idx") or "").strip():
+            q["order_idx"] = row["order_idx"].strip()
+        m["questions"].append(q)
+    return validate(list(meetings.values()))
+
+
+def parse(data: bytes, filename: str = "") -> List[QuestionnaireImport]:
+    """Разбор по расширению файла; без расширения — по первому символу."""
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return parse_csv(data)
+    if name.endswith(".json") or data.lstrip()[:1] in (b"{", b"["):
+        return parse_json(data)
+    return parse_csv(data)
+
+
+# ---------- Запись ----------
+
+async def import_questionnaires(
+    db: AsyncSession, items: Sequence[QuestionnaireImport], created_by: int,
+) -> List[int]:
+    """
+    Создаёт встречи (в статусе draft) с вопросами и вариантами одной транзакцией.
+    Вопросы встречи нумеруются подряд в порядке order_idx, затем порядка в файле.
+    Возвращает id созданных встреч.
+    """
+    now = datetime.utcnow()
+    meeting_ids: List[int] = []
+    for m in items:
+        meeting_ids.append((await db.execute(
+            insert(Meeting).returning(Meeting.id).values(
+                title=m.title.strip(),
+                description=(m.description or "").strip() or None,
+                department=(m.department or "").strip() or None,
+                country=(m.country or "").strip() or None,
+                deadline_at=m.deadline_at,
+                status=MeetingStatus.draft,
+                created_by=created_by,
+                created_at=now,
+            )
+        )).scalar_one())
+
+    rows: List[Dict[str, Any]] = []
+    options: Dict[tuple, List[tuple]] = {}  # (встреча, индекс вопроса) → [(текст, значение)]
+    for meeting_id, m in zip(meeting_ids, items):
+        ordered = sorted(m.questions, key=lambda q: q.order_idx)  # sorted устойчив
+        for idx, q in enumerate(ordered):
+            rows.append({
+                "meeting_id": meeting_id, "text": q.text.strip(), "order_idx": idx,
+                "is_required": q.is_required, "type": QuestionType(q.type),
+            })
+            if q.options:
+                options[(meeting_id, idx)] = list(zip(q.options, option_values(q.options)))
+
+    if rows:
+        # RETURNING без сортировки пакетируется в INSERT … VALUES (…), (…);
+        # (meeting_id, order_idx) уникальны, по ним и находим id вопроса
+        result = await db.execute(
+            insert(Question).returning(Question.id, Question.meeting_id, Question.order_idx), rows,
+        )
+        option_rows = [
+            {"question_id": qid, "value": value, "label": label}
+            for qid, meeting_id, idx in result
+            for label, value in options.get((meeting_id, idx), ())
+        ]
+        if option_rows:
+            await db.execute(insert(Option), option_rows)
+
+    await db.commit()
+    invalidate_catalog()
+    for meeting_id, m in zip(meeting_ids, items):
+        invalidate_meeting(meeting_id)
+        meeting_index.put(meeting_id, m.title.strip(), (m.department or "").strip() or None,
+                          (m.country or "").strip() or None, MeetingStatus.draft)
+    return meeting_ids
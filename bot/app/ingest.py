@@ -0,0 +1,194 @@
+# app/ingest.py
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .db import SessionLocal
+from . import repo
+
+
+# Запись ответов через одну фоновую задачу-писателя.
+# Хендлеры кладут ответ в очередь и ждут future; писатель собирает пачку
+# (до ANSWER_BATCH_SIZE штук или ANSWER_FLUSH_MS миллисекунд) и пишет её
+# одной транзакцией — вместо отдельного commit на каждый /answer, которые
+# в SQLite всё равно выстраиваются в очередь за единственной блокировкой записи.
+# Остановленный писатель пишет ответы напрямую; ответы, оставшиеся в очереди
+# после его остановки или падения, завершаются ошибкой — хендлеры не зависают.
+
+_Item = Tuple[int, int, str, "asyncio.Future[Any]"]
+_STOP = object()
+
+
+class AnswerWriter:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: Optional[int] = None,
+        flush_ms: Optional[float] = None,
+        max_pending: Optional[int] = None,
+    ) -> None:
+        self._session_factory = session_factory
+        self.batch_size = batch_size or settings.ANSWER_BATCH_SIZE
+        self.flush_ms = flush_ms if flush_ms is not None else settings.ANSWER_FLUSH_MS
+        self.max_pending = max_pending or settings.ANSWER_QUEUE_MAX
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        # метрики
+        self.batches = 0
+        self.items = 0
+        self.failed_batches = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._closing
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._closing = False
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._run(), name="answer-writer")
+
+    async def stop(self) -> None:
+        """Перестать принимать ответы, дописать очередь и остановить писателя."""
+        if self._task is None:
+            return
+        self._closing = True
+        try:
+            if not self._task.done():
+                await self._queue.put(_STOP)
+            await self._task
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Answer writer crashed: {}", e)
+        finally:
+            # ответы, поставленные уже после _STOP, писатель не увидит
+            _fail(_drain(self._queue))
+            self._task = None
+            self._queue = None
+        logger.info("Answer writer stopped: {}", self.stats())
+
+    async def submit(self, user_id: int, question_id: int, text: str):
+        """
+        Поставить ответ в очередь и дождаться коммита его пачки.
+        При заполненной очереди ждёт свободного места (backpressure).
+        Если писатель не запущен или останавливается — пишет ответ напрямую.
+        """
+        if not self.running:
+            return await self._write_direct(user_id, question_id, text)
+        task, queue = self._task, self._queue
+        fut = asyncio.get_running_loop().create_future()
+        await queue.put((user_id, question_id, text, fut))
+        if task.done() and not fut.done():
+            # писатель завершился, пока ждали места в очереди: пачки не будет
+            fut.cancel()
+            return await self._write_direct(user_id, question_id, text)
+        return await fut
+
+    async def _write_direct(self, user_id: int, question_id: int, text: str):
+        async with self._session_factory() as db:
+            return await repo.add_answer(db, user_id, question_id, text)
+
+    # ---------- писатель ----------
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        batch: List[_Item] = []
+        stop = False
+        try:
+            while not stop:
+                item = await queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = loop.time() + self.flush_ms / 1000
+                while len(batch) < self.batch_size:
+                    try:
+                        item = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(queue.get(), timeout)
+                        except asyncio.TimeoutError:
+                            break
+                    if item is _STOP:
+                        stop = True
+                        break
+                    batch.append(item)
+                await self._flush(batch)
+        finally:
+            # при штатной остановке пачка уже записана (её future завершены),
+            # при падении — ни текущая пачка, ни очередь записаны не будут
+            _fail(batch + _drain(queue))
+
+    async def _flush(self, batch: List[_Item]) -> None:
+        try:
+            async with self._session_factory() as db:
+                results = await repo.add_answers_batch(db, [(u, q, t) for u, q, t, _ in batch])
+        except Exception as e:  # noqa: BLE001
+            self.failed_batches += 1
+            logger.warning("Answer batch of {} failed ({}), retrying one by one", len(batch), e)
+            await self._flush_one_by_one(batch)
+            return
+        self.batches += 1
+        self.items += len(batch)
+        for (_, _, _, fut), res in zip(batch, results):
+            if not fut.done():
+                fut.set_result(res)
+
+    async def _flush_one_by_one(self, batch: List[_Item]) -> None:
+        # одна «плохая» запись не должна ронять всю пачку
+        for u, q, t, fut in batch:
+            try:
+                async with self._session_factory() as db:
+                    res = await repo.add_answer(db, u, q, t)
+            except Exception as e:  # noqa: BLE001
+                if not fut.done():
+                    fut.set_exception(e)
+                continue
+            self.items += 1
+            if not fut.done():
+                fut.set_result(res)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "failed_batches": self.failed_batches,
+        }
+
+
+def _drain(queue: Optional[asyncio.Queue]) -> List[_Item]:
+    items: List[_Item] = []
+    while queue is not None and not queue.empty():
+        item = queue.get_nowait()
+        if item is not _STOP:
+            items.append(item)
+    return items
+
+
+def _fail(items: List[_Item]) -> None:
+    for _, _, _, fut in items:
+        if not fut.done():
+            fut.set_exception(RuntimeError("Answer writer stopped before the answer was written"))
+
+
+answer_writer = AnswerWriter()
+
+
+async def save_answer(db: AsyncSession, user_id: int, question_id: int, text: str):
+    """Записать ответ через писателя, а если он не запущен — напрямую."""
+    if answer_writer.running:
+        return await answer_writer.submit(user_id, question_id, text)
+    return await repo.add_answer(db, user_id, question_id, text)
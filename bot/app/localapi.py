@@ -0,0 +1,90 @@
+# app/localapi.py
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from telegram._utils.defaultvalue import DEFAULT_NONE, DefaultValue
+from telegram.request import BaseRequest, RequestData
+
+
+# Локальная заглушка Bot API: вместо HTTP-запросов к api.telegram.org отвечает
+# «успехом» правдоподобной формы и считает вызовы. Нужна, чтобы гонять
+# нагрузку через настоящий Application (webhook → очередь → обработчики → ответ)
+# без сети и без лимитов Telegram. Включается BOT_LOCAL_API=1 или передачей
+# в build_app(request=LocalTelegramRequest()).
+
+BOT_USER = {
+    "id": 1, "is_bot": True, "first_name": "TeamMeet", "username": "teammeet_local_bot",
+    "can_join_groups": False, "can_read_all_group_messages": False, "supports_inline_queries": False,
+}
+
+# методы, которые возвращают отправленное/изменённое сообщение
+_MESSAGE_METHODS = frozenset({
+    "sendMessage", "sendDocument", "sendPhoto", "editMessageText", "editMessageReplyMarkup",
+})
+
+
+class LocalTelegramRequest(BaseRequest):
+    def __init__(self, latency: float = 0.0, keep_sent: int = 1000) -> None:
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.sent: Deque[Tuple[Any, Optional[str]]] = deque(maxlen=keep_sent)
+        self._message_ids = itertools.count(1)
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return 5.0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def post(self, url: str, request_data: Optional[RequestData] = None, **timeouts: Any) -> Any:
+        # явный write_timeout: иначе PTB предупреждает о смене умолчания для загрузки файлов
+        if isinstance(timeouts.get("write_timeout", DEFAULT_NONE), DefaultValue):
+            timeouts["write_timeout"] = None
+        return await super().post(url, request_data, **timeouts)
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         read_timeout=None, write_timeout=None, connect_timeout=None,
+                         pool_timeout=None) -> Tuple[int, bytes]:
+        name = url.rsplit("/", 1)[-1]
+        params: Dict[str, Any] = request_data.parameters if request_data is not None else {}
+        self.calls[name] += 1
+        if name == "getUpdates":
+            # апдейтов нет: имитируем long polling, не нагружая цикл
+            await asyncio.sleep(min(float(params.get("timeout") or 0), 1.0))
+        elif self.latency:
+            await asyncio.sleep(self.latency)
+        return 200, json.dumps({"ok": True, "result": self._result(name, params)}).encode("utf-8")
+
+    def _result(self, name: str, params: Dict[str, Any]) -> Any:
+        if name == "getMe":
+            return BOT_USER
+        if name == "getUpdates":
+            return []
+        if name in _MESSAGE_METHODS:
+            chat_id = params.get("chat_id", 0)
+            text = params.get("text")
+            if name.startswith("send"):
+                self.sent.append((chat_id, text))
+            msg = {
+                "message_id": params.get("message_id") or next(self._message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id) if str(chat_id).lstrip("-").isdigit() else 0, "type": "private"},
+                "from": BOT_USER,
+            }
+            if text is not None:
+                msg["text"] = text
+            return msg
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"calls": dict(self.calls), "total": sum(self.calls.values())}
@@ -0,0 +1,240 @@
+# app/lookup.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram import InlineQueryResultArticle, InputTextMessageContent
+
+from .cache import TTLCache
+from .config import settings
+
+
+# Inline-поиск встреч (@bot план): запросы приходят на каждое нажатие клавиши,
+# поэтому ищем не LIKE по SQLite, а по индексу в памяти над title, department
+# и country. Индекс n-граммный: у каждого слова есть префиксы из 1–2 символов
+# (для коротких запросов) и триграммы, так что «план» найдёт и «Планирование»,
+# и «перепланировка». Кандидаты — пересечение множеств, затем проверка
+# подстрокой. Индекс строится одним запросом при первом inline-запросе, дальше
+# repo обновляет его при создании, смене статуса и удалении встречи (до
+# загрузки изменения не нужны — их прочитает сама загрузка). Готовые ответы
+# кэшируются по (версия индекса, запрос).
+
+_WORD = re.compile(r"\w+")
+_STATUS_ORDER = {"open": 0, "scheduled": 1, "draft": 2, "closed": 3}
+_EMPTY: FrozenSet[int] = frozenset()
+_STATUS_LABEL = {"open": "открыта", "scheduled": "запланирована", "draft": "черновик", "closed": "закрыта"}
+
+
+def fold(s: Optional[str]) -> str:
+    return (s or "").lower().replace("ё", "е")
+
+
+def _grams(word: str) -> Set[str]:
+    out = {"^" + word[:1], "^" + word[:2]}
+    out.update(word[i:i + 3] for i in range(len(word) - 2))
+    return out
+
+
+def _query_grams(token: str) -> Set[str]:
+    # короткое слово ищется по началу слов, длинное — по триграммам (подстрока)
+    if len(token) < 3:
+        return {"^" + token}
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _text_grams(text: str, prefix: str = "") -> Set[str]:
+    out: Set[str] = set()
+    for word in _WORD.findall(text):
+        out |= _grams(word)
+    return {prefix + g for g in out} if prefix else out
+
+
+@dataclass(frozen=True, slots=True)
+class MeetingEntry:
+    id: int
+    title: str
+    department: Optional[str]
+    country: Optional[str]
+    status: str
+    text: str                # title, department, country в fold()
+    order: int               # статический порядок: открытые, затем новые
+    grams: FrozenSet[str]    # n-граммы всего текста и отдельно названия ("t:…")
+
+    @classmethod
+    def build(cls, id: int, title: str, department: Optional[str], country: Optional[str], status: Any):
+        status = getattr(status, "value", status)
+        text = " ".join(fold(x) for x in (title, department, country) if x)
+        grams = _text_grams(text) | _text_grams(fold(title), "t:")
+        return cls(id, title, department, country, status, text,
+                   _STATUS_ORDER.get(status, len(_STATUS_ORDER)) * 2 ** 40 - id, frozenset(grams))
+
+
+class MeetingIndex:
+    def __init__(self) -> None:
+        self._entries: Dict[int, MeetingEntry] = {}
+        self._order: Dict[int, int] = {}          # id → MeetingEntry.order, ключ для heapq
+        self._postings: Dict[str, Set[int]] = {}
+        self.version = 0
+        self.ready = False
+        self._loading: Optional[asyncio.Lock] = None
+        # изменения, пришедшие от repo во время загрузки: применяются поверх неё
+        self._replay: Optional[List[Tuple[Callable, tuple]]] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ---------- изменения ----------
+
+    def _put(self, entry: MeetingEntry) -> None:
+        self._drop(entry.id)
+        self._entries[entry.id] = entry
+        self._order[entry.id] = entry.order
+        for g in entry.grams:
+            self._postings.setdefault(g, set()).add(entry.id)
+
+    def _drop(self, meeting_id: int) -> None:
+        old = self._entries.pop(meeting_id, None)
+        if old is None:
+            return
+        del self._order[meeting_id]
+        for g in old.grams:
+            ids = self._postings.get(g)
+            if ids is not None:
+                ids.discard(meeting_id)
+                if not ids:
+                    del self._postings[g]
+
+    def _set_status(self, meeting_id: int, status: Any) -> None:
+        e = self._entries.get(meeting_id)
+        if e is not None:
+            self._put(MeetingEntry.build(e.id, e.title, e.department, e.country, status))
+
+    def _change(self, fn: Callable, *args) -> None:
+        if self.ready:
+            fn(*args)
+            self.version += 1
+        elif self._replay is not None:
+            self._replay.append((fn, args))
+        # индекс ещё не загружался — загрузка прочитает встречу из базы
+
+    def put(self, meeting_id: int, title: str, department: Optional[str], country: Optional[str],
+            status: Any) -> None:
+        """Новая или изменённая встреча."""
+        self._change(self._put, MeetingEntry.build(meeting_id, title, department, country, status))
+
+    def set_status(self, meeting_id: int, status: Any) -> None:
+        self._change(self._set_status, meeting_id, status)
+
+    def remove(self, meeting_id: int) -> None:
+        self._change(self._drop, meeting_id)
+
+    def load(self, rows: Iterable) -> None:
+        """Полная загрузка строками (id, title, department, country, status)."""
+        self._entries.clear()
+        self._order.clear()
+        self._postings.clear()
+        for r in rows:
+            self._put(MeetingEntry.build(r.id, r.title, r.department, r.country, r.status))
+        for fn, args in self._replay or ():
+            fn(*args)
+        self._replay = None
+        self.ready = True
+        self.version += 1
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if self.ready:
+            return
+        if self._loading is None:
+            self._loading = asyncio.Lock()
+        async with self._loading:
+            if not self.ready:
+                from . import repo  # repo сам импортирует этот модуль
+                self._replay = []
+                try:
+                    rows = await repo.meeting_index_rows(db)
+                except BaseException:
+                    self._replay = None
+                    raise
+                self.load(rows)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._order.clear()
+        self._postings.clear()
+        self._replay = None
+        self.ready = False
+        self.version += 1
+
+    # ---------- поиск ----------
+
+    def _lookup(self, grams: Iterable[str]) -> Set[int]:
+        # пересечение от самого короткого списка; пустое, если n-граммы нет
+        sets = sorted((self._postings.get(g, _EMPTY) for g in grams), key=len)
+        return sets[0].intersection(*sets[1:]) if sets else set(self._entries)
+
+    def search(self, query: str, limit: int) -> List[MeetingEntry]:
+        """
+        Встречи, в которых есть все слова запроса (подстрокой; слово короче
+        трёх букв — началом слова). Сначала те, где все слова есть в
+        названии, внутри — открытые, затем новые.
+        """
+        tokens = _WORD.findall(fold(query))
+        grams = {g for t in tokens for g in _query_grams(t)}
+        found = self._lookup(grams)
+        in_title = found & self._lookup("t:" + g for g in grams) if tokens else found
+        # триграммы слова — необходимое условие; подстрокой проверяются только
+        # отобранные строки
+        long_tokens = [t for t in tokens if len(t) >= 3]
+        out: List[MeetingEntry] = []
+        for ids in (in_title, found - in_title):
+            while ids and len(out) < limit:
+                picked = heapq.nsmallest(limit - len(out), ids, key=self._order.__getitem__)
+                ids = ids.difference(picked)
+                out.extend(e for e in map(self._entries.__getitem__, picked)
+                           if all(t in e.text for t in long_tokens))
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {"meetings": len(self._entries), "grams": len(self._postings), "ready": self.ready,
+                "version": self.version}
+
+
+meeting_index = MeetingIndex()
+
+
+# ---------- Ответ на inline-запрос ----------
+
+# (версия индекса, запрос) → готовые результаты; изменение встреч меняет версию
+inline_cache: TTLCache[tuple, list] = TTLCache(
+    maxsize=settings.INLINE_QUERY_CACHE_SIZE,
+    ttl=settings.INLINE_QUERY_CACHE_TTL,
+)
+
+
+def _article(e: MeetingEntry) -> InlineQueryResultArticle:
+    status = _STATUS_LABEL.get(e.status, e.status)
+    where = " · ".join(x for x in (e.department, e.country) if x)
+    text = f"📅 {e.title}\nСтатус: {status}" + (f"\n{where}" if where else "")
+    if e.status == "open":
+        text += f"\nЗаполнить анкету: /fill {e.id}"
+    return InlineQueryResultArticle(
+        id=str(e.id),
+        title=e.title,
+        description=" · ".join(x for x in (status, where) if x),
+        input_message_content=InputTextMessageContent(text),
+    )
+
+
+async def inline_results(db: AsyncSession, query: str) -> List[InlineQueryResultArticle]:
+    await meeting_index.ensure_loaded(db)
+    key = (meeting_index.version, " ".join(_WORD.findall(fold(query))))
+    results = inline_cache.get(key)
+    if results is None:
+        results = [_article(e) for e in meeting_index.search(query, settings.INLINE_MAX_RESULTS)]
+        inline_cache.set(key, results)
+    return results
@@ -0,0 +1,62 @@
+# app/maintenance.py
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from loguru import logger
+
+from .config import settings
+from .db import SessionLocal
+from . import repo
+
+
+class SessionCompactor:
+    """
+    Фоновая задача: раз в interval секунд удаляет старые неактивные/истёкшие сессии
+    и просроченные состояния анкет.
+    """
+
+    def __init__(self, session_factory=SessionLocal, interval: Optional[float] = None,
+                 retention: Optional[timedelta] = None) -> None:
+        self._session_factory = session_factory
+        self.interval = interval or settings.SESSION_COMPACT_INTERVAL_SEC
+        self.retention = retention or timedelta(days=settings.SESSION_RETENTION_DAYS)
+        self._task: Optional[asyncio.Task] = None
+        self.pruned = 0
+
+    async def run_once(self) -> int:
+        async with self._session_factory() as db:
+            n = await repo.prune_sessions(db, self.retention)
+            # брошенные анкеты персистентного FSM-хранилища
+            stale = datetime.utcnow() - timedelta(seconds=settings.FSM_TTL_SEC)
+            n_fsm = await repo.prune_fill_states(db, stale)
+        self.pruned += n
+        if n or n_fsm:
+            logger.info("Pruned {} tg_sessions older than {} and {} stale fsm states", n, self.retention, n_fsm)
+        return n
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:  # noqa: BLE001 — задача не должна умирать из-за сбоя БД
+                logger.warning("Session compaction failed: {}", e)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="session-compactor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+session_compactor = SessionCompactor()
@@ -0,0 +1,223 @@
+# app/metrics.py
+from __future__ import annotations
+
+import bisect
+import contextvars
+import time
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import event
+from telegram.ext import Application, ApplicationHandlerStop, CommandHandler
+
+from .config import settings
+from . import querylog
+
+
+# Метрики обработчиков: каждый обработчик из build_app() оборачивается,
+# и на время его работы в contextvar лежит RequestTrace. Слушатели
+# before/after_cursor_execute движка SQLAlchemy дописывают в текущий trace
+# каждый SQL-запрос (текст и время), поэтому запросы привязываются к команде
+# без изменений в repo. Медленные запросы (дольше SLOW_REQUEST_MS) пишутся
+# в лог вместе со списком SQL, профиль отдельных запросов — app/querylog.py.
+# Снимок отдаётся в текстовом формате Prometheus.
+
+BUCKETS_SEC = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_LOG_QUERIES = 20
+
+
+@dataclass(slots=True)
+class RequestTrace:
+    handler: str
+    statements: int = 0
+    sql_sec: float = 0.0
+    queries: List[Tuple[str, float]] = field(default_factory=list)  # первые SLOW_LOG_QUERIES
+    profile: Optional[querylog.QueryProfile] = None                  # при QUERY_PROFILE=prod|dev
+
+
+@dataclass(slots=True)
+class HandlerStats:
+    buckets: List[int] = field(default_factory=lambda: [0] * (len(BUCKETS_SEC) + 1))
+    count: int = 0
+    sum_sec: float = 0.0
+    errors: int = 0
+    statements: int = 0
+    sql_sec: float = 0.0
+
+    def observe(self, seconds: float, trace: RequestTrace, failed: bool) -> None:
+        self.buckets[bisect.bisect_left(BUCKETS_SEC, seconds)] += 1
+        self.count += 1
+        self.sum_sec += seconds
+        self.errors += failed
+        self.statements += trace.statements
+        self.sql_sec += trace.sql_sec
+
+
+_current: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+_handlers: Dict[str, HandlerStats] = {}
+_gauges: Dict[str, Tuple[str, Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]]] = {}
+_engine = None  # для EXPLAIN медленных запросов
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current.get()
+
+
+def handler_stats() -> Dict[str, HandlerStats]:
+    return _handlers
+
+
+def reset() -> None:
+    _handlers.clear()
+
+
+# ---------- SQL ----------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("metrics_t0")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    querylog.count_statement(statement)
+    trace = _current.get()
+    if trace is None:
+        return
+    trace.statements += 1
+    trace.sql_sec += elapsed
+    if len(trace.queries) < SLOW_LOG_QUERIES:
+        trace.queries.append((statement, elapsed))
+    if trace.profile is not None:
+        trace.profile.record(statement, parameters, elapsed, executemany)
+
+
+def instrument_engine(engine) -> None:
+    """Подписать движок (AsyncEngine или Engine) на учёт SQL; повторный вызов ничего не делает."""
+    global _engine
+    sync = getattr(engine, "sync_engine", engine)
+    if sync is not engine:
+        _engine = engine
+    if not event.contains(sync, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------- обработчики ----------
+
+def handler_name(handler) -> str:
+    if isinstance(handler, CommandHandler):
+        return "/" + sorted(handler.commands)[0]
+    return getattr(handler.callback, "__name__", type(handler).__name__)
+
+
+def timed(name: str, callback: Callable) -> Callable:
+    """Обёртка обработчика: время, ошибки и SQL запроса под именем name."""
+
+    @wraps(callback)
+    async def wrapper(update, context, *args, **kwargs):
+        trace = RequestTrace(name, profile=querylog.QueryProfile() if querylog.enabled() else None)
+        token = _current.set(trace)
+        started = time.perf_counter()
+        failed = False
+        try:
+            return await callback(update, context, *args, **kwargs)
+        except ApplicationHandlerStop:
+            raise
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            _handlers.setdefault(name, HandlerStats()).observe(elapsed, trace, failed)
+            if elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+                _log_slow(trace, elapsed, update)
+            if trace.profile is not None:
+                await querylog.report(trace.profile, name, _engine)
+
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
+
+
+def _log_slow(trace: RequestTrace, elapsed: float, update: Any) -> None:
+    chat = getattr(getattr(update, "effective_chat", None), "id", None)
+    lines = [f"  {ms * 1000:8.1f} ms  {' '.join(sql.split())[:300]}" for sql, ms in trace.queries]
+    if trace.statements > len(trace.queries):
+        lines.append(f"  … ещё {trace.statements - len(trace.queries)} запросов")
+    logger.warning(
+        "Slow request {} in chat {}: {:.0f} ms, {} SQL statements, {:.0f} ms in SQL\n{}",
+        trace.handler, chat, elapsed * 1000, trace.statements, trace.sql_sec * 1000, "\n".join(lines),
+    )
+
+
+def instrument_app(app: Application) -> int:
+    """Обернуть все зарегистрированные обработчики; вернуть их число."""
+    n = 0
+    for handlers in app.handlers.values():
+        for h in handlers:
+            if not getattr(h.callback, "__metrics_wrapped__", False):
+                h.callback = timed(handler_name(h), h.callback)
+                n += 1
+    return n
+
+
+# ---------- Prometheus ----------
+
+def register_gauge(name: str, help_text: str,
+                   collect: Callable[[], Dict[Tuple[Tuple[str, str], ...], float]]) -> None:
+    """Gauge, значения которого читаются при каждом снимке: {((метка, значение), ...): число}."""
+    _gauges[name] = (help_text, collect)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs: Tuple[Tuple[str, str], ...]) -> str:
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}" if pairs else ""
+
+
+def _num(x: float) -> str:
+    return repr(float(x)) if not float(x).is_integer() else str(int(x))
+
+
+def render_prometheus() -> str:
+    out: List[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        out.append(f"# HELP {name} {help_text}")
+        out.append(f"# TYPE {name} {kind}")
+
+    items = sorted(_handlers.items())
+    family("bot_handler_latency_seconds", "histogram", "Время обработки апдейта обработчиком")
+    for name, st in items:
+        cumulative = 0
+        for le, n in zip(BUCKETS_SEC + (float("inf"),), st.buckets):
+            cumulative += n
+            bound = "+Inf" if le == float("inf") else repr(le)
+            out.append(f"bot_handler_latency_seconds_bucket{_labels((('handler', name), ('le', bound)))} {cumulative}")
+        out.append(f"bot_handler_latency_seconds_sum{_labels((('handler', name),))} {_num(st.sum_sec)}")
+        out.append(f"bot_handler_latency_seconds_count{_labels((('handler', name),))} {st.count}")
+    for metric, kind, help_text, attr in (
+        ("bot_handler_errors_total", "counter", "Обработчик завершился исключением", "errors"),
+        ("bot_handler_sql_statements_total", "counter", "SQL-запросов, выполненных обработчиком", "statements"),
+        ("bot_handler_sql_seconds_total", "counter", "Время SQL-запросов обработчика", "sql_sec"),
+    ):
+        family(metric, kind, help_text)
+        for name, st in items:
+            out.append(f"{metric}{_labels((('handler', name),))} {_num(getattr(st, attr))}")
+    for name, (help_text, collect) in sorted(_gauges.items()):
+        try:
+            values = collect()
+        except Exception as e:  # noqa: BLE001 — сломанный сборщик не должен ронять /metrics
+            logger.warning("Gauge {} failed: {}", name, e)
+            continue
+        family(name, "gauge", help_text)
+        for labels, value in sorted(values.items()):
+            out.append(f"{name}{_labels(labels)} {_num(value)}")
+    return "\n".join(out) + "\n"
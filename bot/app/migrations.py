@@ -0,0 +1,205 @@
+# app/migrations.py
+from __future__ import annotations
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import OperationalError
+
+from .db import Base
+
+
+# Идемпотентные миграции для уже существующих баз (bot.db, созданных из init.sql
+# или старыми версиями моделей). create_all не трогает существующие таблицы,
+# поэтому недостающие индексы досоздаются здесь. Запускается из init_db.
+
+
+_DUPLICATE_RESPONSES = text("""
+    SELECT 1 FROM responses GROUP BY user_id, meeting_id HAVING COUNT(*) > 1 LIMIT 1
+""")
+
+# ответы дублирующих анкет переносим в самую раннюю анкету пары (user_id, meeting_id)
+_MERGE_DUPLICATE_ANSWERS = text("""
+    UPDATE answers SET response_id = (
+        SELECT MIN(k.id) FROM responses r
+        JOIN responses k ON k.user_id = r.user_id AND k.meeting_id = r.meeting_id
+        WHERE r.id = answers.response_id
+    )
+    WHERE response_id IN (
+        SELECT r.id FROM responses r
+        WHERE EXISTS (SELECT 1 FROM responses k
+                      WHERE k.user_id = r.user_id AND k.meeting_id = r.meeting_id AND k.id < r.id)
+    )
+""")
+
+_DELETE_DUPLICATE_RESPONSES = text("""
+    DELETE FROM responses
+    WHERE EXISTS (SELECT 1 FROM responses k
+                  WHERE k.user_id = responses.user_id AND k.meeting_id = responses.meeting_id
+                    AND k.id < responses.id)
+""")
+
+
+def dedup_responses(conn: Connection) -> int:
+    """Схлопывает повторные анкеты одного пользователя по одной встрече."""
+    if conn.execute(_DUPLICATE_RESPONSES).first() is None:
+        return 0
+    conn.execute(_MERGE_DUPLICATE_ANSWERS)
+    removed = conn.execute(_DELETE_DUPLICATE_RESPONSES).rowcount
+    logger.warning("Merged {} duplicate responses before creating unique index", removed)
+    return removed
+
+
+# повторные ответы на вопрос в анкете: все значения — в журнал, в answers — последнее
+_ARCHIVE_DUPLICATE_ANSWERS = text("""
+    INSERT INTO answer_revisions (response_id, question_id, value, recorded_at)
+    SELECT a.response_id, a.question_id, a.value, NULL
+    FROM answers a
+    JOIN (SELECT response_id, question_id FROM answers
+          GROUP BY response_id, question_id HAVING COUNT(*) > 1) d
+      ON d.response_id = a.response_id AND d.question_id = a.question_id
+    ORDER BY a.id
+""")
+
+_DELETE_DUPLICATE_ANSWERS = text("""
+    DELETE FROM answers WHERE id NOT IN (
+        SELECT MAX(id) FROM answers GROUP BY response_id, question_id
+    )
+""")
+
+
+def dedup_answers(conn: Connection) -> int:
+    """
+    Оставляет один (последний) ответ на вопрос в анкете перед созданием
+    uq_answers_response_question. Проверка — только пока индекса нет.
+    """
+    if "uq_answers_response_question" in _indexes(conn, "answers"):
+        return 0
+    archived = conn.execute(_ARCHIVE_DUPLICATE_ANSWERS).rowcount
+    if not archived:
+        return 0
+    removed = conn.execute(_DELETE_DUPLICATE_ANSWERS).rowcount
+    logger.warning("Removed {} superseded answers ({} values kept in answer_revisions)", removed, archived)
+    return removed
+
+
+def _indexes(conn: Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA index_list({table})")}
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def upgrade_sessions(conn: Connection) -> None:
+    """
+    tg_sessions раньше дописывал строку на каждый /login. Оставляем одну строку
+    на telegram_id (активную, иначе самую свежую) и добавляем expires_at.
+    """
+    if "expires_at" not in _columns(conn, "tg_sessions"):
+        conn.exec_driver_sql("ALTER TABLE tg_sessions ADD COLUMN expires_at DATETIME")
+    if "uq_tg_sessions_telegram_id" in _indexes(conn, "tg_sessions"):
+        return
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_tg_sessions_telegram_active")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_tg_sessions_telegram_id")
+    removed = conn.execute(text("""
+        DELETE FROM tg_sessions WHERE id NOT IN (
+            SELECT (SELECT s.id FROM tg_sessions s
+                    WHERE s.telegram_id = t.telegram_id
+                    ORDER BY s.is_active DESC, s.id DESC LIMIT 1)
+            FROM (SELECT DISTINCT telegram_id FROM tg_sessions) t
+        )
+    """)).rowcount
+    if removed:
+        logger.info("Compacted tg_sessions: removed {} stale rows", removed)
+
+
+def add_missing_columns(conn: Connection) -> None:
+    """Колонки, добавленные в модели после создания таблиц."""
+    if "answers" not in _columns(conn, "fsm_states"):
+        conn.exec_driver_sql("ALTER TABLE fsm_states ADD COLUMN answers TEXT")
+    if "opens_at" not in _columns(conn, "meetings"):
+        conn.exec_driver_sql("ALTER TABLE meetings ADD COLUMN opens_at DATETIME")
+
+
+def ensure_indexes(conn: Connection) -> None:
+    """Создаёт индексы из моделей, которых ещё нет в базе (CREATE INDEX IF NOT EXISTS)."""
+    dedup_responses(conn)
+    dedup_answers(conn)  # после слияния анкет: оно само может дать повторы
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+# ---------- Полнотекстовый поиск ----------
+
+# FTS5-индексы для /search (app/search.py) по встречам, вопросам и ответам.
+# Индексы contentless (content=''): тексты уже лежат в основных таблицах,
+# копия на миллион ответов не нужна. Синхронизацию держат триггеры. unicode61
+# не сводит «ё» к «е», поэтому в индекс текст попадает через fold_yo. При
+# удалении из contentless-индекса нужно передать ровно те же значения, что и
+# при вставке, и триггеры это обеспечивают. prefix='2 3' ускоряет запросы
+# «слово*», которыми search заменяет отсутствующий стеммер.
+
+SEARCH_TOKENIZE = "unicode61 remove_diacritics 2"
+SEARCH_INDEXES = {
+    # индекс: (таблица, индексируемые колонки)
+    "meetings_fts": ("meetings", ("title", "description")),
+    "questions_fts": ("questions", ("text",)),
+    "answers_fts": ("answers", ("value",)),
+}
+
+
+def fold_yo(expr: str) -> str:
+    """SQL-выражение: expr с «ё» → «е» (как search.normalize)."""
+    return f"replace(replace({expr}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def search_triggers(fts: str) -> list[str]:
+    table, cols = SEARCH_INDEXES[fts]
+    names = ", ".join(cols)
+    new = ", ".join(fold_yo(f"new.{c}") for c in cols)
+    old = ", ".join(fold_yo(f"old.{c}") for c in cols)
+    insert_new = f"INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new});"
+    delete_old = f"INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old});"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {names} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def ensure_search_indexes(conn: Connection) -> None:
+    """
+    Создаёт FTS5-индексы и триггеры, если их нет. Новый индекс заполняется
+    из существующих строк. Без FTS5 в сборке SQLite поиск просто недоступен.
+    """
+    existing = {row[0] for row in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%_fts'"
+    )}
+    for fts, (table, cols) in SEARCH_INDEXES.items():
+        if fts not in existing:
+            names = ", ".join(cols)
+            try:
+                conn.exec_driver_sql(
+                    f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='', "
+                    f"tokenize='{SEARCH_TOKENIZE}', prefix='2 3')"
+                )
+            except OperationalError as e:
+                logger.warning("Full-text search disabled, FTS5 is not available: {}", e)
+                return
+            filled = conn.exec_driver_sql(
+                f"INSERT INTO {fts} (rowid, {names}) "
+                f"SELECT id, {', '.join(fold_yo(c) for c in cols)} FROM {table}"
+            ).rowcount
+            logger.info("Built search index {}: {} rows", fts, filled)
+        for ddl in search_triggers(fts):
+            conn.exec_driver_sql(ddl)
+
+
+def run_migrations(conn: Connection) -> None:
+    upgrade_sessions(conn)
+    add_missing_columns(conn)
+    ensure_indexes(conn)
+    ensure_search_indexes(conn)
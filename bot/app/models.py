@@ -11,6 +11,7 @@ from sqlalchemy import (
     DateTime,
     Text,
     Enum,
+    Index,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
@@ -52,7 +53,7 @@ class User(Base):
     telegram_id: Mapped[int | None] = mapped_column(nullable=True, index=True)         # теперь nullable
     fio: Mapped[str | None] = mapped_column(String(255), nullable=True)
     email: Mapped[str | None] = mapped_column(String(255), nullable=True)
-    role_id: Mapped[int | None] = mapped_column(ForeignKey("roles.id"))
+    role_id: Mapped[int | None] = mapped_column(ForeignKey("roles.id"), index=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
@@ -60,13 +61,19 @@ class User(Base):
 
 
 class TgSession(Base):
+    """Сессия Telegram-аккаунта: не более одной строки на telegram_id (обновляется при /login)."""
     __tablename__ = "tg_sessions"
+    __table_args__ = (
+        Index("uq_tg_sessions_telegram_id", "telegram_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    telegram_id: Mapped[int] = mapped_column(index=True)
+    telegram_id: Mapped[int] = mapped_column()
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    # окончание сессии: по TTL для активной, момент выхода — для неактивной; NULL — бессрочно
+    expires_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
 
 
 class Meeting(Base):
@@ -77,8 +84,9 @@ class Meeting(Base):
     description: Mapped[str | None] = mapped_column(Text(), nullable=True)
     department: Mapped[str | None] = mapped_column(String(128), nullable=True)
     country: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    opens_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     deadline_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
-    status: Mapped[MeetingStatus] = mapped_column(Enum(MeetingStatus), default=MeetingStatus.draft)
+    status: Mapped[MeetingStatus] = mapped_column(Enum(MeetingStatus), default=MeetingStatus.draft, index=True)
     created_by: Mapped[int | None] = mapped_column(ForeignKey("users.id"))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
@@ -91,6 +99,9 @@ class Meeting(Base):
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_meeting_order", "meeting_id", "order_idx"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     meeting_id: Mapped[int] = mapped_column(ForeignKey("meetings.id", ondelete="CASCADE"))
@@ -110,7 +121,7 @@ class Option(Base):
     __tablename__ = "options"
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    question_id: Mapped[int] = mapped_column(ForeignKey("questions.id", ondelete="CASCADE"))
+    question_id: Mapped[int] = mapped_column(ForeignKey("questions.id", ondelete="CASCADE"), index=True)
     value: Mapped[str] = mapped_column(String(128))
     label: Mapped[str | None] = mapped_column(String(128), nullable=True)
 
@@ -119,18 +130,85 @@ class Option(Base):
 
 class Response(Base):
     __tablename__ = "responses"
+    __table_args__ = (
+        # одна анкета на пару (пользователь, встреча)
+        Index("uq_responses_user_meeting", "user_id", "meeting_id", unique=True),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
-    meeting_id: Mapped[int] = mapped_column(ForeignKey("meetings.id"))
+    meeting_id: Mapped[int] = mapped_column(ForeignKey("meetings.id"), index=True)
     submitted_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     status: Mapped[str] = mapped_column(String(16), default="draft")  # draft | submitted
 
 
 class Answer(Base):
     __tablename__ = "answers"
+    __table_args__ = (
+        # один (последний) ответ на вопрос в анкете; прежние значения — в answer_revisions
+        Index("uq_answers_response_question", "response_id", "question_id", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    response_id: Mapped[int] = mapped_column(ForeignKey("responses.id", ondelete="CASCADE"), index=True)
+    question_id: Mapped[int] = mapped_column(ForeignKey("questions.id", ondelete="CASCADE"), index=True)
+    value: Mapped[str] = mapped_column(Text())
+
+
+class AnswerRevision(Base):
+    """Журнал записанных значений ответов (аудит); пишется фоном, app/audit.py."""
+    __tablename__ = "answer_revisions"
+    __table_args__ = (
+        Index("ix_answer_revisions_response_question", "response_id", "question_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     response_id: Mapped[int] = mapped_column(ForeignKey("responses.id", ondelete="CASCADE"))
     question_id: Mapped[int] = mapped_column(ForeignKey("questions.id", ondelete="CASCADE"))
     value: Mapped[str] = mapped_column(Text())
+    recorded_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class FsmState(Base):
+    """Состояние прохождения анкеты (персистентный бэкенд app/fsm.py)."""
+    __tablename__ = "fsm_states"
+
+    chat_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    meeting_id: Mapped[int] = mapped_column(ForeignKey("meetings.id", ondelete="CASCADE"), index=True)
+    current_q_idx: Mapped[int] = mapped_column(Integer, default=0)
+    answers: Mapped[str | None] = mapped_column(Text(), nullable=True)  # JSON {question_id: value}
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, index=True)
+
+
+class Broadcast(Base):
+    """Рассылка: текст и аудитория фиксируются при создании (строки outbox)."""
+    __tablename__ = "broadcasts"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(32))  # announce | nudge
+    meeting_id: Mapped[int | None] = mapped_column(
+        ForeignKey("meetings.id", ondelete="SET NULL"), nullable=True, index=True,
+    )
+    text: Mapped[str] = mapped_column(Text())
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class OutboxMessage(Base):
+    """Одно сообщение рассылки; переживает перезапуск бота."""
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("uq_outbox_broadcast_chat", "broadcast_id", "chat_id", unique=True),
+        Index("ix_outbox_status_next", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    broadcast_id: Mapped[int] = mapped_column(ForeignKey("broadcasts.id", ondelete="CASCADE"))
+    chat_id: Mapped[int] = mapped_column()
+    status: Mapped[str] = mapped_column(String(16), default="pending")  # pending | sent | failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text(), nullable=True)
@@ -0,0 +1,169 @@
+# app/provisioning.py
+from __future__ import annotations
+
+import csv
+import secrets
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from .config import settings
+from .db import SessionLocal
+from .models import User
+from . import repo, security
+
+
+# Массовое создание пользователей из CSV: username, fio, email, role[, password].
+# Файл читается потоково, пачками по PROVISION_BATCH_SIZE строк, поэтому
+# размер файла на память не влияет. На пачку: один SELECT уже занятых логинов
+# (для них bcrypt не считается), хеширование в отдельном пуле процессов,
+# один INSERT … ON CONFLICT DO NOTHING RETURNING и commit — транзакция
+# записи не держится, пока считается bcrypt. Роли по имени (или id)
+# разрешаются по одному list_roles на весь импорт. Пустой password —
+# пароль генерируется и попадает в файл credentials.
+
+DEFAULT_ROLE = "Участник"
+MAX_PROBLEMS = 50  # сколько конфликтов и ошибок перечислять в отчёте
+
+
+@dataclass(slots=True)
+class ProvisionReport:
+    created: int = 0
+    conflicts: int = 0
+    errors: int = 0
+    generated: int = 0                                   # паролей записано в credentials
+    problems: List[str] = field(default_factory=list)    # первые MAX_PROBLEMS: «строка N: …»
+
+    def problem(self, line: int, message: str) -> None:
+        if len(self.problems) < MAX_PROBLEMS:
+            self.problems.append(f"строка {line}: {message}")
+
+
+@dataclass(slots=True)
+class _Row:
+    line: int
+    username: str
+    fio: Optional[str]
+    email: Optional[str]
+    role_id: int
+    password: str
+    generated: bool
+
+
+def _parse_row(line: int, row: Dict[str, Any], roles: Dict[str, int]) -> _Row:
+    """Строка CSV → _Row; ValueError с описанием, если строка некорректна."""
+    username = (row.get("username") or "").strip()
+    if not username:
+        raise ValueError("пустой username")
+    if len(username) > 64 or any(c.isspace() for c in username):
+        raise ValueError(f"недопустимый username {username!r}")
+    fio = (row.get("fio") or "").strip() or None
+    email = (row.get("email") or "").strip() or None
+    if email and ("@" not in email or len(email) > 255):
+        raise ValueError(f"некорректный email {email!r}")
+    role = (row.get("role") or "").strip() or DEFAULT_ROLE
+    role_id = roles.get(role.lower())
+    if role_id is None and role.isdigit() and int(role) in roles.values():
+        role_id = int(role)
+    if role_id is None:
+        raise ValueError(f"неизвестная роль {role!r}")
+    password = (row.get("password") or "").strip()
+    return _Row(line, username, fio, email, role_id,
+                password or secrets.token_urlsafe(9), generated=not password)
+
+
+async def provision_users(
+    lines: Iterable[str],
+    credentials: Optional[IO[str]] = None,
+    session_factory=SessionLocal,
+    executor: Optional[Executor] = None,
+    batch_size: Optional[int] = None,
+) -> ProvisionReport:
+    """
+    Создать пользователей из CSV (lines — открытый текстовый файл или список строк).
+    credentials получает CSV «username,password» для сгенерированных паролей.
+    executor — пул для bcrypt; по умолчанию на время импорта поднимается
+    ProcessPoolExecutor(PROVISION_WORKERS).
+    """
+    batch_size = batch_size or settings.PROVISION_BATCH_SIZE
+    report = ProvisionReport()
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or "username" not in [f.strip() for f in reader.fieldnames]:
+        raise ValueError("в заголовке CSV нужна колонка username")
+    reader.fieldnames = [f.strip().lower() for f in reader.fieldnames]
+
+    async with session_factory() as db:
+        roles = {r.name.lower(): r.id for r in await repo.list_roles(db)}
+    out = csv.writer(credentials) if credentials is not None else None
+    if out is not None:
+        out.writerow(["username", "password"])
+
+    own_pool = executor is None
+    executor = executor or ProcessPoolExecutor(max_workers=settings.PROVISION_WORKERS)
+    try:
+        batch: Dict[str, _Row] = {}
+        for row in reader:
+            try:
+                parsed = _parse_row(reader.line_num, row, roles)
+            except ValueError as e:
+                report.errors += 1
+                report.problem(reader.line_num, str(e))
+                continue
+            if parsed.username in batch:
+                report.conflicts += 1
+                report.problem(parsed.line, f"{parsed.username} повторяется в файле")
+                continue
+            batch[parsed.username] = parsed
+            if len(batch) >= batch_size:
+                await _flush(list(batch.values()), report, out, session_factory, executor)
+                batch.clear()
+        if batch:
+            await _flush(list(batch.values()), report, out, session_factory, executor)
+    finally:
+        if own_pool:
+            executor.shutdown(wait=False, cancel_futures=True)
+    return report
+
+
+async def _flush(batch: List[_Row], report: ProvisionReport, out, session_factory, executor: Executor) -> None:
+    async with session_factory() as db:
+        taken = set((await db.execute(
+            select(User.username).where(User.username.in_([r.username for r in batch]))
+        )).scalars())
+    todo = []
+    for r in batch:
+        if r.username in taken:
+            report.conflicts += 1
+            report.problem(r.line, f"{r.username} уже существует")
+        else:
+            todo.append(r)
+    if not todo:
+        return
+
+    hashes = await security.hash_passwords([r.password for r in todo], executor, settings.PROVISION_BCRYPT_ROUNDS)
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        # логин могли занять, пока считался bcrypt — такие строки не вставятся
+        inserted = set((await db.execute(
+            sqlite_insert(User).on_conflict_do_nothing().returning(User.username),
+            [
+                {"username": r.username, "fio": r.fio, "email": r.email, "role_id": r.role_id,
+                 "password_hash": h, "is_active": True, "created_at": now}
+                for r, h in zip(todo, hashes)
+            ],
+        )).scalars())
+        await db.commit()
+
+    for r in todo:
+        if r.username not in inserted:
+            report.conflicts += 1
+            report.problem(r.line, f"{r.username} уже существует")
+            continue
+        report.created += 1
+        if r.generated and out is not None:
+            out.writerow([r.username, r.password])
+            report.generated += 1
@@ -0,0 +1,119 @@
+# app/querylog.py
+from __future__ import annotations
+
+import contextvars
+import re
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from .config import settings
+
+
+# Профиль SQL внутри запроса (QUERY_PROFILE):
+#   off  — ничего не собирается, только счётчики app/metrics.py;
+#   prod — отпечатки запросов (SQL без литералов и с IN (?) вместо списков):
+#          отпечаток, повторившийся за запрос N_PLUS_ONE_THRESHOLD раз и больше,
+#          логируется как кандидат в N+1; запросы дольше SLOW_QUERY_MS — с их
+#          EXPLAIN QUERY PLAN;
+#   dev  — то же, плюс сводка отпечатков каждого запроса в лог (DEBUG).
+# Сбор идёт из тех же слушателей курсора, что и метрики (metrics.RequestTrace).
+# Отдельно — counting(): счётчик запросов на участок кода для бюджетов в тестах.
+
+OFF, PROD, DEV = "off", "prod", "dev"
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_\w+\]\)?")
+_SPACES = re.compile(r"\s+")
+
+
+def enabled() -> bool:
+    return settings.QUERY_PROFILE in (PROD, DEV)
+
+
+def fingerprint(sql: str) -> str:
+    """Нормализованный SQL: литералы → ?, списки IN/VALUES схлопнуты, пробелы сжаты."""
+    s = _STRING.sub("?", sql)
+    s = _NUMBER.sub("?", s)
+    s = _POSTCOMPILE.sub("(?)", s)
+    s = _IN_LIST.sub("(?)", s)
+    s = _VALUES_LIST.sub(r"\1", s)
+    return _SPACES.sub(" ", s).strip()
+
+
+@dataclass(slots=True)
+class QueryProfile:
+    fingerprints: Counter = field(default_factory=Counter)
+    slow: List[Tuple[str, Any, float]] = field(default_factory=list)  # (sql, параметры, сек)
+
+    def record(self, statement: str, parameters: Any, elapsed: float, executemany: bool) -> None:
+        self.fingerprints[fingerprint(statement)] += 1
+        if elapsed * 1000 >= settings.SLOW_QUERY_MS and not executemany:
+            self.slow.append((statement, parameters, elapsed))
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Кандидаты в N+1: отпечатки, выполненные за запрос threshold раз и больше."""
+        threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+
+async def explain(engine, statement: str, parameters: Any) -> List[str]:
+    """EXPLAIN QUERY PLAN отдельным соединением (сам запрос не выполняется)."""
+    async with engine.connect() as conn:
+        rows = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters or ())).all()
+    return [row[-1] for row in rows]
+
+
+async def report(profile: QueryProfile, handler: str, engine=None) -> None:
+    """Записать в лог находки по запросу: N+1, медленные запросы с планом, сводку (dev)."""
+    for fp, n in profile.repeated():
+        logger.warning("N+1 candidate in {}: {}× {}", handler, n, fp[:500])
+    for statement, parameters, elapsed in profile.slow:
+        plan: List[str] = []
+        if engine is not None:
+            try:
+                plan = await explain(engine, statement, parameters)
+            except Exception as e:  # noqa: BLE001 — план не обязателен
+                plan = [f"(EXPLAIN не удался: {e})"]
+        logger.warning(
+            "Slow query in {}: {:.0f} ms\n  {}\n  plan: {}",
+            handler, elapsed * 1000, " ".join(statement.split())[:1000], " | ".join(plan) or "—",
+        )
+    if settings.QUERY_PROFILE == DEV and profile.fingerprints:
+        logger.debug("SQL profile of {}:\n{}", handler, "\n".join(
+            f"  {n:4d}× {fp[:300]}" for fp, n in profile.fingerprints.most_common()
+        ))
+
+
+# ---------- Счётчики участков кода ----------
+
+@dataclass(slots=True)
+class QueryCount:
+    statements: int = 0
+    queries: List[str] = field(default_factory=list)
+
+
+_counters: contextvars.ContextVar[Tuple[QueryCount, ...]] = contextvars.ContextVar("query_counters", default=())
+
+
+@contextmanager
+def counting() -> Iterator[QueryCount]:
+    """Считать SQL, выполненные внутри блока (вложенные блоки учитываются во всех внешних)."""
+    qc = QueryCount()
+    token = _counters.set(_counters.get() + (qc,))
+    try:
+        yield qc
+    finally:
+        _counters.reset(token)
+
+
+def count_statement(statement: str) -> None:
+    for qc in _counters.get():
+        qc.statements += 1
+        qc.queries.append(statement)
@@ -0,0 +1,204 @@
+# app/questionnaire.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from .cache import question_set_cache
+from .models import MeetingStatus, QuestionType
+from . import repo
+
+
+# Анкета /fill: вопросы и варианты встречи загружаются одним снимком
+# (два запроса) и кэшируются до изменения встречи, дальше прохождение
+# анкеты идёт без обращений к БД — проверка ответов локальная,
+# запись — одной пачкой в конце.
+
+
+# ---------- Снимок встречи ----------
+
+@dataclass(frozen=True, slots=True)
+class OptionView:
+    value: str
+    label: str
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionView:
+    id: int
+    text: str
+    type: QuestionType
+    is_required: bool
+    options: Tuple[OptionView, ...] = ()
+
+    @property
+    def kind(self) -> QuestionType:
+        """Тип для ввода: choice/multi без вариантов отвечаются текстом."""
+        if self.type in (QuestionType.choice, QuestionType.multi) and not self.options:
+            return QuestionType.text
+        return self.type
+
+
+@dataclass(frozen=True, slots=True)
+class QuestionSet:
+    meeting_id: int
+    title: str
+    status: MeetingStatus
+    questions: Tuple[QuestionView, ...]
+
+    @property
+    def is_open(self) -> bool:
+        return self.status == MeetingStatus.open
+
+
+def _snapshot(meeting) -> QuestionSet:
+    return QuestionSet(
+        meeting_id=meeting.id,
+        title=meeting.title,
+        status=meeting.status,
+        questions=tuple(
+            QuestionView(
+                id=q.id,
+                text=q.text,
+                type=q.type or QuestionType.text,
+                is_required=bool(q.is_required),
+                options=tuple(OptionView(o.value, o.label or o.value) for o in q.options),
+            )
+            for q in meeting.questions
+        ),
+    )
+
+
+async def get_question_set(db: AsyncSession, meeting_id: int) -> Optional[QuestionSet]:
+    """Снимок встречи из кэша; при промахе — из БД (инвалидация в repo)."""
+    qs = question_set_cache.get(meeting_id)
+    if qs is None:
+        meeting = await repo.load_question_set(db, meeting_id)
+        if meeting is None:
+            return None
+        qs = _snapshot(meeting)
+        question_set_cache.set(meeting_id, qs)
+    return qs
+
+
+# ---------- Проверка ответов ----------
+
+_YES = {"да", "yes", "y", "true", "1", "+"}
+_NO = {"нет", "no", "n", "false", "0", "-"}
+MULTI_JOIN = ","  # как разбирает export._cell
+
+
+def validate(q: QuestionView, raw: str) -> str:
+    """
+    Привести ответ к виду, в котором он хранится, или поднять ValueError
+    с текстом для пользователя.
+    """
+    value = (raw or "").strip()
+    if not value:
+        raise ValueError("Пустой ответ.")
+    kind = q.kind
+    if kind == QuestionType.int:
+        try:
+            return str(int(value))
+        except ValueError:
+            raise ValueError("Нужно целое число.") from None
+    if kind == QuestionType.bool:
+        low = value.lower()
+        if low in _YES:
+            return "yes"
+        if low in _NO:
+            return "no"
+        raise ValueError("Ответьте «да» или «нет».")
+    if kind == QuestionType.choice:
+        for o in q.options:
+            if value == o.value or value.lower() == o.label.lower():
+                return o.value
+        raise ValueError("Выберите один из предложенных вариантов.")
+    if kind == QuestionType.multi:
+        known = {o.value for o in q.options}
+        parts = [p.strip() for p in value.split(MULTI_JOIN) if p.strip()]
+        bad = [p for p in parts if p not in known]
+        if bad or not parts:
+            raise ValueError("Выберите варианты из списка.")
+        return MULTI_JOIN.join(o.value for o in q.options if o.value in parts)
+    return value
+
+
+def multi_value(q: QuestionView, mask: int) -> str:
+    """Значение multi-вопроса по битовой маске выбранных вариантов."""
+    return MULTI_JOIN.join(o.value for i, o in enumerate(q.options) if mask >> i & 1)
+
+
+# ---------- Клавиатуры ----------
+
+# callback_data (≤ 64 байт):
+#   fill:c:<idx>:<opt>   выбор варианта choice
+#   fill:b:<idx>:<1|0>   да/нет
+#   fill:m:<idx>:<mask>  переключение вариантов multi (маска после нажатия)
+#   fill:d:<idx>:<mask>  «Готово» для multi
+#   fill:s:<idx>         пропустить необязательный вопрос
+# idx — номер вопроса: нажатия на кнопки старых сообщений отбрасываются.
+CALLBACK_PREFIX = "fill:"
+MAX_MULTI_OPTIONS = 60  # маска должна поместиться в callback_data
+
+
+def keyboard(q: QuestionView, idx: int, mask: int = 0) -> Optional[InlineKeyboardMarkup]:
+    rows: List[List[InlineKeyboardButton]] = []
+    kind = q.kind
+    if kind == QuestionType.choice:
+        rows = [[InlineKeyboardButton(o.label, callback_data=f"fill:c:{idx}:{i}")]
+                for i, o in enumerate(q.options)]
+    elif kind == QuestionType.bool:
+        rows = [[InlineKeyboardButton("Да", callback_data=f"fill:b:{idx}:1"),
+                 InlineKeyboardButton("Нет", callback_data=f"fill:b:{idx}:0")]]
+    elif kind == QuestionType.multi:
+        for i, o in enumerate(q.options[:MAX_MULTI_OPTIONS]):
+            mark = "☑️" if mask >> i & 1 else "⬜️"
+            rows.append([InlineKeyboardButton(f"{mark} {o.label}",
+                                              callback_data=f"fill:m:{idx}:{mask ^ (1 << i)}")])
+        rows.append([InlineKeyboardButton("Готово", callback_data=f"fill:d:{idx}:{mask}")])
+    if not q.is_required:
+        rows.append([InlineKeyboardButton("Пропустить", callback_data=f"fill:s:{idx}")])
+    return InlineKeyboardMarkup(rows) if rows else None
+
+
+def parse_callback(data: str) -> Optional[Tuple[str, int, int]]:
+    """'fill:c:3:1' → ('c', 3, 1); некорректные данные → None."""
+    parts = (data or "").split(":")
+    if len(parts) < 3 or parts[0] != "fill":
+        return None
+    try:
+        idx = int(parts[2])
+        arg = int(parts[3]) if len(parts) > 3 else 0
+    except ValueError:
+        return None
+    return parts[1], idx, arg
+
+
+def prompt(qs: QuestionSet, idx: int) -> str:
+    q = qs.questions[idx]
+    hint = {
+        QuestionType.text: "Напишите ответ сообщением.",
+        QuestionType.int: "Напишите число.",
+        QuestionType.choice: "Выберите вариант.",
+        QuestionType.multi: "Отметьте варианты и нажмите «Готово».",
+        QuestionType.bool: "Да или нет?",
+    }[q.kind]
+    star = "*" if q.is_required else ""
+    return f"❓ {idx + 1}/{len(qs.questions)}{star}: {q.text}\n{hint}"
+
+
+def summary(qs: QuestionSet, answers: Dict[int, str]) -> str:
+    lines = []
+    for q in qs.questions:
+        value = answers.get(q.id)
+        if value is None:
+            continue
+        if q.options:
+            labels = {o.value: o.label for o in q.options}
+            value = ", ".join(labels.get(v, v) for v in value.split(MULTI_JOIN))
+        lines.append(f"• {q.text}: {value}")
+    return "\n".join(lines) or "(нет ответов)"
@@ -1,17 +1,25 @@
-from typing import Optional, List
-from sqlalchemy import select, update, delete
+import json
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy import Select, delete, exists, func, insert, literal, or_, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
-from passlib.hash import bcrypt
+from sqlalchemy.orm import joinedload, selectinload
 
-from .models import User, Role, TgSession, Meeting, Question
+from .config import settings
+from .models import User, Role, TgSession, Meeting, Question, Response
+from .cache import (
+    invalidate_catalog, invalidate_identity, invalidate_meeting, invalidate_role, invalidate_user,
+    record_results,
+)
+from .lookup import meeting_index
+from .security import dummy_password_hash, hash_password, verify_password
 
 
 # -------------------- users --------------------
 
 async def create_user(db: AsyncSession, username: str, password: str, role_id: int) -> User:
-    # u = User(username=username, password_hash=bcrypt.hash(password), role_id=role_id)
-    u = User(username=username, password_hash=password, role_id=role_id)
+    u = User(username=username, password_hash=await hash_password(password), role_id=role_id)
     db.add(u)
     await db.commit()
     await db.refresh(u)
@@ -23,19 +31,51 @@ async def authenticate_user(db: AsyncSession, username: str, password: str) -> O
         select(User).options(joinedload(User.role)).where(User.username == username)
     )
     user = result.scalar_one_or_none()
-    # if user and bcrypt.verify(password, user.password_hash):
-    #     return user
-    if user and password == user.password_hash:
-        return user
-    return None
+    if not user:
+        # та же работа bcrypt, что и для существующего логина: по времени ответа
+        # нельзя перебором узнать, какие логины есть
+        await verify_password(password, await dummy_password_hash())
+        return None
+    ok, needs_rehash = await verify_password(password, user.password_hash)
+    if not ok:
+        return None
+    if needs_rehash:
+        # старый открытый пароль (или другая стоимость bcrypt) — перехешируем
+        user.password_hash = await hash_password(password)
+        await db.commit()
+    return user
+
+
+def _session_expiry(now: datetime) -> Optional[datetime]:
+    if settings.SESSION_TTL_HOURS <= 0:
+        return None
+    return now + timedelta(hours=settings.SESSION_TTL_HOURS)
 
 
 async def set_active_session(db: AsyncSession, telegram_id: int, user_id: int) -> TgSession:
-    await db.execute(update(TgSession).where(TgSession.telegram_id == telegram_id).values(is_active=False))
-    s = TgSession(telegram_id=telegram_id, user_id=user_id, is_active=True)
-    db.add(s)
+    """Одна строка на telegram_id: повторный /login обновляет её (INSERT ... ON CONFLICT)."""
+    now = datetime.utcnow()
+    stmt = sqlite_insert(TgSession).values(
+        telegram_id=telegram_id, user_id=user_id, is_active=True,
+        created_at=now, expires_at=_session_expiry(now),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TgSession.telegram_id],
+        set_={
+            "user_id": stmt.excluded.user_id,
+            "is_active": True,
+            "created_at": stmt.excluded.created_at,
+            "expires_at": stmt.excluded.expires_at,
+        },
+    ).returning(TgSession)
+    s = (await db.execute(stmt, execution_options={"populate_existing": True})).scalar_one()
+    # users.telegram_id — адрес для рассылок: последний вошедший с этого аккаунта
+    await db.execute(
+        update(User).where(User.telegram_id == telegram_id, User.id != user_id).values(telegram_id=None)
+    )
+    await db.execute(update(User).where(User.id == user_id).values(telegram_id=telegram_id))
     await db.commit()
-    await db.refresh(s)
+    invalidate_identity(telegram_id)
     return s
 
 
@@ -44,16 +84,34 @@ async def get_active_user(db: AsyncSession, telegram_id: int) -> Optional[User]:
         select(User)
         .options(joinedload(User.role))
         .join(TgSession, TgSession.user_id == User.id)
-        .where(TgSession.telegram_id == telegram_id, TgSession.is_active == True)
+        .where(
+            TgSession.telegram_id == telegram_id,
+            TgSession.is_active == True,
+            or_(TgSession.expires_at.is_(None), TgSession.expires_at > datetime.utcnow()),
+        )
     )
     return result.scalar_one_or_none()
 
 
 async def logout(db: AsyncSession, telegram_id: int):
-    await db.execute(update(TgSession).where(TgSession.telegram_id == telegram_id).values(is_active=False))
+    # expires_at = момент выхода: по нему prune_sessions удалит строку после срока хранения
+    await db.execute(
+        update(TgSession)
+        .where(TgSession.telegram_id == telegram_id)
+        .values(is_active=False, expires_at=datetime.utcnow())
+    )
     await db.commit()
+    invalidate_identity(telegram_id)
 
 
+async def prune_sessions(db: AsyncSession, retention: timedelta) -> int:
+    """Удаляет сессии, истёкшие или закрытые раньше, чем retention назад."""
+    res = await db.execute(
+        delete(TgSession).where(TgSession.expires_at < datetime.utcnow() - retention)
+    )
+    await db.commit()
+    return res.rowcount
+
 
 # -------------------- roles --------------------
 
@@ -69,9 +127,11 @@ async def create_role(db: AsyncSession, name: str) -> Role:
     return r
 
 
-async def rename_role(db: AsyncSession, role_id: int, new_name: str):
-    await db.execute(update(Role).where(Role.id == role_id).values(name=new_name))
+async def rename_role(db: AsyncSession, role_id: int, new_name: str) -> bool:
+    res = await db.execute(update(Role).where(Role.id == role_id).values(name=new_name))
     await db.commit()
+    invalidate_role(role_id)
+    return res.rowcount > 0
 
 
 async def delete_role(db: AsyncSession, role_id: int) -> bool:
@@ -80,6 +140,7 @@ async def delete_role(db: AsyncSession, role_id: int) -> bool:
         return False
     await db.execute(delete(Role).where(Role.id == role_id))
     await db.commit()
+    invalidate_role(role_id)
     return True
 
 
@@ -89,6 +150,7 @@ async def set_user_role(db: AsyncSession, username: str, role_id: int) -> bool:
         return False
     await db.execute(update(User).where(User.id == user.id).values(role_id=role_id))
     await db.commit()
+    invalidate_user(user.id)
     return True
 
 
@@ -120,6 +182,9 @@ async def create_meeting(
     db.add(meeting)
     await db.commit()
     await db.refresh(meeting)
+    invalidate_catalog()
+    invalidate_meeting(meeting.id)
+    meeting_index.put(meeting.id, meeting.title, meeting.department, meeting.country, meeting.status)
     return meeting
 
 
@@ -128,15 +193,129 @@ async def list_meetings(db: AsyncSession) -> List[Meeting]:
     return (await db.execute(select(Meeting).order_by(Meeting.id))).scalars().all()
 
 
+async def meeting_index_rows(db: AsyncSession) -> List[Tuple]:
+    """Колонки всех встреч для inline-индекса (lookup.MeetingIndex.load)."""
+    return (await db.execute(
+        select(Meeting.id, Meeting.title, Meeting.department, Meeting.country, Meeting.status)
+    )).all()
+
+
+async def list_meetings_page(
+    db: AsyncSession,
+    limit: int,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None,
+    status: Optional[str] = None,
+    department: Optional[str] = None,
+    country: Optional[str] = None,
+) -> List[Tuple]:
+    """
+    Страница встреч по ключу (keyset): id > after_id или id < before_id,
+    не более limit + 1 строк (лишняя — признак следующей страницы),
+    в порядке возрастания id. Загружаются только колонки для списка.
+    """
+    stmt = select(
+        Meeting.id, Meeting.title, Meeting.status, Meeting.department, Meeting.country, Meeting.deadline_at,
+    )
+    if status:
+        stmt = stmt.where(Meeting.status == status)
+    if department:
+        stmt = stmt.where(Meeting.department == department)
+    if country:
+        stmt = stmt.where(Meeting.country == country)
+    if before_id is not None:
+        stmt = stmt.where(Meeting.id < before_id).order_by(Meeting.id.desc())
+    else:
+        if after_id is not None:
+            stmt = stmt.where(Meeting.id > after_id)
+        stmt = stmt.order_by(Meeting.id)
+    rows = (await db.execute(stmt.limit(limit + 1))).all()
+    return rows[::-1] if before_id is not None else rows
+
+
 async def set_meeting_status(db: AsyncSession, meeting_id: int, status: str) -> bool:
     res = await db.execute(update(Meeting).where(Meeting.id == meeting_id).values(status=status))
     await db.commit()
+    invalidate_meeting(meeting_id)
+    invalidate_catalog()
+    meeting_index.set_status(meeting_id, status)
+    return res.rowcount > 0
+
+
+async def transition_meeting(
+    db: AsyncSession, meeting_id: int, from_statuses: Sequence[str], status: str,
+) -> bool:
+    """Сменить статус, только если текущий — один из from_statuses (ручная смена важнее)."""
+    res = await db.execute(
+        update(Meeting)
+        .where(Meeting.id == meeting_id, Meeting.status.in_(from_statuses))
+        .values(status=status)
+    )
+    await db.commit()
+    if res.rowcount:
+        invalidate_meeting(meeting_id)
+        invalidate_catalog()
+        meeting_index.set_status(meeting_id, status)
+    return res.rowcount > 0
+
+
+_UNSET = object()
+
+
+async def set_meeting_schedule(
+    db: AsyncSession, meeting_id: int, opens_at=_UNSET, deadline_at=_UNSET,
+) -> bool:
+    """
+    Изменить время открытия и/или дедлайн; с opens_at встреча становится scheduled.
+    Открытие по расписанию — только для черновиков и уже запланированных встреч:
+    открытую или закрытую встречу оно не трогает (False).
+    """
+    values = {}
+    stmt = update(Meeting).where(Meeting.id == meeting_id)
+    if opens_at is not _UNSET:
+        values["opens_at"] = opens_at
+        if opens_at is not None:
+            values["status"] = "scheduled"
+            stmt = stmt.where(Meeting.status.in_(("draft", "scheduled")))
+    if deadline_at is not _UNSET:
+        values["deadline_at"] = deadline_at
+    if not values:
+        return False
+    res = await db.execute(stmt.values(**values))
+    await db.commit()
+    invalidate_meeting(meeting_id)
+    invalidate_catalog()
+    if "status" in values and res.rowcount:
+        meeting_index.set_status(meeting_id, values["status"])
     return res.rowcount > 0
 
 
+_SCHEDULE_COLUMNS = (Meeting.id, Meeting.status, Meeting.opens_at, Meeting.deadline_at)
+
+
+async def list_scheduled_meetings(db: AsyncSession) -> List[Tuple]:
+    """Встречи, у которых впереди переход статуса (загружается один раз при старте)."""
+    return (await db.execute(
+        select(*_SCHEDULE_COLUMNS).where(
+            Meeting.status.in_(("scheduled", "open")),
+            or_(Meeting.opens_at.is_not(None), Meeting.deadline_at.is_not(None)),
+        )
+    )).all()
+
+
+async def get_meeting_schedule(db: AsyncSession, meeting_id: int) -> Optional[Tuple]:
+    return (await db.execute(select(*_SCHEDULE_COLUMNS).where(Meeting.id == meeting_id))).first()
+
+
 async def delete_meeting(db: AsyncSession, meeting_id: int) -> bool:
+    # responses.meeting_id без ON DELETE CASCADE, а foreign_keys=ON — удаляем анкеты явно
+    # (ответы удалятся каскадом по answers.response_id)
+    await db.execute(delete(Response).where(Response.meeting_id == meeting_id))
     res = await db.execute(delete(Meeting).where(Meeting.id == meeting_id))
     await db.commit()
+    invalidate_meeting(meeting_id)
+    invalidate_catalog()
+    meeting_index.remove(meeting_id)
     return res.rowcount > 0
 
 
@@ -148,6 +327,7 @@ async def add_question(db: AsyncSession, meeting_id: int, text: str) -> Optional
     db.add(q)
     await db.commit()
     await db.refresh(q)
+    invalidate_meeting(meeting_id)
     return q
 
 from .models import Question, Answer
@@ -160,35 +340,407 @@ async def list_questions(db: AsyncSession, meeting_id: int) -> list[Question]:
     return result.scalars().all()
 
 # добавить ответ пользователя
-from .models import Answer, Response
+from .models import Answer, AnswerRevision, Response
+from .audit import revision_log
 from datetime import datetime
 
 async def add_answer(db: AsyncSession, user_id: int, question_id: int, text: str) -> Answer:
-    """Добавляет ответ пользователя на вопрос (через Response)."""
-    # определяем встречу через вопрос
-    question = (await db.execute(select(Question).where(Question.id == question_id))).scalar_one_or_none()
-    if not question:
+    """Записывает ответ пользователя на вопрос (через Response); повторный ответ заменяет прежний."""
+    return (await add_answers_batch(db, [(user_id, question_id, text)]))[0]
+
+
+async def add_answers_batch(
+    db: AsyncSession, items: Sequence[Tuple[int, int, str]], submit: bool = False,
+) -> List[Optional[Answer]]:
+    """
+    Пакетная запись ответов (user_id, question_id, text) одной транзакцией.
+    Вопросы и анкеты (Response) вместе с прежними ответами ищутся одним запросом
+    на всю пачку. На вопрос в анкете хранится один ответ: повторный заменяет его
+    (upsert), каждое значение попадает в журнал answer_revisions (app/audit.py).
+    Для несуществующих вопросов в результате None.
+    submit=True — затронутые анкеты помечаются отправленными.
+    """
+    now = datetime.utcnow()
+    # определяем встречи через вопросы
+    qids = {qid for _, qid, _ in items}
+    q_meeting: Dict[int, int] = dict(
+        (await db.execute(select(Question.id, Question.meeting_id).where(Question.id.in_(qids)))).all()
+    )
+
+    # находим или создаём response для каждой пары (пользователь, встреча);
+    # нужны только id и статус, поэтому без ORM-объектов. Прежние ответы на
+    # вопросы пачки приходят тем же запросом — для поправки агрегатов /results
+    pairs = {(uid, q_meeting[qid]) for uid, qid, _ in items if qid in q_meeting}
+    responses: Dict[Tuple[int, int], Tuple[int, str]] = {}
+    previous: Dict[Tuple[int, int], str] = {}  # (response_id, question_id) → значение
+    missing: List[Tuple[int, int]] = []
+    if pairs:
+        found = await db.execute(
+            select(Response.id, Response.user_id, Response.meeting_id, Response.status,
+                   Answer.question_id, Answer.value)
+            .outerjoin(Answer, (Answer.response_id == Response.id) & Answer.question_id.in_(q_meeting.keys()))
+            .where(
+                Response.user_id.in_({u for u, _ in pairs}),
+                Response.meeting_id.in_({m for _, m in pairs}),
+            )
+        )
+        for rid, u, m, status, qid, value in found:
+            responses.setdefault((u, m), (rid, status))
+            if qid is not None:
+                previous[(rid, qid)] = value
+        missing = [pair for pair in pairs if pair not in responses]
+        if missing:
+            # RETURNING без сортировки SQLAlchemy пакетирует в один INSERT … VALUES
+            # (упорядоченный ORM вставляет по строке), id сопоставляем по паре
+            created_rows = await db.execute(
+                insert(Response).returning(Response.id, Response.user_id, Response.meeting_id),
+                [{"user_id": u, "meeting_id": m, "status": "draft", "submitted_at": now} for u, m in missing],
+            )
+            for rid, u, m in created_rows:
+                responses[(u, m)] = (rid, "draft")
+
+    answers: List[Optional[Answer]] = []
+    for uid, qid, text in items:
+        meeting_id = q_meeting.get(qid)
+        if meeting_id is None:
+            answers.append(None)
+            continue
+        answers.append(Answer(
+            response_id=responses[(uid, meeting_id)][0],
+            question_id=qid,
+            value=text.strip(),
+        ))
+    # один upsert на пачку; из повторов внутри пачки остаётся последнее значение
+    latest: Dict[Tuple[int, int], str] = {(a.response_id, a.question_id): a.value for a in answers if a}
+    if latest:
+        stmt = sqlite_insert(Answer)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Answer.response_id, Answer.question_id], set_={"value": stmt.excluded.value},
+        ).returning(Answer.id, Answer.response_id, Answer.question_id)
+        ids = {(rid, qid): aid for aid, rid, qid in await db.execute(stmt, [
+            {"response_id": rid, "question_id": qid, "value": value} for (rid, qid), value in latest.items()
+        ])}
+        for a in answers:
+            if a is not None:
+                a.id = ids[(a.response_id, a.question_id)]
+    revisions = [
+        {"response_id": a.response_id, "question_id": a.question_id, "value": a.value, "recorded_at": now}
+        for a in answers if a is not None
+    ]
+    if revisions and not revision_log.running:
+        await db.execute(insert(AnswerRevision), revisions)
+    submitted: Dict[int, int] = {}
+    if submit and pairs:
+        for pair in pairs:
+            if responses[pair][1] != "submitted":
+                submitted[pair[1]] = submitted.get(pair[1], 0) + 1
+        await db.execute(
+            update(Response)
+            .where(Response.id.in_([responses[pair][0] for pair in pairs]))
+            .values(status="submitted", submitted_at=now)
+        )
+
+    # для агрегатов /results (значения берём до commit): новые значения
+    # и заменённые ими прежние
+    written: Dict[int, List[Tuple[int, str]]] = {}
+    replaced: Dict[int, List[Tuple[int, str]]] = {}
+    for (rid, qid), value in latest.items():
+        written.setdefault(q_meeting[qid], []).append((qid, value))
+        if (rid, qid) in previous:
+            replaced.setdefault(q_meeting[qid], []).append((qid, previous[(rid, qid)]))
+    created: Dict[int, int] = {}
+    for _, meeting_id in missing:
+        created[meeting_id] = created.get(meeting_id, 0) + 1
+
+    await db.commit()
+    if revisions and revision_log.running:
+        revision_log.record(revisions)
+    for meeting_id in written.keys() | created.keys() | submitted.keys():
+        record_results(
+            meeting_id, written.get(meeting_id, ()), replaced=replaced.get(meeting_id, ()),
+            new_responses=created.get(meeting_id, 0), submitted=submitted.get(meeting_id, 0),
+        )
+    return answers
+
+
+async def answer_value_counts(db: AsyncSession, question_ids: Sequence[int]) -> List[Tuple[int, str, int]]:
+    """(question_id, value, количество) — распределение ответов (GROUP BY)."""
+    if not question_ids:
+        return []
+    return (await db.execute(
+        select(Answer.question_id, Answer.value, func.count())
+        .where(Answer.question_id.in_(question_ids))
+        .group_by(Answer.question_id, Answer.value)
+    )).all()
+
+
+async def answer_counts(db: AsyncSession, question_ids: Sequence[int]) -> Dict[int, int]:
+    if not question_ids:
+        return {}
+    return dict((await db.execute(
+        select(Answer.question_id, func.count())
+        .where(Answer.question_id.in_(question_ids))
+        .group_by(Answer.question_id)
+    )).all())
+
+
+async def response_status_counts(db: AsyncSession, meeting_id: int) -> Dict[str, int]:
+    return dict((await db.execute(
+        select(Response.status, func.count())
+        .where(Response.meeting_id == meeting_id)
+        .group_by(Response.status)
+    )).all())
+
+
+async def load_question_set(db: AsyncSession, meeting_id: int) -> Optional[Meeting]:
+    """Встреча с вопросами и их вариантами — два запроса (selectinload)."""
+    return (await db.execute(
+        select(Meeting)
+        .options(selectinload(Meeting.questions).selectinload(Question.options))
+        .where(Meeting.id == meeting_id)
+    )).scalar_one_or_none()
+
+
+# -------------------- поиск --------------------
+from sqlalchemy import text
+
+# bm25 по всем совпадениям частого слова («улучшить» в каждом пятом ответе)
+# стоит времени, пропорционального числу совпадений. Поэтому каждый
+# FTS5-индекс ранжирует только последние :window совпадений (обход по rowid
+# с конца останавливается на LIMIT) и отдаёт лучшие :top из них. Редкие
+# слова, ради которых обычно и ищут, ранжируются полностью. С таблицами
+# соединяются только эти десятки строк. Совпадение в названии встречи весит
+# больше, чем в описании.
+_SEARCH_HITS = """
+    SELECT * FROM (SELECT * FROM (
+        SELECT '{kind}' AS kind, rowid AS id, bm25({fts}{weights}) AS score FROM {fts}
+        WHERE {fts} MATCH :match ORDER BY rowid DESC LIMIT :window
+    ) ORDER BY score LIMIT :top)"""
+_SEARCH = text(f"""
+    WITH hits AS ({" UNION ALL ".join(_SEARCH_HITS.format(kind=kind, fts=fts, weights=weights) for kind, fts, weights in (
+        ("meeting", "meetings_fts", ", 4.0, 1.0"), ("question", "questions_fts", ""), ("answer", "answers_fts", ""),
+    ))}
+    )
+    SELECT h.kind, h.id, h.score, m.id AS meeting_id, m.title AS meeting_title, q.text AS question,
+           CASE h.kind WHEN 'meeting' THEN coalesce(m.description, '')
+                       WHEN 'question' THEN q.text ELSE a.value END AS body
+    FROM hits h
+    LEFT JOIN answers a ON h.kind = 'answer' AND a.id = h.id
+    LEFT JOIN questions q ON q.id = CASE h.kind WHEN 'question' THEN h.id WHEN 'answer' THEN a.question_id END
+    JOIN meetings m ON m.id = CASE h.kind WHEN 'meeting' THEN h.id ELSE q.meeting_id END
+    ORDER BY h.score, h.kind, h.id
+    LIMIT :limit OFFSET :offset
+""")
+
+
+async def search(db: AsyncSession, match: str, limit: int, offset: int = 0) -> List[Tuple]:
+    """
+    Полнотекстовый поиск по встречам, вопросам и ответам (match — выражение
+    FTS5, см. search.build_match). Результат: (kind, id, score, meeting_id,
+    meeting_title, question, body), лучшие совпадения первыми. Ранжируются
+    последние SEARCH_CANDIDATES совпадений каждого индекса.
+    """
+    top = offset + limit
+    return (await db.execute(_SEARCH, {
+        "match": match, "window": max(settings.SEARCH_CANDIDATES, top), "top": top,
+        "limit": limit, "offset": offset,
+    })).all()
+
+
+# -------------------- fsm states --------------------
+
+from .models import FsmState
+
+
+async def get_fill_state(db: AsyncSession, chat_id: int) -> Optional[FsmState]:
+    return (await db.execute(select(FsmState).where(FsmState.chat_id == chat_id))).scalar_one_or_none()
+
+
+async def get_fill_state_stamp(db: AsyncSession, chat_id: int) -> Optional[datetime]:
+    """updated_at состояния анкеты — версия для проверки локального кэша."""
+    return (await db.execute(
+        select(FsmState.updated_at).where(FsmState.chat_id == chat_id)
+    )).scalar_one_or_none()
+
+
+async def save_fill_state(
+    db: AsyncSession, chat_id: int, meeting_id: int, current_q_idx: int,
+    answers: Optional[Dict[int, str]] = None,
+) -> datetime:
+    """Сохраняет состояние анкеты; возвращает записанный updated_at."""
+    now = datetime.utcnow()
+    stmt = sqlite_insert(FsmState).values(
+        chat_id=chat_id, meeting_id=meeting_id, current_q_idx=current_q_idx,
+        answers=json.dumps(answers or {}, ensure_ascii=False), updated_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[FsmState.chat_id],
+        set_={
+            "meeting_id": stmt.excluded.meeting_id,
+            "current_q_idx": stmt.excluded.current_q_idx,
+            "answers": stmt.excluded.answers,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    await db.execute(stmt)
+    await db.commit()
+    return now
+
+
+async def record_fill_answer(
+    db: AsyncSession, chat_id: int, question_id: int, value: str,
+) -> Optional[Tuple[int, Dict[int, str], datetime]]:
+    """
+    Атомарно сохраняет ответ в состоянии анкеты и переходит к следующему вопросу;
+    возвращает (current_q_idx, answers, updated_at).
+    """
+    res = await db.execute(
+        update(FsmState)
+        .where(FsmState.chat_id == chat_id)
+        .values(
+            answers=func.json_set(func.coalesce(FsmState.answers, "{}"), f'$."{question_id}"', value),
+            current_q_idx=FsmState.current_q_idx + 1,
+            updated_at=datetime.utcnow(),
+        )
+        .returning(FsmState.current_q_idx, FsmState.answers, FsmState.updated_at)
+    )
+    row = res.first()
+    await db.commit()
+    if row is None:
         return None
+    return row.current_q_idx, decode_fill_answers(row.answers), row.updated_at
+
+
+def decode_fill_answers(raw: Optional[str]) -> Dict[int, str]:
+    return {int(k): v for k, v in json.loads(raw or "{}").items()}
+
+
+async def advance_fill_state(db: AsyncSession, chat_id: int) -> Optional[Tuple[int, datetime]]:
+    """Атомарно увеличивает current_q_idx; возвращает (новое значение, updated_at) или None."""
+    res = await db.execute(
+        update(FsmState)
+        .where(FsmState.chat_id == chat_id)
+        .values(current_q_idx=FsmState.current_q_idx + 1, updated_at=datetime.utcnow())
+        .returning(FsmState.current_q_idx, FsmState.updated_at)
+    )
+    row = res.first()
+    await db.commit()
+    return None if row is None else (row.current_q_idx, row.updated_at)
+
+
+async def delete_fill_state(db: AsyncSession, chat_id: int) -> None:
+    await db.execute(delete(FsmState).where(FsmState.chat_id == chat_id))
+    await db.commit()
+
+
+async def prune_fill_states(db: AsyncSession, older_than: datetime) -> int:
+    res = await db.execute(delete(FsmState).where(FsmState.updated_at < older_than))
+    await db.commit()
+    return res.rowcount
 
-    # находим или создаём response для этого пользователя и встречи
-    response = (await db.execute(
-        select(Response)
-        .where(Response.user_id == user_id, Response.meeting_id == question.meeting_id)
+
+# -------------------- broadcasts --------------------
+
+from .models import Broadcast, OutboxMessage
+
+
+def audience_all() -> Select:
+    """Все пользователи, у которых известен telegram_id."""
+    return select(User.telegram_id).where(User.telegram_id.is_not(None), User.is_active == True)
+
+
+def audience_non_responders(meeting_id: int) -> Select:
+    """Пользователи без анкеты по встрече — один anti-join (LEFT JOIN … IS NULL)."""
+    return (
+        select(User.telegram_id)
+        .outerjoin(Response, (Response.user_id == User.id) & (Response.meeting_id == meeting_id))
+        .where(User.telegram_id.is_not(None), User.is_active == True, Response.id.is_(None))
+    )
+
+
+async def create_broadcast(
+    db: AsyncSession, kind: str, text: str, audience: Select, meeting_id: Optional[int] = None,
+) -> Broadcast:
+    """Рассылка и её outbox одной транзакцией: получатели вставляются INSERT … SELECT."""
+    b = Broadcast(kind=kind, text=text, meeting_id=meeting_id, created_at=datetime.utcnow())
+    db.add(b)
+    await db.flush()
+    chats = audience.subquery()
+    res = await db.execute(
+        insert(OutboxMessage)
+        .prefix_with("OR IGNORE")
+        .from_select(
+            ["broadcast_id", "chat_id", "status", "attempts", "next_attempt_at"],
+            select(literal(b.id), chats.c.telegram_id, literal("pending"), literal(0), literal(datetime.utcnow()))
+            .distinct(),
+        )
+    )
+    b.total = res.rowcount
+    if not b.total:
+        b.finished_at = datetime.utcnow()
+    await db.commit()
+    return b
+
+
+async def due_outbox(db: AsyncSession, now: datetime, limit: int) -> List[Tuple]:
+    """Сообщения, которые пора отправить: (id, broadcast_id, chat_id, attempts, text)."""
+    return (await db.execute(
+        select(OutboxMessage.id, OutboxMessage.broadcast_id, OutboxMessage.chat_id,
+               OutboxMessage.attempts, Broadcast.text)
+        .join(Broadcast, Broadcast.id == OutboxMessage.broadcast_id)
+        .where(OutboxMessage.status == "pending", OutboxMessage.next_attempt_at <= now)
+        .order_by(OutboxMessage.next_attempt_at)
+        .limit(limit)
+    )).all()
+
+
+async def next_outbox_due(db: AsyncSession) -> Optional[datetime]:
+    return (await db.execute(
+        select(func.min(OutboxMessage.next_attempt_at)).where(OutboxMessage.status == "pending")
     )).scalar_one_or_none()
 
-    if not response:
-        response = Response(user_id=user_id, meeting_id=question.meeting_id, status="draft", submitted_at=datetime.utcnow())
-        db.add(response)
-        await db.flush()  # чтобы получить response.id без commit
 
-    # создаём ответ
-    answer = Answer(
-        response_id=response.id,
-        question_id=question_id,
-        value=text.strip(),
+async def mark_broadcasts_started(db: AsyncSession, broadcast_ids: Sequence[int], now: datetime) -> None:
+    await db.execute(
+        update(Broadcast)
+        .where(Broadcast.id.in_(broadcast_ids), Broadcast.started_at.is_(None))
+        .values(started_at=now)
     )
-    db.add(answer)
     await db.commit()
-    await db.refresh(answer)
-    return answer
 
+
+async def save_outbox_results(db: AsyncSession, results: Sequence[Dict]) -> None:
+    """
+    Итоги отправки порции одним executemany:
+    {"id", "status", "attempts", "next_attempt_at", "sent_at", "error"}.
+    Заодно закрывает рассылки, в которых не осталось pending-сообщений.
+    """
+    if not results:
+        return
+    await db.execute(update(OutboxMessage), list(results))
+    ids = {bid for bid, in (await db.execute(
+        select(OutboxMessage.broadcast_id).where(OutboxMessage.id.in_([r["id"] for r in results]))
+    )).all()}
+    pending = exists().where(OutboxMessage.broadcast_id == Broadcast.id, OutboxMessage.status == "pending")
+    await db.execute(
+        update(Broadcast)
+        .where(Broadcast.id.in_(ids), Broadcast.finished_at.is_(None), ~pending)
+        .values(finished_at=datetime.utcnow())
+    )
+    await db.commit()
+
+
+async def broadcast_progress(db: AsyncSession, broadcast_id: int) -> Optional[Dict]:
+    b = await db.get(Broadcast, broadcast_id)
+    if b is None:
+        return None
+    counts = dict((await db.execute(
+        select(OutboxMessage.status, func.count())
+        .where(OutboxMessage.broadcast_id == broadcast_id)
+        .group_by(OutboxMessage.status)
+    )).all())
+    return {"broadcast": b, **{k: counts.get(k, 0) for k in ("pending", "sent", "failed")}}
+
+
+async def list_broadcasts(db: AsyncSession, limit: int = 10) -> List[Broadcast]:
+    return (await db.execute(select(Broadcast).order_by(Broadcast.id.desc()).limit(limit))).scalars().all()
@@ -0,0 +1,257 @@
+# app/results.py
+from __future__ import annotations
+
+import bisect
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .cache import results_cache, results_writes
+from .config import settings
+from .models import QuestionType
+from .questionnaire import MULTI_JOIN, QuestionSet, QuestionView, get_question_set
+from . import repo
+
+
+# Агрегаты /results: распределения по choice/multi/bool, числовые сводки
+# по int и доля ответивших. Первый запрос считает всё через GROUP BY
+# (ответы приходят парами «значение → количество»), дальше агрегат живёт
+# в results_cache и обновляется на месте при каждой записи ответов.
+
+PERCENTILES = (25, 50, 75, 90)
+_CATEGORICAL = (QuestionType.choice, QuestionType.multi, QuestionType.bool)
+
+
+# ---------- Числовые сводки ----------
+
+@dataclass(frozen=True, slots=True)
+class NumericSummary:
+    count: int
+    mean: float
+    median: float
+    min: int
+    max: int
+    percentiles: Dict[int, float]
+    histogram: List[Tuple[float, float, int]]  # (от, до, количество)
+
+
+def _summary(counts: Dict[int, int], bins: int) -> NumericSummary:
+    # процентили с линейной интерполяцией по «развёрнутому» массиву, не разворачивая его
+    keys = sorted(counts)
+    cum: List[int] = []
+    total = 0
+    for k in keys:
+        total += counts[k]
+        cum.append(total)
+    n = total
+
+    def at(i: int) -> int:
+        return keys[bisect.bisect_right(cum, i)]
+
+    pct = {}
+    for p in PERCENTILES:
+        r = p / 100 * (n - 1)
+        lo, hi = int(r), -int(-r // 1)
+        pct[p] = at(lo) + (at(hi) - at(lo)) * (r - lo)
+    kmin, kmax = keys[0], keys[-1]
+    nb = max(1, min(bins, kmax - kmin + 1))
+    width = (kmax - kmin + 1) / nb
+    hist = [0] * nb
+    for k in keys:
+        hist[min(int((k - kmin) / width), nb - 1)] += counts[k]
+    return NumericSummary(
+        count=n,
+        mean=sum(k * c for k, c in counts.items()) / n,
+        median=float(pct[50]),
+        min=kmin,
+        max=kmax,
+        percentiles={p: float(v) for p, v in pct.items()},
+        histogram=[(kmin + i * width, kmin + (i + 1) * width, c) for i, c in enumerate(hist)],
+    )
+
+
+def numeric_summary(counts: Dict[int, int], bins: Optional[int] = None) -> Optional[NumericSummary]:
+    """Сводка по распределению «значение → количество»; None, если значений нет."""
+    counts = {k: c for k, c in counts.items() if c > 0}
+    if not counts:
+        return None
+    return _summary(counts, bins or settings.RESULTS_HIST_BINS)
+
+
+# ---------- Агрегаты ----------
+
+@dataclass(slots=True)
+class QuestionResults:
+    question: QuestionView
+    answered: int = 0
+    counts: Counter = field(default_factory=Counter)  # значение → количество
+    invalid: int = 0                                  # нечисловые ответы на int-вопрос
+    _summary: Any = None                              # кэш NumericSummary до следующего ответа
+
+    @property
+    def tracks_values(self) -> bool:
+        return self.question.kind in _CATEGORICAL or self.question.kind == QuestionType.int
+
+    def add(self, value: Optional[str], n: int = 1) -> None:
+        """Учесть n ответов со значением value (n < 0 — убрать заменённые)."""
+        self.answered += n
+        kind = self.question.kind
+        value = (value or "").strip()
+        if kind == QuestionType.multi:
+            for part in value.split(MULTI_JOIN):
+                if part.strip():
+                    self._count(part.strip(), n)
+        elif kind == QuestionType.int:
+            try:
+                self._count(int(value), n)
+            except ValueError:
+                self.invalid += n
+            self._summary = None
+        elif kind in _CATEGORICAL:
+            self._count(value, n)
+
+    def _count(self, key: Any, n: int) -> None:
+        self.counts[key] += n
+        if self.counts[key] <= 0:
+            del self.counts[key]
+
+    def summary(self) -> Optional[NumericSummary]:
+        if self.question.kind != QuestionType.int:
+            return None
+        if self._summary is None:
+            self._summary = numeric_summary(self.counts)
+        return self._summary
+
+
+@dataclass(slots=True)
+class MeetingResults:
+    qs: QuestionSet
+    questions: Dict[int, QuestionResults]
+    responses: Counter  # статус анкеты → количество
+
+    @property
+    def total_responses(self) -> int:
+        return sum(self.responses.values())
+
+    def apply(self, answers: Iterable[Tuple[int, str]], new_responses: int = 0, submitted: int = 0,
+              replaced: Iterable[Tuple[int, str]] = ()) -> None:
+        """Инкрементальное обновление: новые ответы (вместо replaced), анкеты и отправки."""
+        for qid, value in replaced:
+            q = self.questions.get(qid)
+            if q is not None:
+                q.add(value, -1)
+        for qid, value in answers:
+            q = self.questions.get(qid)
+            if q is not None:
+                q.add(value)
+        self.responses["draft"] += new_responses
+        if submitted:
+            moved = min(submitted, self.responses["draft"])
+            self.responses["draft"] -= moved
+            self.responses["submitted"] += submitted
+
+
+async def compute(db: AsyncSession, qs: QuestionSet) -> MeetingResults:
+    """Агрегаты встречи с нуля: три GROUP BY-запроса."""
+    questions = {q.id: QuestionResults(q) for q in qs.questions}
+    valued = [qid for qid, q in questions.items() if q.tracks_values]
+    plain = [qid for qid, q in questions.items() if not q.tracks_values]
+    for qid, value, n in await repo.answer_value_counts(db, valued):
+        questions[qid].add(value, n)
+    for qid, n in (await repo.answer_counts(db, plain)).items():
+        questions[qid].answered += n
+    responses = Counter(await repo.response_status_counts(db, qs.meeting_id))
+    return MeetingResults(qs, questions, responses)
+
+
+async def get_results(db: AsyncSession, meeting_id: int) -> Optional[MeetingResults]:
+    res = results_cache.get(meeting_id)
+    if res is not None:
+        return res
+    qs = await get_question_set(db, meeting_id)
+    if qs is None:
+        return None
+    writes = results_writes()
+    res = await compute(db, qs)
+    if results_writes() == writes:
+        # за время подсчёта ответы не писались — агрегат можно обновлять дальше на месте
+        results_cache.set(meeting_id, res)
+    return res
+
+
+# ---------- Вывод ----------
+
+TOP_VALUES = 15
+BAR_WIDTH = 10
+
+
+def _pct(part: int, whole: int) -> str:
+    return f"{part * 100 / whole:.0f}%" if whole else "—"
+
+
+def _bar(part: int, whole: int) -> str:
+    return "█" * round(BAR_WIDTH * part / whole) if whole else ""
+
+
+def _fmt(x: float) -> str:
+    return f"{x:.0f}" if float(x).is_integer() else f"{x:.2f}"
+
+
+def _question_lines(q: QuestionResults, total: int) -> List[str]:
+    view = q.question
+    lines = [f"❓ {view.text}", f"  ответов: {q.answered} ({_pct(q.answered, total)} анкет)"]
+    kind = view.kind
+    if kind in _CATEGORICAL:
+        labels = {o.value: o.label for o in view.options}
+        if kind == QuestionType.bool:
+            labels = {"yes": "Да", "no": "Нет"}
+        base = sum(q.counts.values())
+        order = [o.value for o in view.options] or ["yes", "no"]
+        known = [(v, q.counts.get(v, 0)) for v in order]
+        other = [(v, c) for v, c in q.counts.most_common() if v not in labels][:TOP_VALUES]
+        for v, c in known + other:
+            lines.append(f"  {labels.get(v, v)}: {c} ({_pct(c, base)}) {_bar(c, base)}")
+    elif kind == QuestionType.int:
+        s = q.summary()
+        if s is not None:
+            p = s.percentiles
+            lines.append(
+                f"  среднее {_fmt(s.mean)}, медиана {_fmt(s.median)}, мин {s.min}, макс {s.max}"
+            )
+            lines.append("  " + ", ".join(f"p{k}={_fmt(v)}" for k, v in p.items()))
+            for lo, hi, c in s.histogram:
+                lines.append(f"  [{_fmt(lo)}; {_fmt(hi)}): {c} {_bar(c, s.count)}")
+        if q.invalid:
+            lines.append(f"  нечисловых ответов: {q.invalid}")
+    return lines
+
+
+def render(res: MeetingResults) -> List[str]:
+    """Текст результатов, разбитый на сообщения не длиннее лимита Telegram."""
+    total = res.total_responses
+    head = [
+        f"📊 Результаты «{res.qs.title}»",
+        f"анкет: {total}, отправлено: {res.responses.get('submitted', 0)} "
+        f"({_pct(res.responses.get('submitted', 0), total)}), черновиков: {res.responses.get('draft', 0)}",
+        "",
+    ]
+    blocks = ["\n".join(head)] + [
+        "\n".join(_question_lines(q, total)) for q in res.questions.values()
+    ]
+    return _chunks(blocks)
+
+
+def _chunks(blocks: Sequence[str], limit: int = 4000) -> List[str]:
+    messages: List[str] = []
+    current = ""
+    for block in blocks:
+        block = block[:limit]
+        if current and len(current) + len(block) + 1 > limit:
+            messages.append(current)
+            current = ""
+        current = f"{current}\n{block}" if current else block
+    if current:
+        messages.append(current)
+    return messages
@@ -0,0 +1,207 @@
+# app/scheduler.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+from .cache import subscribe_meeting_changes, unsubscribe_meeting_changes
+from .config import settings
+from .db import SessionLocal
+from . import repo
+
+
+# Планировщик переходов статусов встреч по времени:
+#   scheduled → open   в opens_at
+#   open → closed      в deadline_at (scheduled с прошедшим дедлайном тоже закрывается)
+#   напоминание        за REMINDER_BEFORE_HOURS до deadline_at
+# События лежат в min-heap по времени; таймер спит до ближайшего.
+# Встречи читаются из БД один раз при старте, дальше — по одной при изменении
+# (repo → cache.invalidate_meeting → подписчик). Устаревшие события не удаляются
+# из кучи, а отбрасываются при извлечении по номеру поколения встречи.
+
+OPEN, CLOSE, REMIND = "open", "close", "remind"
+
+Notifier = Callable[[str, int], Awaitable[None]]
+
+
+@dataclass(order=True, slots=True)
+class _Event:
+    at: datetime
+    seq: int
+    kind: str = field(compare=False)
+    meeting_id: int = field(compare=False)
+    gen: int = field(compare=False)
+
+
+class DeadlineScheduler:
+    def __init__(self, session_factory=SessionLocal, notifier: Optional[Notifier] = None,
+                 remind_before: Optional[timedelta] = None,
+                 clock: Callable[[], datetime] = datetime.utcnow) -> None:
+        self._session_factory = session_factory
+        self.notifier = notifier
+        hours = settings.REMINDER_BEFORE_HOURS
+        self.remind_before = remind_before if remind_before is not None else timedelta(hours=hours)
+        self._clock = clock
+        self._heap: List[_Event] = []
+        self._gen: Dict[int, int] = {}
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[int] = set()
+        self._rearm_tasks: Set[asyncio.Task] = set()
+        # метрики
+        self.fired = 0
+        self.stale = 0
+
+    # ---------- таймеры ----------
+
+    def arm(self, row) -> None:
+        """
+        Перевзвести таймеры встречи по строке (id, status, opens_at, deadline_at).
+        Прежние события встречи становятся устаревшими.
+        """
+        gen = self._gen.get(row.id, 0) + 1
+        self._gen[row.id] = gen
+        status = getattr(row.status, "value", row.status)
+        # в БД время хранится как наивное UTC
+        opens_at = row.opens_at.replace(tzinfo=None) if row.opens_at else None
+        deadline_at = row.deadline_at.replace(tzinfo=None) if row.deadline_at else None
+        if status == "scheduled" and opens_at is not None:
+            self._push(opens_at, OPEN, row.id, gen)
+        if status in ("scheduled", "open") and deadline_at is not None:
+            remind_at = deadline_at - self.remind_before
+            # напоминание, время которого прошло (например, во время простоя), не повторяем
+            if self.remind_before and self._clock() < remind_at:
+                self._push(remind_at, REMIND, row.id, gen)
+            self._push(deadline_at, CLOSE, row.id, gen)
+        self._maybe_compact()
+
+    def disarm(self, meeting_id: int) -> None:
+        self._gen[meeting_id] = self._gen.get(meeting_id, 0) + 1
+
+    def _push(self, at: datetime, kind: str, meeting_id: int, gen: int) -> None:
+        ev = _Event(at, next(self._seq), kind, meeting_id, gen)
+        first = not self._heap or ev < self._heap[0]
+        heapq.heappush(self._heap, ev)
+        if first and self._changed is not None:
+            self._changed.set()  # новое ближайшее событие — будим таймер
+
+    def _maybe_compact(self) -> None:
+        # устаревших событий больше, чем живых — пересобираем кучу (O(n), редко)
+        if len(self._heap) > 64 and len(self._heap) > 4 * len(self._gen):
+            self._heap = [e for e in self._heap if self._gen.get(e.meeting_id) == e.gen]
+            heapq.heapify(self._heap)
+
+    def due(self) -> List[_Event]:
+        """Извлечь наступившие актуальные события (каждое — O(log n))."""
+        now = self._clock()
+        out = []
+        while self._heap and self._heap[0].at <= now:
+            ev = heapq.heappop(self._heap)
+            if self._gen.get(ev.meeting_id) != ev.gen:
+                self.stale += 1
+                continue
+            out.append(ev)
+        return out
+
+    def next_at(self) -> Optional[datetime]:
+        return self._heap[0].at if self._heap else None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    # ---------- выполнение ----------
+
+    async def fire(self, ev: _Event) -> None:
+        async with self._session_factory() as db:
+            if ev.kind == OPEN:
+                done = await repo.transition_meeting(db, ev.meeting_id, ("scheduled",), "open")
+            elif ev.kind == CLOSE:
+                done = await repo.transition_meeting(db, ev.meeting_id, ("scheduled", "open"), "closed")
+            else:
+                row = await repo.get_meeting_schedule(db, ev.meeting_id)
+                done = row is not None and getattr(row.status, "value", row.status) == "open"
+        self.fired += 1
+        if done:
+            logger.info("Meeting {}: {}", ev.meeting_id, ev.kind)
+            if self.notifier is not None:
+                await self.notifier(ev.kind, ev.meeting_id)
+
+    async def load(self) -> int:
+        async with self._session_factory() as db:
+            rows = await repo.list_scheduled_meetings(db)
+        for row in rows:
+            self.arm(row)
+        return len(rows)
+
+    async def rearm(self, meeting_id: int) -> None:
+        self._pending.discard(meeting_id)
+        async with self._session_factory() as db:
+            row = await repo.get_meeting_schedule(db, meeting_id)
+        if row is None:
+            self.disarm(meeting_id)
+        else:
+            self.arm(row)
+
+    def _on_meeting_changed(self, meeting_id: int) -> None:
+        # вызывается синхронно из repo; несколько изменений подряд — одна перезагрузка
+        if self._task is None or meeting_id in self._pending:
+            return
+        self._pending.add(meeting_id)
+        t = asyncio.get_running_loop().create_task(self.rearm(meeting_id))
+        self._rearm_tasks.add(t)
+        t.add_done_callback(self._rearm_tasks.discard)
+
+    async def tick(self) -> int:
+        """Выполнить наступившие (по clock) события; вернуть их число. Шаг цикла _loop."""
+        events = self.due()
+        for ev in events:
+            try:
+                await self.fire(ev)
+            except Exception as e:  # noqa: BLE001 — планировщик не должен умирать из-за сбоя БД
+                logger.warning("Scheduled {} for meeting {} failed: {}", ev.kind, ev.meeting_id, e)
+        return len(events)
+
+    async def _loop(self) -> None:
+        while True:
+            self._changed.clear()
+            await self.tick()
+            nxt = self.next_at()
+            timeout = settings.SCHEDULER_MAX_SLEEP_SEC
+            if nxt is not None:
+                timeout = min(timeout, max(0.0, (nxt - self._clock()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._changed = asyncio.Event()
+        n = await self.load()
+        subscribe_meeting_changes(self._on_meeting_changed)
+        self._task = asyncio.create_task(self._loop(), name="deadline-scheduler")
+        logger.info("Deadline scheduler started: {} meetings, {} timers", n, len(self._heap))
+
+    async def stop(self) -> None:
+        unsubscribe_meeting_changes(self._on_meeting_changed)
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for t in list(self._rearm_tasks):
+            t.cancel()
+        self._changed = None
+
+
+deadline_scheduler = DeadlineScheduler()
@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from typing import Optional, List, Literal
 from datetime import datetime
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 # ---- Meetings ----
@@ -33,7 +33,7 @@ class MeetingOut(BaseModel):
 QuestionType = Literal["text", "choice", "multi", "bool", "int"]
 
 class QuestionCreate(BaseModel):
-    meeting_id: int
+    meeting_id: Optional[int] = None  # None — при импорте, встреча создаётся вместе с вопросами
     text: str = Field(..., min_length=1)
     order_idx: int = 0
     is_required: bool = True
@@ -47,8 +47,21 @@ class QuestionCreate(BaseModel):
             v = [s.strip() for s in v if s and s.strip()]
             if not v:
                 return None
+            if any(len(s) > 128 for s in v):
+                raise ValueError("вариант ответа длиннее 128 символов")
         return v
 
+    @model_validator(mode="after")
+    def _choice_needs_options(self):
+        if self.type in ("choice", "multi") and not self.options:
+            raise ValueError(f"для вопроса типа {self.type} нужны варианты ответа")
+        return self
+
+
+class QuestionnaireImport(MeetingCreate):
+    """Встреча с вопросами для массового импорта (app/importer.py)."""
+    questions: List[QuestionCreate] = []
+
 
 class QuestionOut(BaseModel):
     id: int
@@ -57,7 +70,7 @@ class QuestionOut(BaseModel):
     order_idx: int
     is_required: bool
     type: QuestionType
-    options: List[str] = []  # плоский список значений (value/label одинаковые в базе)
+    options: List[str] = []  # плоский список значений (value = label, кроме текстов с «,» — importer.option_values)
 
 
 # ---- Responses / Answers ----
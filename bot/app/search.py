@@ -0,0 +1,159 @@
+# app/search.py
+from __future__ import annotations
+
+import html
+import re
+import zlib
+from typing import List, Optional, Tuple
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+from .cache import TTLCache
+from .catalog import Page
+from .config import settings
+from . import repo
+
+
+# Полнотекстовый поиск /search по встречам, вопросам и ответам. Индексы —
+# FTS5 (app/migrations.py, ensure_search_indexes), ранжирование — bm25.
+# Стеммера для русского в SQLite нет, поэтому каждое слово запроса ищется
+# как префикс («улучш» найдёт «улучшить» и «улучшение»), а слова соединяются
+# через AND. «ё» сводится к «е» и в индексе, и в запросе. Страницы листаются
+# по смещению: ранжированный список ключом не разрезать.
+
+MAX_TERMS = 8
+QUESTION_MAX = 60
+_WORD = re.compile(r"\w+")
+
+
+class SearchUnavailable(ValueError):
+    """SQLite собран без FTS5 — индексы поиска не созданы (app/migrations.py)."""
+
+
+def normalize(s: str) -> str:
+    """Как fold_yo в индексе; длина строки не меняется."""
+    return s.replace("ё", "е").replace("Ё", "Е")
+
+
+def terms(query: str) -> List[str]:
+    return _WORD.findall(normalize(query).lower())[:MAX_TERMS]
+
+
+def build_match(query: str) -> str:
+    """
+    Запрос пользователя → выражение FTS5: «что улучшить» → "что"* "улучшить"*.
+    Слова в кавычках, поэтому синтаксис FTS5 (OR, NEAR, "-", "*") из запроса не
+    интерпретируется. Однобуквенные слова — без префикса, иначе совпадёт всё.
+    """
+    words = terms(query)
+    if not words:
+        raise ValueError("Пустой запрос. Пример: /search что улучшить")
+    return " ".join(f'"{w}"*' if len(w) > 1 else f'"{w}"' for w in words)
+
+
+def snippet(text: str, words: List[str], width: Optional[int] = None) -> str:
+    """
+    Фрагмент text вокруг первого найденного слова запроса, в HTML: слово
+    выделено <b>, остальное экранировано.
+    """
+    width = width or settings.SEARCH_SNIPPET_CHARS
+    text = " ".join((text or "").split())
+    folded = normalize(text).lower()
+    best: Optional[Tuple[int, int]] = None
+    for w in words:
+        m = re.search(rf"(?<!\w){re.escape(w)}\w*", folded)
+        if m and (best is None or m.start() < best[0]):
+            best = m.span()
+    if best is None:
+        cut = text[:width]
+        return html.escape(cut) + ("…" if len(text) > width else "")
+    start = max(0, min(best[0] - width // 3, len(text) - width))
+    end = min(len(text), start + width)
+    return (
+        ("…" if start > 0 else "")
+        + html.escape(text[start:best[0]])
+        + "<b>" + html.escape(text[best[0]:best[1]]) + "</b>"
+        + html.escape(text[best[1]:end])
+        + ("…" if end < len(text) else "")
+    )
+
+
+# ---------- Страницы ----------
+
+CALLBACK_PREFIX = "sr:"
+_KIND = {"meeting": "📅", "question": "❓", "answer": "💬"}
+
+# callback_data ограничена 64 байтами — запрос хранится здесь, в кнопке ключ
+_queries: TTLCache[str, str] = TTLCache(maxsize=4096, ttl=24 * 3600)
+
+
+def query_token(query: str) -> str:
+    token = format(zlib.crc32(query.encode("utf-8")), "x")
+    _queries.set(token, query)
+    return token
+
+
+def resolve_query(token: str) -> Optional[str]:
+    return _queries.get(token)
+
+
+def _clip(s: str, limit: int) -> str:
+    return s if len(s) <= limit else s[:limit - 1] + "…"
+
+
+def _line(row, words: List[str]) -> str:
+    meeting = html.escape(f"{row.meeting_id}: {_clip(row.meeting_title, QUESTION_MAX)}")
+    if row.kind == "meeting":
+        return f"{_KIND['meeting']} {html.escape(_clip(row.meeting_title, 100))} (id {row.meeting_id})" + (
+            f" — {snippet(row.body, words)}" if row.body else ""
+        )
+    if row.kind == "question":
+        return f"{_KIND['question']} [{meeting}] вопрос {row.id}: {snippet(row.body, words)}"
+    return (f"{_KIND['answer']} [{meeting}] {html.escape(_clip(row.question or '', QUESTION_MAX))}\n"
+            f"    {snippet(row.body, words)}")
+
+
+def _render(query: str, rows: List, page: int, has_next: bool) -> Page:
+    head = f"🔎 «{html.escape(_clip(query, 100))}»" + (f", стр. {page + 1}" if page or has_next else "")
+    if not rows:
+        return Page(f"{head}:\nНичего не найдено." if not page else f"{head}:\nБольше результатов нет.", None)
+    words = terms(query)
+    token = query_token(query)
+    buttons = []
+    if page:
+        buttons.append(InlineKeyboardButton("◀️ Назад", callback_data=f"sr:{token}:{page - 1}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton("Вперёд ▶️", callback_data=f"sr:{token}:{page + 1}"))
+    text = f"{head}:\n" + "\n".join(_line(r, words) for r in rows)
+    return Page(text, InlineKeyboardMarkup([buttons]) if buttons else None, tuple(r.meeting_id for r in rows))
+
+
+async def get_page(db: AsyncSession, query: str, page: int = 0) -> Page:
+    """
+    Страница результатов (текст в HTML). ValueError — пустой запрос,
+    SearchUnavailable — поиск в этой сборке SQLite недоступен.
+    """
+    match = build_match(query)
+    size = settings.SEARCH_PAGE_SIZE
+    try:
+        rows = await repo.search(db, match, size + 1, page * size)
+    except OperationalError as e:
+        # «no such table: meetings_fts» / «no such module: fts5»
+        if "fts" not in str(e).lower():
+            raise
+        raise SearchUnavailable("Полнотекстовый поиск недоступен: SQLite собран без FTS5.") from e
+    return _render(query, rows[:size], page, len(rows) > size)
+
+
+def parse_callback(data: str) -> Optional[Tuple[str, int]]:
+    """'sr:1a2b:3' → ('1a2b', 3); некорректные данные → None."""
+    parts = (data or "").split(":")
+    if len(parts) != 3 or parts[0] != "sr":
+        return None
+    try:
+        page = int(parts[2])
+    except ValueError:
+        return None
+    return (parts[1], page) if page >= 0 else None
@@ -0,0 +1,167 @@
+# app/security.py
+from __future__ import annotations
+
+import asyncio
+import hmac
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+from passlib.hash import bcrypt
+
+from .config import settings
+
+
+# bcrypt стоит сотни миллисекунд CPU, поэтому хеширование и проверка паролей
+# выполняются в отдельном пуле, а не в event loop бота. Количество одновременно
+# выполняемых операций ограничено семафором по числу воркеров.
+
+
+# ---------- Функции, выполняемые в пуле (должны быть picklable) ----------
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def _hash_many(passwords: Sequence[str], rounds: int) -> List[str]:
+    return [_hash(p, rounds) for p in passwords]
+
+
+def _verify(password: str, password_hash: str, rounds: int) -> Tuple[bool, bool]:
+    ok = bcrypt.verify(password, password_hash)
+    return ok, ok and bcrypt.using(rounds=rounds).needs_update(password_hash)
+
+
+def is_hashed(value: Optional[str]) -> bool:
+    return bool(value) and value.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+# ---------- Пул ----------
+
+_executor: Optional[Executor] = None
+_slots: Optional[asyncio.Semaphore] = None
+_slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if settings.PASSWORD_POOL == "process":
+            _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_WORKERS)
+        else:
+            # pyca/bcrypt отпускает GIL на время хеширования, потоков достаточно
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_WORKERS, thread_name_prefix="bcrypt",
+            )
+    return _executor
+
+
+async def _run(fn, *args):
+    global _slots, _slots_loop
+    loop = asyncio.get_running_loop()
+    if _slots is None or _slots_loop is not loop:
+        # семафор привязан к event loop, в котором ожидает
+        _slots, _slots_loop = asyncio.Semaphore(settings.PASSWORD_WORKERS), loop
+    async with _slots:
+        return await loop.run_in_executor(_get_executor(), fn, *args)
+
+
+def shutdown() -> None:
+    """Остановить пул (вызывается при остановке приложения)."""
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+    _slots = None
+
+
+# ---------- Публичное API ----------
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash, password, settings.BCRYPT_ROUNDS)
+
+
+async def hash_passwords(passwords: Sequence[str], executor: Executor, rounds: int,
+                         chunk: int = 32) -> List[str]:
+    """
+    Хеширование пачки паролей в переданном пуле (массовое создание пользователей):
+    по chunk паролей на задачу, чтобы не платить за передачу в процесс на каждый.
+    Общий пул /login при этом не занимается.
+    """
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(executor, _hash_many, passwords[i:i + chunk], rounds)
+        for i in range(0, len(passwords), chunk)
+    ))
+    return [h for part in parts for h in part]
+
+
+_dummy_hash: Optional[str] = None
+
+
+async def dummy_password_hash() -> str:
+    """
+    bcrypt-хеш той же стоимости, что и у пользователей (вычисляется один раз).
+    Проверка пароля по нему при неизвестном логине выравнивает время ответа.
+    """
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await hash_password("unknown-user")
+    return _dummy_hash
+
+
+async def verify_password(password: str, stored: Optional[str]) -> Tuple[bool, bool]:
+    """
+    Проверка пароля. Возвращает (совпал, нужно_перехешировать).
+    Значения, не похожие на bcrypt-хеш, считаются старыми открытыми паролями:
+    при совпадении их нужно перехешировать.
+    """
+    if not stored:
+        return False, False
+    if not is_hashed(stored):
+        ok = hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+        return ok, ok
+    return await _run(_verify, password, stored, settings.BCRYPT_ROUNDS)
+
+
+# ---------- Ограничение попыток входа ----------
+
+class LoginRateLimiter:
+    """Скользящее окно: не более max_attempts попыток за window секунд на ключ."""
+
+    MAX_KEYS = 10_000
+
+    def __init__(self, max_attempts: int, window: float) -> None:
+        self.max_attempts = max_attempts
+        self.window = window
+        self._attempts: Dict[int, Deque[float]] = {}
+
+    def allow(self, key: int) -> bool:
+        now = time.monotonic()
+        if len(self._attempts) > self.MAX_KEYS:
+            self._sweep(now)
+        q = self._attempts.setdefault(key, deque())
+        while q and q[0] <= now - self.window:
+            q.popleft()
+        if len(q) >= self.max_attempts:
+            return False
+        q.append(now)
+        return True
+
+    def _sweep(self, now: float) -> None:
+        stale = [k for k, q in self._attempts.items() if not q or q[-1] <= now - self.window]
+        for k in stale:
+            del self._attempts[k]
+
+    def reset(self, key: int) -> None:
+        self._attempts.pop(key, None)
+
+    def retry_after(self, key: int) -> float:
+        q = self._attempts.get(key)
+        if not q:
+            return 0.0
+        return max(0.0, q[0] + self.window - time.monotonic())
+
+
+login_limiter = LoginRateLimiter(settings.LOGIN_MAX_ATTEMPTS, settings.LOGIN_WINDOW_SEC)
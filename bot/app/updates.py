@@ -0,0 +1,157 @@
+# app/updates.py
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Awaitable, Deque, Dict, FrozenSet, Hashable, List, Optional
+
+from telegram.ext import BaseUpdateProcessor
+
+from .config import settings
+
+
+# Параллельная обработка апдейтов. PTB по умолчанию обрабатывает апдейты
+# по одному, и медленный /exportjson задерживает всех. Здесь:
+#   * апдейты разных чатов идут параллельно (не больше max_concurrent);
+#   * апдейты одного чата — строго по порядку поступления (замок на чат,
+#     asyncio.Lock отдаёт его ожидающим в порядке FIFO), поэтому ответы
+#     анкеты /fill не переставляются;
+#   * тяжёлые команды (выгрузки, агрегаты) идут в отдельную узкую полосу
+#     и не занимают слоты обычных апдейтов.
+# Слот полосы берётся только после замка чата: один «шумный» чат не может
+# занять все слоты своими ждущими апдейтами.
+
+
+def _chat_key(update: object) -> Optional[Hashable]:
+    chat = getattr(update, "effective_chat", None)
+    if chat is not None:
+        return chat.id
+    user = getattr(update, "effective_user", None)
+    return ("user", user.id) if user is not None else None
+
+
+def _command(update: object) -> Optional[str]:
+    msg = getattr(update, "effective_message", None)
+    # команда может быть и в подписи к файлу (/importmeeting)
+    text = getattr(msg, "text", None) or getattr(msg, "caption", None) or ""
+    if not text.startswith("/"):
+        return None
+    return text[1:].split(maxsplit=1)[0].split("@", 1)[0].lower() if len(text) > 1 else None
+
+
+class _ChatLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Обработчик апдейтов с параллелизмом между чатами и порядком внутри чата."""
+
+    WAIT_SAMPLES = 1000
+
+    def __init__(self, max_concurrent: Optional[int] = None, heavy_concurrent: Optional[int] = None,
+                 max_pending: Optional[int] = None, heavy_commands: Optional[FrozenSet[str]] = None) -> None:
+        # семафор базового класса ограничивает число принятых апдейтов (ждущие + выполняемые)
+        super().__init__(max_pending or settings.UPDATE_MAX_PENDING)
+        self.max_concurrent = max_concurrent or settings.UPDATE_CONCURRENCY
+        self.heavy_concurrent = heavy_concurrent or settings.UPDATE_HEAVY_CONCURRENCY
+        self.heavy_commands = heavy_commands if heavy_commands is not None else frozenset(
+            c.strip().lower() for c in settings.UPDATE_HEAVY_COMMANDS.split(",") if c.strip()
+        )
+        self._lanes: Dict[str, asyncio.Semaphore] = {}
+        self._chats: Dict[Hashable, _ChatLock] = {}
+        # метрики
+        self.queued = 0
+        self.running = {"default": 0, "heavy": 0}
+        self.processed = 0
+        self.max_queued = 0
+        self._waits: Deque[float] = deque(maxlen=self.WAIT_SAMPLES)
+        self._wait_max = 0.0
+
+    async def initialize(self) -> None:
+        self._lanes = {
+            "default": asyncio.Semaphore(self.max_concurrent),
+            "heavy": asyncio.Semaphore(self.heavy_concurrent),
+        }
+
+    async def shutdown(self) -> None:
+        self._chats.clear()
+
+    def lane_of(self, update: object) -> str:
+        return "heavy" if _command(update) in self.heavy_commands else "default"
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        if not self._lanes:
+            await self.initialize()
+        lane = self.lane_of(update)
+        key = _chat_key(update)
+        entry = self._enter_chat(key)
+        enqueued = time.monotonic()
+        started = False
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            async with entry.lock if entry is not None else nullcontext():
+                async with self._lanes[lane]:
+                    started = True
+                    self.queued -= 1
+                    wait = time.monotonic() - enqueued
+                    self._waits.append(wait)
+                    self._wait_max = max(self._wait_max, wait)
+                    self.running[lane] += 1
+                    try:
+                        await coroutine
+                    finally:
+                        self.running[lane] -= 1
+                        self.processed += 1
+        finally:
+            if not started:  # отменён до начала обработки
+                self.queued -= 1
+                if asyncio.iscoroutine(coroutine):
+                    coroutine.close()
+            self._leave_chat(key, entry)
+
+    def _enter_chat(self, key: Optional[Hashable]) -> Optional[_ChatLock]:
+        if key is None:
+            return None
+        entry = self._chats.get(key)
+        if entry is None:
+            entry = self._chats[key] = _ChatLock()
+        entry.users += 1
+        return entry
+
+    def _leave_chat(self, key: Optional[Hashable], entry: Optional[_ChatLock]) -> None:
+        # замок чата живёт, пока у чата есть апдейты в обработке или в ожидании
+        if entry is not None:
+            entry.users -= 1
+            if not entry.users:
+                self._chats.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        waits: List[float] = sorted(self._waits)
+        p95 = waits[min(len(waits) - 1, int(len(waits) * 0.95))] if waits else 0.0
+        return {
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "running": self.running["default"],
+            "heavy_running": self.running["heavy"],
+            "max_concurrent": self.max_concurrent,
+            "heavy_concurrent": self.heavy_concurrent,
+            "chats": len(self._chats),
+            "processed": self.processed,
+            "wait_avg_ms": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_p95_ms": round(1000 * p95, 1),
+            "wait_max_ms": round(1000 * self._wait_max, 1),
+        }
+
+
+def make_processor() -> Optional[ChatOrderedUpdateProcessor]:
+    """Процессор для ApplicationBuilder.concurrent_updates; None — последовательный режим PTB."""
+    if settings.UPDATE_CONCURRENCY <= 1:
+        return None
+    return ChatOrderedUpdateProcessor()
@@ -8,6 +8,7 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from .db import SessionLocal
+from .cache import identity_cache
 from . import repo
 
 
@@ -26,13 +27,23 @@ def _wants_db_user(func: Callable) -> bool:
     )
 
 
+async def resolve_user(db, telegram_id: int):
+    """Текущий пользователь по telegram_id: сначала кэш, затем БД."""
+    user = identity_cache.get(telegram_id)
+    if user is None:
+        user = await repo.get_active_user(db, telegram_id)
+        if user is not None:
+            identity_cache.set(telegram_id, user)
+    return user
+
+
 def require_login(func: Callable):
     wants = _wants_db_user(func)
 
     @wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
         async with SessionLocal() as db:
-            user = await repo.get_active_user(db, update.effective_user.id)
+            user = await resolve_user(db, update.effective_user.id)
             if not user:
                 await update.message.reply_text("❌ Вы не авторизованы. Используйте /login.")
                 return
@@ -53,7 +64,7 @@ def require_role(role_name: str):
         @wraps(func)
         async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE, *args, **kwargs):
             async with SessionLocal() as db:
-                user = await repo.get_active_user(db, update.effective_user.id)
+                user = await resolve_user(db, update.effective_user.id)
                 if not user:
                     await update.message.reply_text("❌ Вы не авторизованы. Используйте /login.")
                     return
@@ -87,3 +98,14 @@ def parse_meeting_form(text: str):
 
     return title, desc, dept, country, deadline
 
+
+
+def parse_when(text: str) -> datetime:
+    """'2025-12-01' или '2025-12-01 18:00' (UTC) → datetime."""
+    text = " ".join(text.split())
+    for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError("⛔ Формат даты: YYYY-MM-DD или YYYY-MM-DD HH:MM (UTC)")
@@ -0,0 +1,283 @@
+# app/webhook.py
+from __future__ import annotations
+
+import asyncio
+import hmac
+import json
+import signal
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from loguru import logger
+from telegram import Update
+from telegram.ext import Application
+
+from .config import settings
+from . import metrics
+
+
+# Webhook-режим: Telegram сам присылает апдейты POST-запросами на WEBHOOK_PATH.
+# Небольшой HTTP/1.1-сервер на asyncio (keep-alive, тело только с Content-Length —
+# так шлёт Telegram) кладёт апдейты прямо в app.update_queue, дальше работает
+# обычный Application. Сервер:
+#   * сверяет X-Telegram-Bot-Api-Secret-Token с WEBHOOK_SECRET;
+#   * отбрасывает повторы по update_id (Telegram повторяет доставку, если не
+#     дождался ответа) — помнит последние WEBHOOK_DEDUP_SIZE идентификаторов;
+#   * при остановке перестаёт принимать апдейты (503 — Telegram доставит их
+#     позже), дожидается обработки очереди и только потом останавливает бота;
+#   * отдаёт /healthz, /readyz и /metrics (их же проксирует launchApp/webapp.py).
+# В режиме polling тот же сервер можно поднять только ради этих адресов
+# (STATUS_SERVER=1, accept_updates=False).
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+Response = Tuple[int, str, bytes]
+
+
+def _json(status: int, data: Dict[str, Any]) -> Response:
+    return status, "application/json", json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+
+def _text(status: int, text: str) -> Response:
+    return status, "text/plain; charset=utf-8", text.encode("utf-8")
+
+
+class WebhookServer:
+    def __init__(self, app: Application, path: Optional[str] = None, secret: Optional[str] = None,
+                 dedup_size: Optional[int] = None, max_body: Optional[int] = None,
+                 accept_updates: bool = True) -> None:
+        self.app = app
+        self.accept_updates = accept_updates
+        self.path = path or settings.WEBHOOK_PATH
+        self.secret = secret if secret is not None else settings.WEBHOOK_SECRET
+        self.dedup_size = dedup_size or settings.WEBHOOK_DEDUP_SIZE
+        self.max_body = max_body or settings.WEBHOOK_MAX_BODY
+        self._seen: OrderedDict[int, None] = OrderedDict()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+        self._inflight = 0
+        self.draining = False
+        self.started_at: Optional[float] = None
+        self.address: Optional[Tuple[str, int]] = None
+        # метрики
+        self.received = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    # ---------- жизненный цикл ----------
+
+    async def start(self, host: Optional[str] = None, port: Optional[int] = None) -> Tuple[str, int]:
+        """Начать приём соединений; вернуть фактический адрес (port=0 — любой свободный)."""
+        self._server = await asyncio.start_server(
+            self._handle_connection,
+            host if host is not None else settings.WEBHOOK_LISTEN,
+            port if port is not None else settings.WEBHOOK_PORT,
+        )
+        self.started_at = time.monotonic()
+        addr = self._server.sockets[0].getsockname()
+        self.address = (addr[0], addr[1])
+        logger.info("Webhook server listening on {}:{}{}", addr[0], addr[1], self.path)
+        return self.address
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Перестать принимать апдейты и дождаться обработки принятых.
+        Вернуть False, если за timeout очередь не опустела.
+        """
+        self.draining = True
+        if self._server is not None:
+            self._server.close()
+        timeout = timeout if timeout is not None else settings.WEBHOOK_DRAIN_TIMEOUT
+        try:
+            await asyncio.wait_for(self._wait_idle(), timeout)
+            done = True
+        except asyncio.TimeoutError:
+            logger.warning("Webhook drain timed out, {} updates left", self.app.update_queue.qsize())
+            done = False
+        await self.close()
+        return done
+
+    async def close(self) -> None:
+        """Закрыть сервер и все соединения, не дожидаясь очереди."""
+        if self._server is not None:
+            self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def _wait_idle(self) -> None:
+        while self._inflight:
+            await asyncio.sleep(0.01)
+        # Application.stop() ждёт то же самое, но без таймаута
+        await self.app.update_queue.join()
+
+    # ---------- HTTP ----------
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                request = self._parse_head(head)
+                if request is None:
+                    await self._respond(writer, _text(400, "bad request"), keep_alive=False)
+                    return
+                method, target, headers = request
+                length = int(headers.get("content-length") or 0)
+                if length > self.max_body:
+                    await self._respond(writer, _text(413, "too large"), keep_alive=False)
+                    return
+                body = await reader.readexactly(length) if length else b""
+                self._inflight += 1
+                try:
+                    response = await self._dispatch(method, target.split("?", 1)[0], headers, body)
+                finally:
+                    self._inflight -= 1
+                keep_alive = headers.get("connection", "").lower() != "close" and not self.draining
+                await self._respond(writer, response, keep_alive)
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head: bytes) -> Optional[Tuple[str, str, Dict[str, str]]]:
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                if line:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+            int(headers.get("content-length") or 0)
+        except ValueError:
+            return None
+        return method.upper(), target, headers
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, response: Response, keep_alive: bool) -> None:
+        status, content_type, body = response
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> Response:
+        if path == self.path and self.accept_updates:
+            if method != "POST":
+                return _text(405, "method not allowed")
+            return await self._accept(headers, body)
+        if method not in ("GET", "HEAD"):
+            return _text(405, "method not allowed")
+        if path == "/healthz":
+            return _json(200, {"status": "ok", **self.stats()})
+        if path == "/readyz":
+            ready = self.app.running and not self.draining
+            return _json(200 if ready else 503, {"ready": ready})
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4; charset=utf-8", metrics.render_prometheus().encode("utf-8")
+        if path == "/ping":
+            return _text(200, "pong")
+        if path == "/":
+            return _text(200, "🤖 Bot webhook is running!")
+        return _text(404, "not found")
+
+    async def _accept(self, headers: Dict[str, str], body: bytes) -> Response:
+        if self.secret and not hmac.compare_digest(
+            headers.get(SECRET_HEADER, "").encode("utf-8"), self.secret.encode("utf-8")
+        ):
+            self.rejected += 1
+            return _text(403, "forbidden")
+        if self.draining:
+            return _text(503, "draining")
+        try:
+            data = json.loads(body)
+            update_id = int(data["update_id"])
+        except (ValueError, TypeError, KeyError):
+            return _text(400, "bad update")
+        if self._is_duplicate(update_id):
+            self.duplicates += 1
+            return _text(200, "duplicate")
+        await self.app.update_queue.put(Update.de_json(data, self.app.bot))
+        self.received += 1
+        return _text(200, "ok")
+
+    def _is_duplicate(self, update_id: int) -> bool:
+        if update_id in self._seen:
+            return True
+        self._seen[update_id] = None
+        if len(self._seen) > self.dedup_size:
+            self._seen.popitem(last=False)
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": "webhook" if self.accept_updates else "polling",
+            "draining": self.draining,
+            "uptime_sec": round(time.monotonic() - self.started_at, 1) if self.started_at else 0.0,
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "queue": self.app.update_queue.qsize(),
+            "connections": len(self._connections),
+        }
+
+
+def _stop_event() -> asyncio.Event:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: Ctrl+C отменит задачу, остановка пройдёт через finally
+            pass
+    return stop
+
+
+async def serve(app: Application, stop: Optional[asyncio.Event] = None,
+                host: Optional[str] = None, port: Optional[int] = None,
+                server: Optional[WebhookServer] = None) -> None:
+    """
+    Запуск бота в webhook-режиме до сигнала остановки (SIGINT/SIGTERM или stop).
+    Повторяет жизненный цикл run_polling: post_init → start → … → post_stop → post_shutdown.
+    """
+    server = server or WebhookServer(app)
+    await app.initialize()
+    try:
+        if app.post_init:
+            await app.post_init(app)
+        await server.start(host, port)
+        if settings.WEBHOOK_URL:
+            await app.bot.set_webhook(
+                url=settings.WEBHOOK_URL.rstrip("/") + server.path,
+                secret_token=server.secret or None,
+                allowed_updates=Update.ALL_TYPES,
+            )
+        await app.start()
+        try:
+            await (stop or _stop_event()).wait()
+        finally:
+            logger.info("Webhook server draining")
+            await server.drain()
+            await app.stop()
+            if app.post_stop:
+                await app.post_stop(app)
+    finally:
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
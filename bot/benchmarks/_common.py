@@ -0,0 +1,65 @@
+# benchmarks/_common.py
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from bot.app.db import make_engine
+
+BASE_DIR = os.path.dirname(os.path.dirname(__file__))     # bot/
+SQL_FILE = os.path.join(BASE_DIR, "data", "init.sql")
+
+
+def make_db() -> str:
+    """Временная SQLite-база со схемой и тестовыми данными из init.sql."""
+    fd, path = tempfile.mkstemp(prefix="bench_", suffix=".db")
+    os.close(fd)
+    with sqlite3.connect(path) as conn, open(SQL_FILE, "r", encoding="utf-8") as f:
+        conn.executescript(f.read())
+    return path
+
+
+def seed_users(conn: sqlite3.Connection, n: int, role_id: int = 3) -> int:
+    """Добавляет n участников, возвращает id первого."""
+    start = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM users").fetchone()[0]
+    conn.executemany(
+        "INSERT INTO users (id, username, password_hash, role_id) VALUES (?, ?, ?, ?)",
+        ((start + i, f"bench_user_{start + i}", "x", role_id) for i in range(n)),
+    )
+    return start
+
+
+def session_factory(path: str, profile: bool = True, **engine_kw) -> Tuple[object, async_sessionmaker]:
+    """
+    Движок и фабрика сессий для временной базы.
+    profile=False — «как раньше»: create_async_engine с настройками по умолчанию.
+    """
+    url = f"sqlite+aiosqlite:///{path}"
+    engine = make_engine(url, **engine_kw) if profile else create_async_engine(url, **engine_kw)
+    return engine, async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+
+@contextmanager
+def measure(trace_memory: bool = False) -> Iterator[dict]:
+    """
+    Замер времени; с trace_memory=True — ещё и пиковой памяти Python (tracemalloc).
+    tracemalloc заметно замедляет код, поэтому время и память лучше мерить отдельными прогонами.
+    """
+    stats: dict = {}
+    if trace_memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats["seconds"] = time.perf_counter() - t0
+        if trace_memory:
+            stats["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
@@ -0,0 +1,75 @@
+# benchmarks/answer_writes.py
+"""
+Пропускная способность записи ответов (repo.add_answer) при конкурентных /answer.
+
+    python -m bot.benchmarks.answer_writes [users] [answers_per_user]
+
+Сравнивает движок с настройками по умолчанию (rollback journal, synchronous=FULL,
+без busy_timeout), SQLite-профиль из app/db.py (WAL, synchronous=NORMAL, ...)
+и запись пачками через app/ingest.AnswerWriter поверх профиля.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import sys
+
+from bot.app import repo
+from bot.app.ingest import AnswerWriter
+from bot.benchmarks._common import make_db, measure, seed_users, session_factory
+
+
+async def _writer(Session, user_id: int, question_ids: list[int], n: int, errors: list,
+                  writer: AnswerWriter | None = None) -> None:
+    for i in range(n):
+        qid = question_ids[i % len(question_ids)]
+        try:
+            if writer is not None:
+                await writer.submit(user_id, qid, f"ответ {i}")
+                continue
+            async with Session() as db:
+                await repo.add_answer(db, user_id, qid, f"ответ {i}")
+        except Exception as e:  # noqa: BLE001 — считаем любые ошибки записи
+            errors.append(type(e).__name__ + ": " + str(e).splitlines()[0])
+
+
+async def run(profile: bool, users: int, per_user: int, batched: bool = False) -> None:
+    path = make_db()
+    try:
+        with sqlite3.connect(path) as conn:
+            first = seed_users(conn, users)
+            question_ids = [r[0] for r in conn.execute("SELECT id FROM questions")]
+        engine, Session = session_factory(path, profile=profile)
+        writer = AnswerWriter(session_factory=Session) if batched else None
+        if writer:
+            await writer.start()
+        errors: list = []
+        with measure() as st:
+            await asyncio.gather(*(
+                _writer(Session, first + u, question_ids, per_user, errors, writer) for u in range(users)
+            ))
+        if writer:
+            await writer.stop()
+        await engine.dispose()
+        ok = users * per_user - len(errors)
+        label = "profile + group commit" if batched else "profile (WAL, NORMAL)" if profile else "defaults"
+        print(f"{label:>22}: {ok / st['seconds']:>8,.0f} answers/s, {st['seconds']:.2f}s, errors: {len(errors)}")
+        if errors:
+            print(f"{'':>24}first error: {errors[0]}")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(run(False, users, per_user))
+    asyncio.run(run(True, users, per_user))
+    asyncio.run(run(True, users, per_user, batched=True))
+
+
+if __name__ == "__main__":
+    main()
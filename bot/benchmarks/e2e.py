@@ -0,0 +1,263 @@
+# benchmarks/e2e.py
+"""
+Сквозной нагрузочный прогон бота без сети.
+
+    python -m bot.benchmarks.e2e [--users 50] [--rounds 3] [--burst 5] [--api-latency-ms 0]
+                                 [--out e2e.json] [--compare previous.json]
+
+Собирает настоящий Application (build_app) с локальной заглушкой Bot API
+(app/localapi.py) поверх временной SQLite-базы с тестовой встречей и
+анкетами. N пользователей одновременно проходят сценарий: /login, /meetings,
+/questions, серия /answer, /whoami; администратор параллельно делает
+выгрузки и /results. Для каждой команды — p50/p95/p99 времени обработки,
+ошибки и число/время SQL-запросов; в целом — пропускная способность.
+Результат пишется в JSON (с хэшем коммита), --compare печатает разницу
+с предыдущим прогоном.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextvars
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from telegram import Update
+
+from bot.app import ingest
+from bot.app.bot import build_app
+from bot.app.cache import identity_cache
+from bot.app.db import SessionLocal
+from bot.app.localapi import LocalTelegramRequest
+from bot.benchmarks._common import BASE_DIR, make_db, session_factory
+from bot.benchmarks.export_meeting import seed
+
+# команда, которую сейчас обрабатывает задача (SQL из фонового писателя — «(background)»)
+_command: contextvars.ContextVar[str] = contextvars.ContextVar("bench_command", default="(background)")
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self.latency: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.first_error: Dict[str, str] = {}
+        self.queries: Dict[str, int] = defaultdict(int)
+        self.sql_ms: Dict[str, float] = defaultdict(float)
+
+    def attach(self, engine) -> None:
+        sync = engine.sync_engine
+
+        @event.listens_for(sync, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("bench_t0", []).append(time.perf_counter())
+
+        @event.listens_for(sync, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["bench_t0"].pop()
+            name = _command.get()
+            self.queries[name] += 1
+            self.sql_ms[name] += (time.perf_counter() - started) * 1000
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        out = {}
+        for name in sorted(set(self.latency) | set(self.queries)):
+            samples = sorted(self.latency.get(name, []))
+            n = len(samples)
+            out[name] = {
+                "count": n,
+                "errors": self.errors.get(name, 0),
+                "first_error": self.first_error.get(name),
+                "p50_ms": _pct(samples, 50),
+                "p95_ms": _pct(samples, 95),
+                "p99_ms": _pct(samples, 99),
+                "max_ms": round(samples[-1], 2) if samples else 0.0,
+                "queries": self.queries.get(name, 0),
+                "queries_per_call": round(self.queries.get(name, 0) / n, 2) if n else None,
+                "sql_ms_per_call": round(self.sql_ms.get(name, 0.0) / n, 2) if n else None,
+            }
+        return out
+
+
+def _pct(samples: List[float], p: float) -> float:
+    """Процентиль методом ближайшего ранга."""
+    if not samples:
+        return 0.0
+    k = max(0, min(len(samples) - 1, -(-len(samples) * p // 100) - 1))
+    return round(samples[int(k)], 2)
+
+
+class Client:
+    """Один симулируемый пользователь: свой telegram_id, чат и счётчик сообщений."""
+
+    _update_ids = itertools.count(1)
+
+    def __init__(self, app, rec: Recorder, telegram_id: int) -> None:
+        self.app = app
+        self.rec = rec
+        self.telegram_id = telegram_id
+
+    async def send(self, text: str) -> None:
+        uid = next(self._update_ids)
+        command = text.split(maxsplit=1)[0]
+        data = {"update_id": uid, "message": {
+            "message_id": uid, "date": int(time.time()), "text": text,
+            "chat": {"id": self.telegram_id, "type": "private"},
+            "from": {"id": self.telegram_id, "is_bot": False, "first_name": "Bench"},
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(command)}],
+        }}
+        update = Update.de_json(data, self.app.bot)
+        token = _command.set(command)
+        t0 = time.perf_counter()
+        try:
+            await self.app.process_update(update)
+        finally:
+            self.rec.latency[command].append((time.perf_counter() - t0) * 1000)
+            _command.reset(token)
+
+
+async def _participant(client: Client, username: str, meeting_id: int, qids: List[int],
+                       rounds: int, burst: int, rnd: random.Random) -> None:
+    await client.send(f"/login {username} x")
+    for r in range(rounds):
+        await client.send("/meetings")
+        await client.send(f"/questions {meeting_id}")
+        for i in range(burst):
+            await client.send(f"/answer {rnd.choice(qids)} ответ {r}-{i}")
+        await client.send("/whoami")
+
+
+async def _admin(client: Client, meeting_id: int, rounds: int) -> None:
+    await client.send("/login admin admin123")
+    for _ in range(rounds):
+        await client.send(f"/results {meeting_id}")
+        await client.send(f"/exportmeeting {meeting_id}")
+        await client.send("/exportjson ndjson")
+
+
+async def run(args) -> Dict[str, Any]:
+    path = make_db()
+    try:
+        meeting_id = seed(path, responses=max(args.users, args.seed_responses), questions=args.questions)
+        with sqlite3.connect(path) as conn:
+            qids = [r[0] for r in conn.execute("SELECT id FROM questions WHERE meeting_id = ?", (meeting_id,))]
+            users = [r[0] for r in conn.execute(
+                "SELECT username FROM users WHERE username LIKE 'bench_user_%' ORDER BY id LIMIT ?",
+                (args.users,))]
+
+        engine, _ = session_factory(path)
+        SessionLocal.configure(bind=engine)
+        identity_cache.clear()
+        rec = Recorder()
+        rec.attach(engine)
+
+        api = LocalTelegramRequest(latency=args.api_latency_ms / 1000)
+        app = build_app(request=api)
+
+        async def on_error(update, context):
+            name = _command.get()
+            rec.errors[name] += 1
+            rec.first_error.setdefault(name, f"{type(context.error).__name__}: {context.error}"[:300])
+
+        app.add_error_handler(on_error)
+        await app.initialize()
+        await ingest.answer_writer.start()
+        rnd = random.Random(args.seed)
+        try:
+            t0 = time.perf_counter()
+            await asyncio.gather(
+                _admin(Client(app, rec, 900_000_000), meeting_id, args.rounds),
+                *(_participant(Client(app, rec, 1_000_000_000 + i), name, meeting_id, qids,
+                               args.rounds, args.burst, random.Random(rnd.random()))
+                  for i, name in enumerate(users)),
+            )
+            wall = time.perf_counter() - t0
+        finally:
+            await ingest.answer_writer.stop()
+            await app.shutdown()
+            await engine.dispose()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    commands = rec.report()
+    total = sum(c["count"] for c in commands.values())
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "updates": total,
+        "seconds": round(wall, 3),
+        "throughput": round(total / wall, 1) if wall else 0.0,
+        "api_calls": api.stats()["calls"],
+        "commands": commands,
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True, cwd=BASE_DIR).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(res: Dict[str, Any], base: Optional[Dict[str, Any]] = None) -> None:
+    print(f"commit {res['commit']}: {res['updates']} updates in {res['seconds']:.2f}s, "
+          f"{res['throughput']:,.0f} updates/s")
+    if base is not None:
+        print(f"  vs {base.get('commit')}: {base['throughput']:,.0f} updates/s "
+              f"({_delta(res['throughput'], base['throughput'])})")
+    print(f"{'command':>15} {'n':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'q/call':>7} {'sql ms':>7}")
+    for name, c in res["commands"].items():
+        line = (f"{name:>15} {c['count']:>6} {c['errors']:>4} {c['p50_ms']:>8.2f} {c['p95_ms']:>8.2f} "
+                f"{c['p99_ms']:>8.2f} {c['queries_per_call'] if c['count'] else c['queries']:>7} "
+                f"{c['sql_ms_per_call'] or 0:>7.2f}")
+        old = (base or {}).get("commands", {}).get(name)
+        if old and c["count"]:
+            line += f"   p95 {_delta(c['p95_ms'], old['p95_ms'])}, q/call {old['queries_per_call']}"
+        print(line)
+
+
+def _delta(new: float, old: float) -> str:
+    return f"{(new - old) * 100 / old:+.1f}%" if old else "n/a"
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--users", type=int, default=50)
+    p.add_argument("--rounds", type=int, default=3)
+    p.add_argument("--burst", type=int, default=5, help="/answer подряд за раунд")
+    p.add_argument("--questions", type=int, default=10)
+    p.add_argument("--seed-responses", type=int, default=500, help="анкет в базе до прогона")
+    p.add_argument("--api-latency-ms", type=float, default=0.0)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", default=None, help="JSON с результатом (по умолчанию e2e-<commit>.json)")
+    p.add_argument("--compare", default=None, help="JSON предыдущего прогона")
+    args = p.parse_args()
+
+    res = asyncio.run(run(args))
+    base = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            base = json.load(f)
+    print_report(res, base)
+    out = args.out or f"e2e-{res['commit'] or 'local'}.json"
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(res, f, ensure_ascii=False, indent=2)
+    print(f"saved {out}")
+
+
+if __name__ == "__main__":
+    main()
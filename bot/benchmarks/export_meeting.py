@@ -0,0 +1,83 @@
+# benchmarks/export_meeting.py
+"""
+Бенчмарк CSV-выгрузки встречи (/exportmeeting).
+
+    python -m bot.benchmarks.export_meeting [responses] [questions]
+
+Создаёт временную базу с одной встречей на `questions` вопросов и `responses`
+анкетами, выгружает её в CSV и CSV.gz и печатает скорость и пиковую память.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import sys
+
+from bot.app import export
+from bot.benchmarks._common import make_db, measure, seed_users, session_factory
+
+
+def seed(path: str, responses: int, questions: int) -> int:
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "INSERT INTO meetings (title, status, created_by) VALUES ('Бенчмарк', 'open', 1)"
+        )
+        meeting_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        types = ["text", "choice", "multi", "bool", "int"]
+        conn.executemany(
+            "INSERT INTO questions (meeting_id, text, order_idx, type) VALUES (?, ?, ?, ?)",
+            ((meeting_id, f"Вопрос {i}", i, types[i % len(types)]) for i in range(questions)),
+        )
+        qids = [r[0] for r in conn.execute(
+            "SELECT id FROM questions WHERE meeting_id = ? ORDER BY order_idx", (meeting_id,))]
+        first_user = seed_users(conn, responses)
+        conn.executemany(
+            "INSERT INTO responses (id, user_id, meeting_id, status, submitted_at) "
+            "VALUES (?, ?, ?, 'submitted', CURRENT_TIMESTAMP)",
+            ((first_user + i, first_user + i, meeting_id) for i in range(responses)),
+        )
+        conn.executemany(
+            "INSERT INTO answers (response_id, question_id, value) VALUES (?, ?, ?)",
+            ((first_user + i, q, f"ответ {i % 7}, вариант {q % 3}")
+             for i in range(responses) for q in qids),
+        )
+    return meeting_id
+
+
+async def _export(Session, meeting_id: int, compress: bool, trace_memory: bool):
+    async with Session() as db:
+        with measure(trace_memory) as st:
+            fp, name = await export.export_meeting(db, meeting_id, compress=compress)
+            st["size"] = fp.seek(0, os.SEEK_END)
+            fp.close()
+    return name, st
+
+
+async def run(path: str, meeting_id: int, responses: int) -> None:
+    engine, Session = session_factory(path)
+    try:
+        for compress in (False, True):
+            name, st = await _export(Session, meeting_id, compress, trace_memory=False)
+            _, mem = await _export(Session, meeting_id, compress, trace_memory=True)
+            print(
+                f"{name:>22}: {responses / st['seconds']:>10,.0f} responses/s, "
+                f"{st['seconds']:.2f}s, peak {mem['peak_mb']:.1f} MB, file {st['size'] / 1024 / 1024:.1f} MB"
+            )
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    responses = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    questions = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    path = make_db()
+    try:
+        meeting_id = seed(path, responses, questions)
+        asyncio.run(run(path, meeting_id, responses))
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
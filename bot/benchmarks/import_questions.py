@@ -0,0 +1,81 @@
+# benchmarks/import_questions.py
+"""
+Импорт анкеты из N вопросов: app/importer против вопроса за вопросом.
+
+    python -m bot.benchmarks.import_questions [questions] [baseline_questions]
+
+Шаблон — одна встреча, половина вопросов с выбором из 4 вариантов.
+«importer» — разбор JSON + проверка + пакетная запись одной транзакцией;
+«add_question» — repo.add_question на каждый вопрос (SELECT встречи и commit
+на вопрос, как /addquestion), меряется на baseline_questions вопросах.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+
+from bot.app import importer, repo
+from bot.benchmarks._common import make_db, measure, session_factory
+
+
+def template(n: int) -> bytes:
+    questions = [
+        {"text": f"Вопрос {i}", "type": "choice", "options": ["A", "B", "C", "D"]} if i % 2
+        else {"text": f"Вопрос {i}", "type": "text"}
+        for i in range(n)
+    ]
+    return json.dumps({"title": "Шаблон", "department": "Bench", "questions": questions},
+                      ensure_ascii=False).encode("utf-8")
+
+
+async def run_importer(n: int) -> None:
+    path = make_db()
+    try:
+        engine, Session = session_factory(path)
+        data = template(n)
+        with measure() as parse_st:
+            items = importer.parse(data, "template.json")
+        async with Session() as db:
+            with measure() as write_st:
+                await importer.import_questionnaires(db, items, created_by=1)
+        await engine.dispose()
+        total = parse_st["seconds"] + write_st["seconds"]
+        print(f"{'importer':>14}: {n / total:>9,.0f} questions/s, {total:.2f}s "
+              f"(parse+validate {parse_st['seconds']:.2f}s, write {write_st['seconds']:.2f}s)")
+    finally:
+        _cleanup(path)
+
+
+async def run_one_by_one(n: int) -> None:
+    path = make_db()
+    try:
+        engine, Session = session_factory(path)
+        async with Session() as db:
+            meeting = await repo.create_meeting(db, "Шаблон", "", "Bench", "", None, created_by=1)
+            with measure() as st:
+                for i in range(n):
+                    await repo.add_question(db, meeting.id, f"Вопрос {i}")
+        await engine.dispose()
+        print(f"{'add_question':>14}: {n / st['seconds']:>9,.0f} questions/s, {st['seconds']:.2f}s "
+              f"(без вариантов ответа)")
+    finally:
+        _cleanup(path)
+
+
+def _cleanup(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    baseline = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000
+    asyncio.run(run_importer(n))
+    asyncio.run(run_one_by_one(baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/inline_lookup.py
+"""
+Inline-поиск встреч: LIKE по SQLite на каждое нажатие клавиши против
+индекса в памяти (app/lookup.MeetingIndex).
+
+    python -m bot.benchmarks.inline_lookup [meetings]
+
+Запросы набираются посимвольно («п», «пл», «пла», …), как их присылает
+Telegram. Кэш ответов по строке запроса не участвует — меряется поиск.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from sqlalchemy import or_, select
+
+from bot.app import repo
+from bot.app.lookup import MeetingIndex
+from bot.app.models import Meeting
+from bot.benchmarks._common import make_db, measure, session_factory
+
+TOPICS = ("Планирование", "Ретроспектива", "Демо", "Синк", "Разбор инцидента", "Онбординг", "Стратегия", "Бюджет")
+DEPARTMENTS = ("Разработка", "Отдел продаж", "Маркетинг", "Поддержка", "Финансы", "HR")
+COUNTRIES = ("Россия", "Казахстан", "Беларусь", "Армения", "Сербия")
+QUERIES = ("планирование", "разбор казах", "маркетинг", "онбординг hr")
+LIMIT = 20
+
+
+def build(path: str, n: int) -> None:
+    rnd = random.Random(1)
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO meetings (title, department, country, status, created_by) VALUES (?, ?, ?, ?, 1)",
+            ((f"{rnd.choice(TOPICS)} {rnd.choice(('Q1', 'Q2', 'Q3', 'Q4'))} #{i}", rnd.choice(DEPARTMENTS),
+              rnd.choice(COUNTRIES), rnd.choice(("open", "closed", "draft"))) for i in range(n)),
+        )
+
+
+def keystrokes():
+    for q in QUERIES:
+        for i in range(1, len(q) + 1):
+            if not q[:i].endswith(" "):
+                yield q[:i]
+
+
+async def run(n: int) -> None:
+    path = make_db()
+    try:
+        build(path, n)
+        engine, Session = session_factory(path)
+        typed = list(keystrokes())
+        async with Session() as db:
+            t0 = time.perf_counter()
+            for q in typed:
+                stmt = select(Meeting.id, Meeting.title, Meeting.department, Meeting.country, Meeting.status)
+                for word in q.split():
+                    like = f"%{word}%"
+                    stmt = stmt.where(or_(Meeting.title.ilike(like), Meeting.department.ilike(like),
+                                          Meeting.country.ilike(like)))
+                (await db.execute(stmt.order_by(Meeting.id.desc()).limit(LIMIT))).all()
+            like_ms = (time.perf_counter() - t0) * 1000 / len(typed)
+
+            index = MeetingIndex()
+            with measure() as st:
+                index.load(await repo.meeting_index_rows(db))
+            t0 = time.perf_counter()
+            for q in typed:
+                index.search(q, LIMIT)
+            index_ms = (time.perf_counter() - t0) * 1000 / len(typed)
+        await engine.dispose()
+        print(f"{n:,} meetings, {len(typed)} keystrokes")
+        print(f"{'LIKE':>8}: {like_ms:8.2f} ms/keystroke")
+        print(f"{'index':>8}: {index_ms:8.2f} ms/keystroke (load {st['seconds']:.2f}s, {index.stats()['grams']:,} grams)")
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    asyncio.run(run(n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/search.py
+"""
+Задержка /search (repo.search поверх FTS5) на большой базе ответов.
+
+    python -m bot.benchmarks.search [answers] [repeats]
+
+База: init.sql плюс одна встреча с 20 текстовыми вопросами и answers ответов
+(по 20 на участника) из словаря ретроспектив. Для каждого запроса — p50/p95
+времени первой страницы и число совпадений. Частые слова («улучшить» — в
+каждом пятом ответе) проверяют окно SEARCH_CANDIDATES: ранжируются только
+последние совпадения, но FTS5 всё равно читает весь список документов слова.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+
+from sqlalchemy import text
+
+from bot.app import repo, search
+from bot.benchmarks._common import make_db, measure, seed_users, session_factory
+
+QUESTIONS = 20
+WORDS = (
+    "улучшить ускорить процессы релиз тесты ревью кода команда встречи стендапы планирование задачи "
+    "приоритеты бюджет клиенты документация коммуникация ошибки инциденты дежурства автоматизация "
+    "сборка деплой мониторинг метрики качество сроки оценки спринт бэклог интеграция аналитика "
+    "отчёты найм обучение онбординг продукт дизайн требования безопасность инфраструктура"
+).split()
+QUERIES = ("улучшить", "стендапы слишком", "онбординг", "ёлка", "инцидент деплой", "раз")
+
+
+def _answers(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    for i in range(n):
+        words = rnd.choices(WORDS, k=rnd.randint(4, 14))
+        if i % 1000 == 0:
+            words.append("ёлка")  # редкое слово
+        yield " ".join(words)
+
+
+def build(path: str, n: int) -> None:
+    with sqlite3.connect(path) as conn:
+        first = seed_users(conn, (n + QUESTIONS - 1) // QUESTIONS)
+        meeting = conn.execute(
+            "INSERT INTO meetings (title, status, created_by) VALUES ('Ретро: что улучшить', 'closed', 1)"
+        ).lastrowid
+        qids = [conn.execute(
+            "INSERT INTO questions (meeting_id, text, order_idx, type) VALUES (?, ?, ?, 'text')",
+            (meeting, f"Что улучшить в процессе {i}?", i),
+        ).lastrowid for i in range(QUESTIONS)]
+        users = (n + QUESTIONS - 1) // QUESTIONS
+        conn.executemany(
+            "INSERT INTO responses (id, user_id, meeting_id, status) VALUES (?, ?, ?, 'submitted')",
+            ((1000 + u, first + u, meeting) for u in range(users)),
+        )
+        conn.executemany(
+            "INSERT INTO answers (response_id, question_id, value) VALUES (?, ?, ?)",
+            ((1000 + i // QUESTIONS, qids[i % QUESTIONS], text) for i, text in enumerate(_answers(n))),
+        )
+
+
+async def run(n: int, repeats: int) -> None:
+    path = make_db()
+    try:
+        with measure() as st:
+            build(path, n)
+        print(f"{n:,} answers indexed in {st['seconds']:.1f}s, db {os.path.getsize(path) / 1024 / 1024:.0f} MB")
+        engine, Session = session_factory(path)
+        async with Session() as db:
+            for q in QUERIES:
+                match = search.build_match(q)
+                times = []
+                for _ in range(repeats):
+                    t0 = time.perf_counter()
+                    await repo.search(db, match, 11)
+                    times.append((time.perf_counter() - t0) * 1000)
+                hits = (await db.execute(search_count(match))).scalar_one()
+                times.sort()
+                print(f"{q!r:>20}: p50 {statistics.median(times):7.1f} ms, "
+                      f"p95 {times[int(len(times) * 0.95) - 1]:7.1f} ms, {hits:>9,} answers match")
+        await engine.dispose()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def search_count(match: str):
+    return text("SELECT count(*) FROM answers_fts WHERE answers_fts MATCH :m").bindparams(m=match)
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    asyncio.run(run(n, repeats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/session_lookup.py
+"""
+Задержка repo.get_active_user по мере роста числа входов.
+
+    python -m bot.benchmarks.session_lookup [accounts] [logins_per_step] [steps]
+
+`accounts` Telegram-аккаунтов входят по кругу; после каждого шага в
+`logins_per_step` входов измеряется средняя задержка поиска пользователя и число
+строк в tg_sessions. При upsert-модели обе величины не растут с числом входов.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from bot.app import repo
+from bot.app.models import TgSession
+from bot.benchmarks._common import make_db, seed_users, session_factory
+
+LOOKUPS = 2000
+
+
+async def run(accounts: int, per_step: int, steps: int) -> None:
+    path = make_db()
+    try:
+        with sqlite3.connect(path) as conn:
+            first = seed_users(conn, accounts)
+        engine, Session = session_factory(path)
+        total = 0
+        async with Session() as db:
+            for step in range(1, steps + 1):
+                for i in range(per_step):
+                    tid = 10_000 + (total + i) % accounts
+                    await repo.set_active_session(db, tid, first + (total + i) % accounts)
+                total += per_step
+
+                t0 = time.perf_counter()
+                for i in range(LOOKUPS):
+                    await repo.get_active_user(db, 10_000 + i % accounts)
+                us = (time.perf_counter() - t0) / LOOKUPS * 1e6
+                rows = (await db.execute(select(func.count()).select_from(TgSession))).scalar_one()
+                print(f"logins {total:>8,}: tg_sessions rows {rows:>6,}, get_active_user {us:>7.1f} µs")
+        await engine.dispose()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main() -> None:
+    accounts = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    per_step = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    steps = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    asyncio.run(run(accounts, per_step, steps))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/webhook_ingest.py
+"""
+Пропускная способность webhook-режима без сети.
+
+    python -m bot.benchmarks.webhook_ingest [updates] [connections] [api_latency_ms]
+
+Поднимает настоящий Application (build_app) со встроенным webhook-сервером и
+локальной заглушкой Bot API (app/localapi.py), шлёт /start от разных чатов
+по keep-alive соединениям и меряет приём (ответы 200) и полную обработку
+(ответ бота «отправлен»). Сравнивает последовательную обработку апдейтов
+(UPDATE_CONCURRENCY=1) и параллельную (app/updates.py).
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+from bot.app import bot as bot_module
+from bot.app.bot import build_app
+from bot.app.config import settings
+from bot.app.db import SessionLocal
+from bot.app.localapi import LocalTelegramRequest
+from bot.app.webhook import WebhookServer, serve
+from bot.benchmarks._common import make_db, session_factory
+
+
+def _update(update_id: int, chat_id: int) -> bytes:
+    return json.dumps({"update_id": update_id, "message": {
+        "message_id": update_id, "date": 0, "text": "/start",
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+        "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+    }}).encode("utf-8")
+
+
+async def _client(port: int, ids: range, chat_id: int) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        for uid in ids:
+            body = _update(uid, chat_id)
+            writer.write(
+                f"POST {settings.WEBHOOK_PATH} HTTP/1.1\r\nHost: bench\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+            )
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = int(head.lower().split(b"content-length:", 1)[1].split(b"\r\n", 1)[0])
+            await reader.readexactly(length)
+    finally:
+        writer.close()
+
+
+async def run(path: str, concurrency: int, updates: int, connections: int, latency: float) -> None:
+    engine, _ = session_factory(path)
+    SessionLocal.configure(bind=engine)
+    settings.UPDATE_CONCURRENCY = concurrency
+    api = LocalTelegramRequest(latency=latency)
+    app = build_app(request=api)
+    app.post_init = app.post_shutdown = None  # без фоновых задач: меряем только приём и обработку
+    server = WebhookServer(app)
+    stop = asyncio.Event()
+    task = asyncio.create_task(serve(app, stop, host="127.0.0.1", port=0, server=server))
+    while not app.running:
+        await asyncio.sleep(0.01)
+
+    per_conn = updates // connections
+    t0 = time.perf_counter()
+    await asyncio.gather(*(
+        _client(server.address[1], range(c * per_conn + 1, (c + 1) * per_conn + 1), 10_000 + c)
+        for c in range(connections)
+    ))
+    accepted = time.perf_counter() - t0
+    while api.calls["sendMessage"] < per_conn * connections:
+        await asyncio.sleep(0.005)
+    processed = time.perf_counter() - t0
+    proc = bot_module.update_processor
+    wait_p95 = proc.stats()["wait_p95_ms"] if proc is not None else "—"
+    stop.set()
+    await task
+    await engine.dispose()
+
+    total = per_conn * connections
+    label = "sequential" if concurrency <= 1 else f"concurrent ({concurrency})"
+    print(f"{label:>16}: accepted {total / accepted:>8,.0f} upd/s, processed {total / processed:>8,.0f} upd/s, "
+          f"{processed:.2f}s, wait p95 {wait_p95} ms")
+
+
+def main() -> None:
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    latency = (float(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000
+    path = make_db()
+    default = settings.UPDATE_CONCURRENCY
+    try:
+        print(f"{updates} updates, {connections} connections, Bot API latency {latency * 1000:.0f} ms")
+        asyncio.run(run(path, 1, updates, connections, latency))
+        asyncio.run(run(path, max(default, 2), updates, connections, latency))
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
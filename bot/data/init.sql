@@ -32,6 +32,7 @@ CREATE TABLE tg_sessions (
     user_id INTEGER NOT NULL,
     is_active INTEGER DEFAULT 1,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME,
     FOREIGN KEY (user_id) REFERENCES users(id)
 );
 
@@ -42,6 +43,7 @@ CREATE TABLE meetings (
     description TEXT,
     department TEXT,
     country TEXT,
+    opens_at DATETIME,            -- когда открыть (для status = scheduled)
     deadline_at DATETIME,
     status TEXT DEFAULT 'draft',  -- draft, open, closed, scheduled
     created_by INTEGER NOT NULL,
@@ -90,6 +92,111 @@ CREATE TABLE answers (
     FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE
 );
 
+-- Журнал записанных значений ответов (аудит; в answers — только последнее)
+CREATE TABLE answer_revisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    response_id INTEGER NOT NULL,
+    question_id INTEGER NOT NULL,
+    value TEXT,
+    recorded_at DATETIME,
+    FOREIGN KEY (response_id) REFERENCES responses(id) ON DELETE CASCADE,
+    FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE
+);
+
+-- Состояния прохождения анкет (FSM_BACKEND=sqlite)
+CREATE TABLE fsm_states (
+    chat_id INTEGER PRIMARY KEY,
+    meeting_id INTEGER NOT NULL,
+    current_q_idx INTEGER NOT NULL DEFAULT 0,
+    answers TEXT, -- JSON {question_id: value}, ответы до отправки анкеты
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (meeting_id) REFERENCES meetings(id) ON DELETE CASCADE
+);
+
+-- Рассылки и очередь исходящих сообщений (app/broadcast.py)
+CREATE TABLE broadcasts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,          -- announce, nudge
+    meeting_id INTEGER,
+    text TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME,
+    finished_at DATETIME,
+    FOREIGN KEY (meeting_id) REFERENCES meetings(id) ON DELETE SET NULL
+);
+
+CREATE TABLE outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    broadcast_id INTEGER NOT NULL,
+    chat_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', -- pending, sent, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at DATETIME,
+    sent_at DATETIME,
+    error TEXT,
+    FOREIGN KEY (broadcast_id) REFERENCES broadcasts(id) ON DELETE CASCADE
+);
+
+-- Индексы под частые запросы (совпадают с объявленными в app/models.py)
+CREATE UNIQUE INDEX ix_users_username ON users (username);
+CREATE INDEX ix_users_telegram_id ON users (telegram_id);
+CREATE INDEX ix_users_role_id ON users (role_id);
+CREATE UNIQUE INDEX uq_tg_sessions_telegram_id ON tg_sessions (telegram_id);
+CREATE INDEX ix_tg_sessions_expires_at ON tg_sessions (expires_at);
+CREATE INDEX ix_meetings_status ON meetings (status);
+CREATE INDEX ix_questions_meeting_order ON questions (meeting_id, order_idx);
+CREATE INDEX ix_options_question_id ON options (question_id);
+CREATE UNIQUE INDEX uq_responses_user_meeting ON responses (user_id, meeting_id);
+CREATE INDEX ix_responses_meeting_id ON responses (meeting_id);
+CREATE INDEX ix_answers_question_id ON answers (question_id);
+CREATE INDEX ix_answers_response_id ON answers (response_id);
+CREATE UNIQUE INDEX uq_answers_response_question ON answers (response_id, question_id);
+CREATE INDEX ix_answer_revisions_response_question ON answer_revisions (response_id, question_id);
+CREATE INDEX ix_fsm_states_meeting_id ON fsm_states (meeting_id);
+CREATE INDEX ix_fsm_states_updated_at ON fsm_states (updated_at);
+CREATE INDEX ix_broadcasts_meeting_id ON broadcasts (meeting_id);
+CREATE UNIQUE INDEX uq_outbox_broadcast_chat ON outbox (broadcast_id, chat_id);
+CREATE INDEX ix_outbox_status_next ON outbox (status, next_attempt_at);
+
+-- Полнотекстовый поиск /search (contentless FTS5, синхронизация триггерами;
+-- «ё» сводится к «е» — те же выражения в app/migrations.py)
+CREATE VIRTUAL TABLE meetings_fts USING fts5(title, description, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+CREATE TRIGGER meetings_fts_ai AFTER INSERT ON meetings BEGIN
+    INSERT INTO meetings_fts (rowid, title, description) VALUES (new.id, replace(replace(new.title, 'ё', 'е'), 'Ё', 'Е'), replace(replace(new.description, 'ё', 'е'), 'Ё', 'Е'));
+END;
+CREATE TRIGGER meetings_fts_ad AFTER DELETE ON meetings BEGIN
+    INSERT INTO meetings_fts (meetings_fts, rowid, title, description) VALUES ('delete', old.id, replace(replace(old.title, 'ё', 'е'), 'Ё', 'Е'), replace(replace(old.description, 'ё', 'е'), 'Ё', 'Е'));
+END;
+CREATE TRIGGER meetings_fts_au AFTER UPDATE OF title, description ON meetings BEGIN
+    INSERT INTO meetings_fts (meetings_fts, rowid, title, description) VALUES ('delete', old.id, replace(replace(old.title, 'ё', 'е'), 'Ё', 'Е'), replace(replace(old.description, 'ё', 'е'), 'Ё', 'Е'));
+    INSERT INTO meetings_fts (rowid, title, description) VALUES (new.id, replace(replace(new.title, 'ё', 'е'), 'Ё', 'Е'), replace(replace(new.description, 'ё', 'е'), 'Ё', 'Е'));
+END;
+
+CREATE VIRTUAL TABLE questions_fts USING fts5(text, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+CREATE TRIGGER questions_fts_ai AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts (rowid, text) VALUES (new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'));
+END;
+CREATE TRIGGER questions_fts_ad AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, text) VALUES ('delete', old.id, replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е'));
+END;
+CREATE TRIGGER questions_fts_au AFTER UPDATE OF text ON questions BEGIN
+    INSERT INTO questions_fts (questions_fts, rowid, text) VALUES ('delete', old.id, replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е'));
+    INSERT INTO questions_fts (rowid, text) VALUES (new.id, replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е'));
+END;
+
+CREATE VIRTUAL TABLE answers_fts USING fts5(value, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+CREATE TRIGGER answers_fts_ai AFTER INSERT ON answers BEGIN
+    INSERT INTO answers_fts (rowid, value) VALUES (new.id, replace(replace(new.value, 'ё', 'е'), 'Ё', 'Е'));
+END;
+CREATE TRIGGER answers_fts_ad AFTER DELETE ON answers BEGIN
+    INSERT INTO answers_fts (answers_fts, rowid, value) VALUES ('delete', old.id, replace(replace(old.value, 'ё', 'е'), 'Ё', 'Е'));
+END;
+CREATE TRIGGER answers_fts_au AFTER UPDATE OF value ON answers BEGIN
+    INSERT INTO answers_fts (answers_fts, rowid, value) VALUES ('delete', old.id, replace(replace(old.value, 'ё', 'е'), 'Ё', 'Е'));
+    INSERT INTO answers_fts (rowid, value) VALUES (new.id, replace(replace(new.value, 'ё', 'е'), 'Ё', 'Е'));
+END;
+
 ------------------------------------------------------------------
 -- Тестовые данные
 ------------------------------------------------------------------
@@ -8,22 +8,45 @@ SQL_FILE = os.path.join(DATA_DIR, "init.sql")
 DB_FILE = os.path.join(DATA_DIR, "bot.db")    # используем bot.db, а не test.db
 
 
-def reset_db():
+def reset_db(db_file=DB_FILE):
     """Удаляем старую БД и создаём новую из init.sql"""
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
+    db_dir = os.path.dirname(db_file)
+    if db_dir and not os.path.exists(db_dir):
+        os.makedirs(db_dir)
 
-    if os.path.exists(DB_FILE):
-        os.remove(DB_FILE)
+    if os.path.exists(db_file):
+        os.remove(db_file)
         print("Старая база удалена.")
+    # в режиме WAL рядом лежат журналы — без них новая база не подхватит чужие страницы
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
 
-    with sqlite3.connect(DB_FILE) as conn, open(SQL_FILE, "r", encoding="utf-8") as f:
+    with sqlite3.connect(db_file) as conn, open(SQL_FILE, "r", encoding="utf-8") as f:
         sql_script = f.read()
         conn.executescript(sql_script)
         conn.commit()
         print("База создана из init.sql.")
 
 
+def build_template():
+    """База из init.sql в памяти — шаблон, с которого тесты копируют свои базы."""
+    conn = sqlite3.connect(":memory:")
+    with open(SQL_FILE, "r", encoding="utf-8") as f:
+        conn.executescript(f.read())
+    conn.commit()
+    return conn
+
+
+def copy_db(template, db_file):
+    """Копия базы через backup API: постраничное копирование без повторного init.sql."""
+    dst = sqlite3.connect(db_file)
+    try:
+        template.backup(dst)
+    finally:
+        dst.close()
+
+
 from passlib.hash import bcrypt
 
 
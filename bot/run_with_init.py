@@ -2,10 +2,10 @@
 import sys
 from sqlalchemy import delete
 
-from app.bot import build_app
+from app.bot import build_app, start
 from app.config import settings
 from app.db import init_db, SessionLocal
-from app import repo
+from app import importer, repo
 from app.models import MeetingStatus, Answer, Response, Option, Question, Meeting
 
 # ВКЛ/ВЫКЛ очистку и автозаполнение БД
@@ -29,30 +29,34 @@ async def seed_db(clear: bool = True) -> None:
         admin_tid = settings.ADMIN_IDS[0] if settings.ADMIN_IDS else 1
         admin_user = await repo.get_or_create_user(db, telegram_id=admin_tid, fio="Admin User")
 
-        # Встреча 1: Планёрка
-        m1 = await repo.create_meeting(
-            db, created_by=admin_user.id,
-            title="Планёрка", description="Еженедельное совещание",
-            department="IT-отдел", country="Россия", deadline_at=None,
-        )
-        await repo.add_question(db, m1.id, "Какие задачи выполнены на неделе?", "text", 0, True, None)
-        await repo.add_question(db, m1.id, "Сколько участников будет?", "int", 1, True, None)
-        await repo.add_question(db, m1.id, "Нужна запись встречи?", "bool", 2, False, None)
-        await repo.add_question(db, m1.id, "Формат встречи?", "choice", 3, True, ["Онлайн", "Офлайн"])
-        await repo.set_meeting_status(db, m1.id, MeetingStatus.open)
-
-        # Встреча 2: Ретроспектива
-        m2 = await repo.create_meeting(
-            db, created_by=admin_user.id,
-            title="Ретроспектива", description="Итоги спринта и план улучшений",
-            department="IT-отдел", country="Россия", deadline_at=None,
-        )
-        await repo.add_question(db, m2.id, "Что было хорошо?", "text", 0, True, None)
-        await repo.add_question(db, m2.id, "Что улучшить?", "text", 1, True, None)
-        await repo.add_question(db, m2.id, "Темы для обсуждения", "multi", 2, False,
-                                ["Статусы", "Риски", "Блокеры", "Демо"])
-        await repo.set_meeting_status(db, m2.id, MeetingStatus.open)
-
+        # две встречи с вопросами — одним импортом (app/importer.py)
+        q = lambda text, type_="text", required=True, options=None: {  # noqa: E731
+            "text": text, "type": type_, "is_required": required, "options": options,
+        }
+        items = importer.validate([
+            {
+                "title": "Планёрка", "description": "Еженедельное совещание",
+                "department": "IT-отдел", "country": "Россия",
+                "questions": [
+                    q("Какие задачи выполнены на неделе?"),
+                    q("Сколько участников будет?", "int"),
+                    q("Нужна запись встречи?", "bool", required=False),
+                    q("Формат встречи?", "choice", options=["Онлайн", "Офлайн"]),
+                ],
+            },
+            {
+                "title": "Ретроспектива", "description": "Итоги спринта и план улучшений",
+                "department": "IT-отдел", "country": "Россия",
+                "questions": [
+                    q("Что было хорошо?"),
+                    q("Что улучшить?"),
+                    q("Темы для обсуждения", "multi", required=False,
+                      options=["Статусы", "Риски", "Блокеры", "Демо"]),
+                ],
+            },
+        ])
+        for meeting_id in await importer.import_questionnaires(db, items, created_by=admin_user.id):
+            await repo.set_meeting_status(db, meeting_id, MeetingStatus.open)
 
 def main():
     import asyncio
@@ -61,12 +65,12 @@ def main():
 
     if CLEAR_AND_SEED_DB:
         asyncio.run(seed_db(clear=True))
-        # важная строка: создаём новый цикл для run_polling()
+        # важная строка: создаём новый цикл для run_polling() / webhook
         asyncio.set_event_loop(asyncio.new_event_loop())
 
     app = build_app()
     print("🤖 Bot is running... Press Ctrl+C to stop.")
-    app.run_polling()
+    start(app)
 
 
 if __name__ == "__main__":
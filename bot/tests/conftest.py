@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from bot.app import metrics
+from bot.app.cache import identity_cache, invalidate_catalog, question_set_cache
+from bot.app.db import bind_engine, make_engine
+from bot.app.lookup import meeting_index
+from bot.reset_and_check_db import build_template, copy_db
+
+
+@pytest.fixture(scope="session")
+def db_template():
+    """Схема и тестовые данные из init.sql — один раз на сессию (на процесс xdist), в памяти."""
+    conn = build_template()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(autouse=True)
+def test_db(db_template, tmp_path):
+    """
+    Каждый тест получает свежую копию шаблона (SQLite backup API) в своём
+    tmp_path и свой движок: SessionLocal перепривязывается на время теста,
+    поэтому тесты не трогают data/bot.db и не мешают друг другу под xdist.
+    """
+    path = str(tmp_path / "bot.db")
+    copy_db(db_template, path)
+    eng = make_engine(f"sqlite+aiosqlite:///{path}")
+    metrics.instrument_engine(eng)
+    old = bind_engine(eng)
+    identity_cache.clear()
+    question_set_cache.clear()
+    invalidate_catalog()
+    meeting_index.clear()
+    yield path
+    asyncio.run(eng.dispose())
+    bind_engine(old)
+
+
+# бюджет SQL-запросов на вызов функций repo (query_budget.py)
+from query_budget import pytest_configure, pytest_terminal_summary, query_budget  # noqa: E402,F401
@@ -0,0 +1,113 @@
+"""
+Pytest-плагин: бюджет SQL-запросов на один вызов функции repo.
+
+Бюджеты объявлены в BUDGETS (функция → максимум запросов за вызов, вложенные
+вызовы repo учитываются и во внешней функции). На время каждого теста функции
+repo подменяются обёртками со счётчиком (app/querylog.counting), тест с
+превышением падает со списком запросов. Переопределить бюджет в тесте:
+
+    @pytest.mark.query_budget(add_answers_batch=6)
+
+QUERY_BUDGET_REPORT=1 печатает в конце прогона наблюдённые максимумы —
+по ним удобно обновлять BUDGETS.
+"""
+from __future__ import annotations
+
+import inspect
+import os
+from functools import wraps
+from typing import Dict, List
+
+import pytest
+
+from bot.app import querylog, repo
+
+BUDGETS: Dict[str, int] = {
+    # пользователи и сессии
+    "authenticate_user": 2,
+    "get_active_user": 1,
+    "set_active_session": 4,
+    "logout": 1,
+    "get_or_create_user": 2,
+    "set_user_role": 2,
+    # роли
+    "list_roles": 1,
+    "create_role": 2,
+    "rename_role": 2,
+    "delete_role": 2,
+    # встречи
+    "create_meeting": 2,
+    "list_meetings": 1,
+    "meeting_index_rows": 1,
+    "list_meetings_page": 1,
+    "set_meeting_status": 1,
+    "transition_meeting": 1,
+    "set_meeting_schedule": 1,
+    "get_meeting_schedule": 1,
+    "list_scheduled_meetings": 1,
+    "load_question_set": 3,
+    "search": 1,
+    "list_questions": 1,
+    # ответы
+    "add_answer": 5,
+    "add_answers_batch": 6,
+    "answer_value_counts": 1,
+    "answer_counts": 1,
+    "response_status_counts": 1,
+    # анкеты /fill
+    "get_fill_state_stamp": 1,
+    "save_fill_state": 1,
+    "record_fill_answer": 1,
+    # рассылки
+    "create_broadcast": 4,
+    "due_outbox": 1,
+    "next_outbox_due": 1,
+    "mark_broadcasts_started": 1,
+    "save_outbox_results": 3,
+    "broadcast_progress": 2,
+    "list_broadcasts": 1,
+}
+
+_observed: Dict[str, int] = {}
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "query_budget(**budgets): переопределить бюджет SQL функций repo")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if os.getenv("QUERY_BUDGET_REPORT") == "1" and _observed:
+        terminalreporter.write_sep("-", "SQL statements per repo call (max)")
+        for name, n in sorted(_observed.items()):
+            budget = BUDGETS.get(name)
+            terminalreporter.write_line(f"{name:>28}: {n:3d}" + (f"  (budget {budget})" if budget else ""))
+
+
+def _wrap(name: str, fn, budgets: Dict[str, int], violations: List[str]):
+    @wraps(fn)
+    async def wrapper(*args, **kwargs):
+        with querylog.counting() as qc:
+            result = await fn(*args, **kwargs)
+        _observed[name] = max(_observed.get(name, 0), qc.statements)
+        limit = budgets.get(name)
+        if limit is not None and qc.statements > limit:
+            queries = "\n".join(f"    {' '.join(q.split())[:200]}" for q in qc.queries)
+            violations.append(f"repo.{name}: {qc.statements} SQL statements, budget {limit}\n{queries}")
+        return result
+
+    return wrapper
+
+
+@pytest.fixture(autouse=True)
+def query_budget(request, monkeypatch, test_db):
+    # test_db (conftest) подписывает движок теста на учёт SQL
+    budgets = dict(BUDGETS)
+    for marker in request.node.iter_markers("query_budget"):
+        budgets.update(marker.kwargs)
+    violations: List[str] = []
+    for name, fn in inspect.getmembers(repo, inspect.iscoroutinefunction):
+        if fn.__module__ == repo.__name__:
+            monkeypatch.setattr(repo, name, _wrap(name, fn, budgets, violations))
+    yield budgets
+    if violations:
+        pytest.fail("Query budget exceeded:\n" + "\n".join(violations), pytrace=False)
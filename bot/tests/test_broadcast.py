@@ -0,0 +1,81 @@
+import asyncio
+
+from telegram.error import Forbidden, RetryAfter
+
+from bot.app.broadcast import BroadcastEngine, TokenBucket, nudge_meeting, progress
+from bot.app.db import SessionLocal
+from bot.app import repo
+
+
+def test_token_bucket_reserves_and_pauses():
+    now = [0.0]
+    b = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+    assert [b.reserve() for _ in range(3)] == [0.0, 0.0, 0.5]
+    now[0] = 10.0
+    b.pause(3)
+    assert b.reserve() == 3.5  # пауза + очередь за токеном
+
+
+def test_nudge_reaches_non_responders_and_survives_restart():
+    async def inner():
+        async with SessionLocal() as db:
+            for tid, (name, pwd) in enumerate([("admin", "admin123"), ("moderator", "mod123"),
+                                               ("user1", "user123")], start=101):
+                u = await repo.authenticate_user(db, name, pwd)
+                await repo.set_active_session(db, tid, u.id)
+            await repo.add_answer(db, u.id, 3, "ответил")        # user1 уже ответил по встрече 2
+            b = await nudge_meeting(db, 2)
+        assert b.total == 2
+
+        calls = []
+
+        async def sender(chat_id, text):
+            calls.append(chat_id)
+            if chat_id == 101 and calls.count(101) == 1:
+                raise RetryAfter(0)
+            if chat_id == 102:
+                raise Forbidden("bot was blocked by the user")
+
+        first = BroadcastEngine(sender=sender, global_rate=1000, per_chat_rate=1000, batch_size=1)
+        assert await first.run_once() == 1                      # «упали» после первой порции
+
+        restarted = BroadcastEngine(sender=sender, global_rate=1000, per_chat_rate=1000)
+        while await restarted.run_once():
+            pass
+        assert sorted(calls) == [101, 101, 102]
+        assert restarted.flood_waits + first.flood_waits == 1
+
+        async with SessionLocal() as db:
+            p = await progress(db, b.id)
+        assert (p["sent"], p["failed"], p["pending"], p["finished"]) == (1, 1, 0, True)
+
+    asyncio.run(inner())
+
+
+def test_openmeeting_announces_only_on_actual_opening():
+    from types import SimpleNamespace
+    from bot.app.bot import openmeeting_cmd
+
+    replies = []
+
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    async def open_meeting(meeting_id):
+        update = SimpleNamespace(effective_user=SimpleNamespace(id=777),
+                                 message=SimpleNamespace(reply_text=reply_text))
+        await openmeeting_cmd(update, SimpleNamespace(args=[str(meeting_id)]))
+
+    async def inner():
+        async with SessionLocal() as db:
+            await repo.set_active_session(db, 777, 1)
+            await repo.set_meeting_status(db, 2, "closed")
+        for meeting_id in (1, 1, 2, 999):     # scheduled, уже открыта, закрыта, нет такой
+            await open_meeting(meeting_id)
+        async with SessionLocal() as db:
+            assert len(await repo.list_broadcasts(db)) == 1
+            assert (await repo.get_meeting_schedule(db, 2)).status.value == "closed"
+
+    asyncio.run(inner())
+    assert replies[0].startswith("✅") and replies[1].startswith("ℹ️")
+    assert replies[2].startswith("⛔") and replies[3] == "❌ Не найдена"
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+from bot.app.cache import TTLCache, identity_cache, invalidate_identity, invalidate_role, invalidate_user
+
+
+def test_ttl_cache_lru_and_expiry():
+    now = [0.0]
+    c = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+
+    c.set(1, "a")
+    c.set(2, "b")
+    assert c.get(1) == "a"          # 1 становится самым свежим
+    c.set(3, "c")                   # вытесняется 2
+    assert c.get(2) is None
+    assert c.get(3) == "c"
+
+    now[0] = 11.0
+    assert c.get(1) is None         # протухло
+    st = c.stats()
+    assert st["hits"] == 2 and st["misses"] == 2 and st["evictions"] == 1
+
+
+def test_identity_invalidation():
+    identity_cache.clear()
+    identity_cache.set(111, SimpleNamespace(id=1, role_id=3))
+    identity_cache.set(222, SimpleNamespace(id=2, role_id=3))
+    identity_cache.set(333, SimpleNamespace(id=3, role_id=1))
+
+    invalidate_identity(111)
+    assert 111 not in identity_cache
+
+    invalidate_user(3)
+    assert 333 not in identity_cache
+
+    invalidate_role(3)
+    assert len(identity_cache) == 0
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from bot.app.db import SessionLocal
+from bot.app.catalog import MeetingFilter, get_page, parse_callback, resolve_filter
+from bot.app.config import settings
+from bot.app import repo
+
+
+def test_filter_parse():
+    assert MeetingFilter.parse(["open"]) == MeetingFilter(status="open")
+    assert MeetingFilter.parse(["dept=Отдел", "продаж", "country=Россия"]) == MeetingFilter(
+        department="Отдел продаж", country="Россия",
+    )
+    for args in (["status=unknown"], ["city=Москва"], ["что-то"]):
+        with pytest.raises(ValueError):
+            MeetingFilter.parse(args)
+
+
+def test_keyset_pages_and_invalidation(monkeypatch):
+    monkeypatch.setattr(settings, "MEETINGS_PAGE_SIZE", 2)
+
+    async def inner():
+        async with SessionLocal() as db:
+            for i in range(3):
+                await repo.create_meeting(db, f"Встреча {i}", "", "Разработка", "Россия", None, 1)
+            flt = MeetingFilter(department="Разработка")
+
+            first = await get_page(db, flt)
+            assert first.ids == (2, 3)
+            nxt = parse_callback(first.markup.inline_keyboard[0][-1].callback_data)
+            assert resolve_filter(nxt[0]) == flt
+            second = await get_page(db, flt, nxt[1], nxt[2])
+            assert second.ids == (4, 5)
+            back = parse_callback(second.markup.inline_keyboard[0][0].callback_data)
+            assert (await get_page(db, flt, back[1], back[2])).ids == (2, 3)
+
+            assert await get_page(db, flt) is first          # страница из кэша
+            await repo.set_meeting_status(db, 2, "closed")
+            assert await get_page(db, flt) is not first
+            await repo.delete_meeting(db, 3)
+            assert (await get_page(db, flt)).ids == (2, 4)
+
+    asyncio.run(inner())
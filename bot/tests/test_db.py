@@ -0,0 +1,51 @@
+import asyncio
+import sqlite3
+
+from sqlalchemy import create_engine, func, select
+
+from bot.app.db import SessionLocal, effective_pragmas
+from bot.app.migrations import run_migrations
+from bot.app import repo
+from bot.app.models import Answer
+
+
+def test_sqlite_profile_and_fk_safe_delete():
+    async def inner():
+        pragmas = await effective_pragmas()
+        assert pragmas["journal_mode"].lower() == "wal"
+        assert pragmas["foreign_keys"] == 1
+        assert pragmas["busy_timeout"] > 0
+
+        async with SessionLocal() as db:
+            await repo.add_answer(db, 3, 3, "ответ")
+            # при foreign_keys=ON удаление встречи с анкетами не должно падать
+            assert await repo.delete_meeting(db, 2)
+            left = (await db.execute(select(func.count()).select_from(Answer))).scalar_one()
+            assert left == 0
+
+    asyncio.run(inner())
+
+
+def test_migration_keeps_last_answer_and_archives_duplicates(test_db):
+    # база до уникального индекса: на вопрос в анкете несколько строк
+    con = sqlite3.connect(test_db)
+    con.execute("DROP INDEX uq_answers_response_question")
+    con.execute("INSERT INTO responses (id, meeting_id, user_id, status) VALUES (50, 1, 1, 'draft')")
+    con.executemany("INSERT INTO answers (response_id, question_id, value) VALUES (50, ?, ?)",
+                    [(1, "a"), (1, "b"), (2, "yes"), (1, "c")])
+    con.commit()
+    con.close()
+
+    engine = create_engine(f"sqlite:///{test_db}")
+    with engine.begin() as conn:
+        run_migrations(conn)
+        run_migrations(conn)  # повторный запуск ничего не меняет
+        rows = conn.exec_driver_sql(
+            "SELECT question_id, value FROM answers WHERE response_id = 50 ORDER BY question_id").all()
+        archived = conn.exec_driver_sql(
+            "SELECT value FROM answer_revisions WHERE response_id = 50 ORDER BY id").scalars().all()
+        indexes = {r[1] for r in conn.exec_driver_sql("PRAGMA index_list(answers)")}
+    engine.dispose()
+    assert [tuple(r) for r in rows] == [(1, "c"), (2, "yes")]
+    assert archived == ["a", "b", "c"]
+    assert "uq_answers_response_question" in indexes
@@ -0,0 +1,122 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+from bot.app.db import SessionLocal
+from bot.app import repo, export
+
+
+def test_export_json_and_ndjson():
+    async def inner():
+        async with SessionLocal() as db:
+            await repo.add_answer(db, 1, 1, "Релиз 2.0")
+            await repo.add_answer(db, 2, 1, "Миграция БД")
+            await repo.add_answer(db, 3, 3, "Закрыли техдолг")
+
+            buf = io.BytesIO()
+            total = await export.write_json(db, buf)
+            assert total == 3
+            data = json.loads(buf.getvalue().decode("utf-8"))
+            assert [m["id"] for m in data] == [1, 2]
+            q1 = data[0]["questions"][0]
+            assert [a["value"] for a in q1["answers"]] == ["Релиз 2.0", "Миграция БД"]
+            assert {o["value"] for o in data[0]["questions"][1]["options"]} == {"yes", "no", "maybe"}
+            assert data[0]["questions"][1]["answers"] == []
+            assert data[1]["questions"][0]["answers"][0]["user_id"] == 3
+
+            fp, name = await export.export_all(db, "ndjson")
+            assert name.endswith(".ndjson.gz")
+            lines = [json.loads(l) for l in gzip.decompress(fp.read()).splitlines()]
+            assert [l["type"] for l in lines].count("answer") == 3
+            assert lines[0] == {**lines[0], "type": "meeting", "id": 1}
+
+    asyncio.run(inner())
+
+
+def test_export_meeting_csv():
+    async def inner():
+        async with SessionLocal() as db:
+            await repo.add_answer(db, 2, 1, "Первый вариант")
+            await repo.add_answer(db, 2, 1, "Исправленный")
+            await repo.add_answer(db, 2, 2, "yes")
+            await repo.add_answer(db, 3, 2, "no")
+
+            assert await export.export_meeting(db, 999) is None
+
+            fp, name = await export.export_meeting(db, 1)
+            assert name == "meeting_1.csv"
+            rows = list(csv.reader(io.StringIO(fp.read().decode("utf-8-sig"))))
+            assert rows[0][5:] == ["1. Какие приоритетные задачи на следующий квартал?",
+                                   "2. Нужно ли увеличить бюджет?"]
+            assert rows[1][1:3] == ["2", "moderator"]
+            assert rows[1][5:] == ["Исправленный", "yes"]
+            assert rows[2][5:] == ["", "no"]
+
+            fp, name = await export.export_meeting(db, 1, compress=True)
+            assert name.endswith(".csv.gz")
+            assert len(gzip.decompress(fp.read()).decode("utf-8-sig").splitlines()) == 3
+
+    asyncio.run(inner())
+
+
+def test_export_commands_upload_spooled_files():
+    # SpooledTemporaryFile в памяти не имеет имени — InputFile не должен его угадывать
+    from telegram import Update
+    from bot.app.bot import build_app
+    from bot.app.localapi import LocalTelegramRequest
+
+    async def inner():
+        async with SessionLocal() as db:
+            admin = await repo.authenticate_user(db, "admin", "admin123")
+            await repo.set_active_session(db, 777, admin.id)
+        api = LocalTelegramRequest()
+        app = build_app(request=api)
+        await app.initialize()
+        for i, text in enumerate(["/exportmeeting 1", "/exportjson ndjson"], start=1):
+            await app.process_update(Update.de_json({"update_id": i, "message": {
+                "message_id": i, "date": 0, "text": text,
+                "chat": {"id": 777, "type": "private"},
+                "from": {"id": 777, "is_bot": False, "first_name": "A"},
+                "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+            }}, app.bot))
+        await app.shutdown()
+        assert api.calls["sendDocument"] == 2
+
+    asyncio.run(inner())
+
+
+def test_answer_cursor_skips_unknown_and_out_of_order_answers():
+    async def inner():
+        async with SessionLocal() as db:
+            await repo.add_answer(db, 1, 1, "a1")
+            await repo.add_answer(db, 1, 2, "yes")
+            await repo.add_answer(db, 1, 3, "a3")
+
+            async def collect(order):
+                cursor = export._AnswerCursor(db, order)
+                got = {qid: [a["value"] async for a in cursor.take(qid)] for qid in order}
+                return got, cursor.skipped
+
+            # вопроса 1 нет в выгрузке — его ответ пропущен, остальные на месте
+            assert await collect([2, 3]) == ({2: ["yes"], 3: ["a3"]}, 1)
+            # вопрос 3 запрошен раньше, чем дошёл поток: курсор не застревает
+            assert await collect([3, 1, 2]) == ({3: [], 1: ["a1"], 2: ["yes"]}, 1)
+
+    asyncio.run(inner())
+
+
+def test_export_reads_one_snapshot():
+    async def inner():
+        async with SessionLocal() as db, SessionLocal() as other:
+            async with export._read_snapshot(db):
+                before = await export._load_questions(db)
+                await repo.add_answer(other, 1, 1, "после начала выгрузки")
+                await repo.create_meeting(other, "Новая", "", "", "", None, 1)
+                assert await export._load_questions(db) == before
+                assert [a async for a in export._AnswerCursor(db, [1]).take(1)] == []
+            buf = io.BytesIO()
+            assert await export.write_json(db, buf) == 1
+
+    asyncio.run(inner())
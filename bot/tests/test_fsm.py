@@ -0,0 +1,54 @@
+import asyncio
+
+from bot.app.fsm import FillState, MemoryStateStore, SqliteStateStore
+
+
+def test_memory_store_evicts_and_accounts():
+    async def inner():
+        store = MemoryStateStore(maxsize=2, ttl=60)
+        for chat_id in (1, 2, 3):
+            await store.set(chat_id, FillState(meeting_id=10))
+        assert await store.get(1) is None         # вытеснен LRU
+        st = await store.advance(3)
+        assert st.current_q_idx == 1
+        stats = store.stats()
+        assert stats["states"] == 2 and stats["approx_bytes"] > 0
+
+    asyncio.run(inner())
+
+
+def test_sqlite_store_survives_restart():
+    async def inner():
+        store = SqliteStateStore()
+        await store.set(42, FillState(meeting_id=1))
+        await asyncio.gather(*(store.advance(42) for _ in range(3)))
+
+        restarted = SqliteStateStore()            # пустой кэш — грузим из БД
+        st = await restarted.get(42)
+        assert st.meeting_id == 1 and st.current_q_idx == 3
+        assert restarted.db_loads == 1
+
+        await restarted.delete(42)
+        assert await SqliteStateStore().get(42) is None
+
+    asyncio.run(inner())
+
+
+def test_sqlite_store_sees_writes_of_other_process():
+    async def inner():
+        a, b = SqliteStateStore(), SqliteStateStore()   # два воркера с одной базой
+        await a.set(5, FillState(meeting_id=1))
+        assert (await a.get(5)).current_q_idx == 0
+        assert a.db_loads == 0                          # своя запись — из кэша
+
+        await b.record_answer(5, 1, "да")
+        st = await a.get(5)
+        assert st.current_q_idx == 1 and st.answers == {1: "да"}
+        assert a.db_loads == 1
+        await a.get(5)
+        assert a.db_loads == 1                          # версия совпала — снова кэш
+
+        await b.delete(5)
+        assert await a.get(5) is None
+
+    asyncio.run(inner())
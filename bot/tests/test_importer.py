@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import pytest
+
+from sqlalchemy import func, select
+
+from bot.app import export, importer, querylog, repo
+from bot.app.db import SessionLocal
+from bot.app.models import Option, Question
+
+
+def test_import_json_in_one_transaction():
+    data = json.dumps({
+        "title": "Импорт", "department": "IT", "questions": [
+            {"text": "Второй", "type": "int", "order_idx": 5},
+            {"text": "Первый", "type": "choice", "options": ["Да", " Нет ", ""], "order_idx": 1},
+        ] + [{"text": f"Q{i}", "order_idx": 9} for i in range(200)],
+    }).encode()
+
+    async def inner():
+        items = importer.parse(data, "q.json")
+        async with SessionLocal() as db:
+            with querylog.counting() as qc:
+                [mid] = await importer.import_questionnaires(db, items, created_by=1)
+            assert qc.statements <= 6  # встреча, вопросы, варианты, commit — без запроса на вопрос
+            qs = await repo.list_questions(db, mid)
+            assert [q.text for q in qs[:3]] == ["Первый", "Второй", "Q0"]
+            assert [q.order_idx for q in qs] == list(range(202))
+            opts = (await db.execute(
+                select(Option.value).where(Option.question_id == qs[0].id).order_by(Option.id)
+            )).scalars().all()
+            assert opts == ["Да", "Нет"]
+
+    asyncio.run(inner())
+
+
+def test_import_csv_and_export_roundtrip():
+    csv_data = (
+        "meeting,description,question,type,required,options\n"
+        "Ретро,Итоги,Что хорошо?,text,,\n"
+        "Ретро,,Темы,multi,нет,Риски|Демо\n"
+        "Планёрка,,Сколько?,int,1,\n"
+    ).encode()
+
+    async def inner():
+        items = importer.parse(csv_data, "q.csv")
+        assert [m.title for m in items] == ["Ретро", "Планёрка"]
+        assert items[0].questions[1].is_required is False
+        async with SessionLocal() as db:
+            before = (await db.execute(select(func.count()).select_from(Question))).scalar_one()
+            await importer.import_questionnaires(db, items, created_by=1)
+            fp, _ = await export.export_all(db, "json")
+            exported = fp.read()
+            # выгрузка импортируется обратно как есть
+            again = importer.parse(exported, "export.json")
+            await importer.import_questionnaires(db, again, created_by=1)
+            after = (await db.execute(select(func.count()).select_from(Question))).scalar_one()
+            assert after == 2 * (before + 3)
+
+    asyncio.run(inner())
+
+
+def test_import_reports_all_errors_and_writes_nothing():
+    bad = [
+        {"title": "", "questions": [{"text": "ok"}]},
+        {"title": "Встреча", "questions": [{"text": "Выбор", "type": "choice"}, {"text": "", "type": "nope"}]},
+    ]
+    with pytest.raises(importer.QuestionnaireError) as e:
+        importer.parse(json.dumps(bad).encode(), "bad.json")
+    msg = str(e.value)
+    assert "встреча #1" in msg and "нужны варианты" in msg and "questions.1.type" in msg
+    with pytest.raises(importer.QuestionnaireError):
+        importer.parse(b"title;text\n", "bad.csv")
+
+
+def test_option_with_comma_survives_fill_and_results():
+    from telegram import Update
+    from bot.app.bot import build_app
+    from bot.app.localapi import LocalTelegramRequest
+    from bot.app.models import Answer
+
+    sender = {"id": 777, "is_bot": False, "first_name": "A"}
+    chat = {"id": 777, "type": "private"}
+
+    def command(i, text):
+        return {"update_id": i, "message": {
+            "message_id": i, "date": 0, "text": text, "chat": chat, "from": sender,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+        }}
+
+    async def inner():
+        items = importer.parse(json.dumps({"title": "Опрос", "questions": [
+            {"text": "Поедете?", "type": "multi", "options": ["Да, конечно", "Нет", "o1"]},
+        ]}).encode(), "q.json")
+        async with SessionLocal() as db:
+            [mid] = await importer.import_questionnaires(db, items, created_by=1)
+            opts = (await db.execute(
+                select(Option.value, Option.label).join(Question, Question.id == Option.question_id)
+                .where(Question.meeting_id == mid).order_by(Option.id)
+            )).all()
+            assert [tuple(o) for o in opts] == [("o1_", "Да, конечно"), ("Нет", "Нет"), ("o1", "o1")]
+            await repo.set_meeting_status(db, mid, "open")
+            await repo.set_active_session(db, 777, 1)
+
+        api = LocalTelegramRequest()
+        app = build_app(request=api)
+        await app.initialize()
+        await app.process_update(Update.de_json(command(1, f"/fill {mid}"), app.bot))
+        await app.process_update(Update.de_json({"update_id": 2, "callback_query": {
+            "id": "1", "chat_instance": "p", "data": "fill:d:0:3", "from": sender,   # первые два варианта
+            "message": {"message_id": 1, "date": 0, "chat": chat},
+        }}, app.bot))
+        await app.process_update(Update.de_json(command(3, f"/results {mid}"), app.bot))
+        await app.shutdown()
+
+        async with SessionLocal() as db:
+            assert (await db.execute(select(Answer.value))).scalars().all() == ["o1_,Нет"]
+        report = api.sent[-1][1]
+        assert "  Да, конечно: 1 " in report and "  Нет: 1 " in report and "  o1: 0 " in report
+        assert "конечно:" not in report.replace("Да, конечно:", "")
+
+    asyncio.run(inner())
@@ -0,0 +1,106 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from bot.app import repo
+from bot.app.audit import RevisionLog, revision_log
+from bot.app.db import SessionLocal
+from bot.app.ingest import AnswerWriter
+from bot.app.models import Answer, AnswerRevision, Response
+
+
+def test_answer_writer_group_commit_and_drain():
+    async def inner():
+        writer = AnswerWriter(batch_size=50, flush_ms=50, max_pending=20)
+        await writer.start()
+
+        results = await asyncio.gather(*(
+            writer.submit(1 + i % 3, 1 + i % 3, f"ответ {i}") for i in range(60)
+        ))
+        assert all(a is not None and a.id for a in results)
+        assert writer.batches < 60
+
+        # неизвестный вопрос — None, остальная пачка пишется
+        pending = [asyncio.create_task(writer.submit(1, 999, "x")),
+                   asyncio.create_task(writer.submit(1, 2, "yes"))]
+        await asyncio.sleep(0)
+        await writer.stop()            # дописывает очередь
+        missing, ok = [t.result() for t in pending]
+        assert missing is None and ok is not None
+
+        async with SessionLocal() as db:
+            # по ответу на вопрос в анкете, все записанные значения — в журнале
+            assert (await db.execute(select(func.count()).select_from(Answer))).scalar_one() == 4
+            assert (await db.execute(select(func.count()).select_from(AnswerRevision))).scalar_one() == 61
+            # по одной анкете на пару (пользователь, встреча)
+            assert (await db.execute(select(func.count()).select_from(Response))).scalar_one() == 3
+
+    asyncio.run(inner())
+
+
+def test_answer_writer_never_leaves_submitters_hanging():
+    async def inner():
+        writer = AnswerWriter(batch_size=1, flush_ms=0, max_pending=10)
+
+        async def broken(batch):
+            raise RuntimeError("boom")
+
+        writer._flush = broken
+        await writer.start()
+        # писатель падает на первой пачке: и она, и остаток очереди — с ошибкой
+        results = await asyncio.wait_for(asyncio.gather(
+            *(writer.submit(1, 1, str(i)) for i in range(3)), return_exceptions=True,
+        ), 1)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not writer.running
+
+        await writer.stop()
+        # после остановки ответ пишется напрямую
+        assert (await writer.submit(1, 2, "yes")) is not None
+        async with SessionLocal() as db:
+            assert (await db.execute(select(Answer.value))).scalars().all() == ["yes"]
+
+    asyncio.run(inner())
+
+
+def test_revisions_written_in_background(monkeypatch):
+    async def inner():
+        log = RevisionLog(batch_size=2, flush_sec=60)
+        monkeypatch.setattr(repo, "revision_log", log)
+        log.start()
+        async with SessionLocal() as db:
+            for value in ("1", "2", "3"):
+                await repo.add_answers_batch(db, [(1, 1, value)])
+            # в транзакции ответа журнал не пишется
+            assert (await db.execute(select(func.count()).select_from(AnswerRevision))).scalar_one() <= 2
+        await log.stop()                # дописывает очередь
+        assert log.stats()["pending"] == 0 and log.written == 3 and not log.running
+        async with SessionLocal() as db:
+            values = (await db.execute(select(AnswerRevision.value).order_by(AnswerRevision.id))).scalars().all()
+            assert values == ["1", "2", "3"]
+            assert (await db.execute(select(Answer.value))).scalars().all() == ["3"]
+
+    assert not revision_log.running
+    asyncio.run(inner())
+
+
+def test_revision_batch_skips_only_orphaned_rows():
+    async def inner():
+        async with SessionLocal() as db:
+            await repo.add_answer(db, 1, 1, "первый")
+            response_id = (await db.execute(select(Response.id))).scalar_one()
+        log = RevisionLog(batch_size=10, flush_sec=60)
+        now = datetime.utcnow()
+        log.record([
+            {"response_id": response_id, "question_id": 1, "value": "a", "recorded_at": now},
+            {"response_id": 9999, "question_id": 1, "value": "сирота", "recorded_at": now},  # анкету удалили
+            {"response_id": response_id, "question_id": 2, "value": "b", "recorded_at": now},
+        ])
+        assert await log.flush() == 2
+        assert log.orphaned == 1 and log.failed_batches == 0
+        async with SessionLocal() as db:
+            values = (await db.execute(select(AnswerRevision.value).order_by(AnswerRevision.id))).scalars().all()
+        assert values == ["первый", "a", "b"]
+
+    asyncio.run(inner())
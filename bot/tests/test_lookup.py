@@ -0,0 +1,71 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.app import importer, repo
+from bot.app.db import SessionLocal
+from bot.app.lookup import MeetingIndex, inline_results, meeting_index
+
+
+def _ids(index, query, limit=10):
+    return [e.id for e in index.search(query, limit)]
+
+
+def test_index_search_and_updates():
+    ix = MeetingIndex()
+    ix.load([
+        SimpleNamespace(id=1, title="Планирование Q4", department="Отдел продаж", country="Россия", status="closed"),
+        SimpleNamespace(id=2, title="Перепланировка офиса", department="АХО", country="Россия", status="open"),
+        SimpleNamespace(id=3, title="Ретро", department="Разработка", country="Казахстан", status="open"),
+        SimpleNamespace(id=4, title="Ёлка", department=None, country=None, status="draft"),
+        SimpleNamespace(id=5, title="Синк", department="Ретро-группа", country=None, status="open"),
+    ])
+    assert _ids(ix, "план") == [2, 1]            # подстрока; открытые первыми
+    assert _ids(ix, "пе") == [2]                 # короткое слово — только начало слова
+    assert _ids(ix, "ретро") == [3, 5]           # совпадение в названии выше, чем в отделе
+    assert _ids(ix, "россия пла") == [2, 1]
+    assert _ids(ix, "РАЗРАБ каз") == [3]
+    assert _ids(ix, "елка") == [4]
+    assert _ids(ix, "бюджет") == [] and _ids(ix, "ланп") == []
+    assert _ids(ix, "", 2) == [5, 3]             # пустой запрос — открытые, новые первыми
+
+    v = ix.version
+    ix.set_status(1, "open")
+    ix.put(3, "Ретро спринта", "Разработка", "Казахстан", "open")
+    ix.remove(2)
+    assert ix.version == v + 3
+    assert _ids(ix, "план") == [1] and _ids(ix, "спринт") == [3] and _ids(ix, "ахо") == []
+    assert not any(2 in ids for ids in ix._postings.values())
+
+
+def test_changes_during_load_are_replayed():
+    ix = MeetingIndex()
+    ix.put(9, "До загрузки", None, None, "draft")      # не загружен — изменение не нужно
+    ix._replay = []                                   # идёт загрузка
+    ix.set_status(1, "closed")
+    ix.put(5, "Новая встреча", None, None, "draft")
+    ix.remove(2)
+    ix.load([SimpleNamespace(id=i, title=f"Встреча {i}", department=None, country=None, status="open")
+             for i in (1, 2)])
+    assert {e.id: e.status for e in ix.search("встреча", 10)} == {1: "closed", 5: "draft"}
+
+
+def test_inline_results_follow_repo_changes():
+    async def inner():
+        async with SessionLocal() as db:
+            assert [r.id for r in await inline_results(db, "план")] == ["1"]
+            assert meeting_index.ready
+
+            m = await repo.create_meeting(db, "Планёрка отдела", "", "Разработка", "Россия", None, created_by=1)
+            await repo.set_meeting_status(db, m.id, "open")
+            results = await inline_results(db, "план")
+            assert [r.id for r in results] == [str(m.id), "1"]
+            assert "/fill" in results[0].input_message_content.message_text
+            assert await inline_results(db, "план") is results          # кэш по строке запроса
+
+            await repo.delete_meeting(db, 1)
+            [created] = await importer.import_questionnaires(
+                db, importer.validate([{"title": "План найма", "questions": []}]), created_by=1,
+            )
+            assert [r.id for r in await inline_results(db, "план")] == [str(m.id), str(created)]
+
+    asyncio.run(inner())
@@ -0,0 +1,78 @@
+import asyncio
+
+from loguru import logger
+from telegram import Update
+
+from bot.app import metrics
+from bot.app.bot import build_app
+from bot.app.config import settings
+from bot.app.db import SessionLocal
+from bot.app.localapi import LocalTelegramRequest
+from bot.app import repo
+
+
+def _update(i, text, chat_id=4242):
+    return {"update_id": i, "message": {
+        "message_id": i, "date": 0, "text": text,
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "M"},
+        "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+    }}
+
+
+def test_handlers_record_latency_sql_and_errors(monkeypatch):
+    metrics.reset()
+    slow = []
+    sink = logger.add(lambda m: slow.append(str(m)), level="WARNING")
+    monkeypatch.setattr(settings, "SLOW_REQUEST_MS", 0)
+
+    async def inner():
+        async with SessionLocal() as db:
+            admin = await repo.authenticate_user(db, "admin", "admin123")
+            await repo.set_active_session(db, 4242, admin.id)
+        app = build_app(request=LocalTelegramRequest())
+        app.add_error_handler(lambda u, c: asyncio.sleep(0))
+        await app.initialize()
+        for i, text in enumerate(["/meetings", "/questions 1", "/questions x"], start=1):
+            await app.process_update(Update.de_json(_update(i, text), app.bot))
+        await app.shutdown()
+
+    try:
+        asyncio.run(inner())
+    finally:
+        logger.remove(sink)
+
+    st = metrics.handler_stats()
+    assert st["/meetings"].count == 1 and st["/meetings"].statements >= 1
+    assert st["/questions"].count == 2 and st["/questions"].errors == 1  # int("x")
+    assert any("Slow request /meetings" in m and "SELECT" in m for m in slow)
+
+    text = metrics.render_prometheus()
+    assert 'bot_handler_latency_seconds_bucket{handler="/questions",le="+Inf"} 2' in text
+    assert 'bot_handler_latency_seconds_count{handler="/meetings"} 1' in text
+    assert 'bot_handler_errors_total{handler="/questions"} 1' in text
+    assert "# TYPE bot_update_queue_size gauge" in text
+
+
+def test_query_profile_flags_repeated_statements(monkeypatch):
+    from bot.app import querylog
+
+    assert querylog.fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'x'") == \
+        querylog.fingerprint("SELECT *  FROM t WHERE id IN (7) AND name = 'it''s'")
+    assert querylog.fingerprint("INSERT INTO t (a) VALUES (?), (?), (?)") == "INSERT INTO t (a) VALUES (?)"
+
+    warnings = []
+    sink = logger.add(lambda m: warnings.append(str(m)), level="WARNING")
+    monkeypatch.setattr(settings, "QUERY_PROFILE", "prod")
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 3)
+
+    async def n_plus_one(update, context):
+        async with SessionLocal() as db:
+            for meeting_id in (1, 2, 1):
+                await repo.list_questions(db, meeting_id)
+
+    try:
+        asyncio.run(metrics.timed("n_plus_one", n_plus_one)(None, None))
+    finally:
+        logger.remove(sink)
+    assert any("N+1 candidate in n_plus_one" in m and "FROM questions" in m for m in warnings)
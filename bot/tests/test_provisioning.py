@@ -0,0 +1,38 @@
+import asyncio
+import csv
+import io
+
+from bot.app import provisioning, repo
+from bot.app.config import settings
+from bot.app.db import SessionLocal
+
+
+def test_provision_streams_batches_and_reports_conflicts(monkeypatch):
+    monkeypatch.setattr(settings, "PROVISION_BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr(settings, "PROVISION_WORKERS", 2)
+    src = io.StringIO(
+        "username,fio,email,role,password\n"
+        "ivanov,Иванов И.,ivanov@example.com,Модератор,\n"
+        "petrov,Петров П.,,участник,secret1\n"
+        "admin,Дубль,,,\n"                       # уже есть в базе
+        "petrov,Дубль из файла,,,\n"
+        "sidorov,,not-an-email,,\n"
+        "kuznetsov,,,Нет такой,\n"
+        "smirnov,,,3,\n"
+    )
+    creds = io.StringIO()
+
+    async def inner():
+        report = await provisioning.provision_users(src, credentials=creds, batch_size=2)
+        assert (report.created, report.conflicts, report.errors) == (3, 2, 2)
+        assert "строка 4: admin уже существует" in report.problems
+        assert "строка 5: petrov уже существует" in report.problems   # вставлен предыдущей пачкой
+
+        rows = list(csv.DictReader(io.StringIO(creds.getvalue())))
+        assert [r["username"] for r in rows] == ["ivanov", "smirnov"] and report.generated == 2
+        async with SessionLocal() as db:
+            u = await repo.authenticate_user(db, "ivanov", rows[0]["password"])
+            assert u is not None and u.role.name == "Модератор" and u.email == "ivanov@example.com"
+            assert (await repo.authenticate_user(db, "petrov", "secret1")).role.name == "Участник"
+
+    asyncio.run(inner())
@@ -0,0 +1,117 @@
+import asyncio
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from bot.app import db as app_db
+from bot.app.db import SessionLocal
+from bot.app import repo
+
+# Таблицы-справочники, которые repo читает целиком намеренно (list_roles, list_meetings),
+# и broadcasts — list_broadcasts идёт по rowid с конца и останавливается на LIMIT
+ALLOWED_FULL_SCANS = {"roles", "meetings", "broadcasts"}
+
+# «SCAN t» / «SEARCH t USING INDEX …»; SQLite до 3.36 писал «SCAN TABLE t»
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+_ACCESS = re.compile(r"^(?:SCAN|SEARCH) (?:TABLE )?\w+")
+
+
+async def _capture(workload):
+    """Выполняет workload и возвращает все (sql, params) SELECT/UPDATE/DELETE-запросы."""
+    captured = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((statement, parameters))
+
+    event.listen(app_db.engine.sync_engine, "before_cursor_execute", before)
+    try:
+        await workload()
+    finally:
+        event.remove(app_db.engine.sync_engine, "before_cursor_execute", before)
+    return captured
+
+
+async def _full_scans(statements):
+    """Полные просмотры вне ALLOWED_FULL_SCANS и число распознанных обращений к таблицам в планах."""
+    bad = []
+    accesses = 0
+    async with app_db.engine.connect() as conn:
+        for sql, params in statements:
+            plan = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params)).all()
+            for row in plan:
+                accesses += bool(_ACCESS.match(row[-1]))
+                m = _SCAN.match(row[-1])
+                if m and m.group(1) not in ALLOWED_FULL_SCANS:
+                    bad.append(f"{row[-1]}: {' '.join(sql.split())}")
+    return bad, accesses
+
+
+def test_scan_pattern_accepts_both_plan_formats():
+    assert _SCAN.match("SCAN answers").group(1) == "answers"
+    assert _SCAN.match("SCAN TABLE answers AS a").group(1) == "answers"
+    assert not _SCAN.match("SCAN answers USING INDEX ix_answers_question_id")
+    assert _ACCESS.match("SEARCH TABLE answers USING INDEX ix_answers_question_id (question_id=?)")
+
+
+def test_repo_queries_use_indexes():
+    async def workload():
+        async with SessionLocal() as db:
+            u = await repo.authenticate_user(db, "user1", "user123")
+            await repo.set_active_session(db, 555, u.id)
+            await repo.get_active_user(db, 555)
+            await repo.list_roles(db)
+            r = await repo.create_role(db, "Временная")
+            await repo.rename_role(db, r.id, "Временная-2")
+            await repo.delete_role(db, r.id)
+            await repo.set_user_role(db, "user1", 3)
+            await repo.list_meetings(db)
+            await repo.list_meetings_page(db, 10, after_id=1, status="open")
+            await repo.list_meetings_page(db, 10, before_id=2, department="Разработка")
+            await repo.add_question(db, 1, "Новый вопрос")
+            await repo.list_questions(db, 1)
+            await repo.add_answer(db, u.id, 1, "ответ")
+            await repo.add_answers_batch(db, [(u.id, 2, "yes"), (1, 3, "ок")])
+            await repo.add_answers_batch(db, [(u.id, 1, "итог")], submit=True)
+            await repo.load_question_set(db, 1)
+            await repo.search(db, '"квартал"*', 10)
+            await repo.answer_value_counts(db, [1, 2])
+            await repo.answer_counts(db, [1])
+            await repo.response_status_counts(db, 1)
+            await repo.set_meeting_schedule(db, 1, deadline_at=datetime.utcnow())
+            await repo.list_scheduled_meetings(db)
+            await repo.get_meeting_schedule(db, 1)
+            await repo.transition_meeting(db, 1, ("scheduled", "open"), "closed")
+            await repo.set_meeting_status(db, 2, "closed")
+            await repo.delete_meeting(db, 2)
+            b = await repo.create_broadcast(db, "nudge", "t", repo.audience_non_responders(1), 1)
+            await repo.create_broadcast(db, "announce", "t", repo.audience_all(), 1)
+            rows = await repo.due_outbox(db, datetime.utcnow(), 10)
+            await repo.next_outbox_due(db)
+            await repo.mark_broadcasts_started(db, [b.id], datetime.utcnow())
+            await repo.save_outbox_results(db, [
+                {"id": r.id, "status": "sent", "attempts": 1, "next_attempt_at": None,
+                 "sent_at": datetime.utcnow(), "error": None} for r in rows
+            ])
+            await repo.broadcast_progress(db, b.id)
+            await repo.list_broadcasts(db)
+            await repo.logout(db, 555)
+            await repo.prune_sessions(db, timedelta(days=30))
+            await repo.save_fill_state(db, 555, 1, 0)
+            await repo.advance_fill_state(db, 555)
+            await repo.record_fill_answer(db, 555, 1, "ответ")
+            await repo.get_fill_state(db, 555)
+            await repo.get_fill_state_stamp(db, 555)
+            await repo.delete_fill_state(db, 555)
+            await repo.prune_fill_states(db, datetime.utcnow())
+
+    async def inner():
+        statements = await _capture(workload)
+        assert statements
+        bad, accesses = await _full_scans(statements)
+        # формат плана распознан — иначе проверка молча ничего не находила бы
+        assert accesses
+        assert not bad, "Полный просмотр таблицы:\n" + "\n".join(bad)
+
+    asyncio.run(inner())
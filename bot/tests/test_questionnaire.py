@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from bot.app.db import SessionLocal
+from bot.app.fsm import FillState, MemoryStateStore, SqliteStateStore
+from bot.app.models import QuestionType
+from bot.app.questionnaire import (
+    OptionView, QuestionView, get_question_set, keyboard, multi_value, parse_callback, validate,
+)
+from bot.app import repo
+
+OPTS = (OptionView("yes", "Да"), OptionView("no", "Нет"), OptionView("maybe", "Нужно обсудить"))
+
+
+def test_validate_by_question_type():
+    assert validate(QuestionView(1, "?", QuestionType.int, True), " 42 ") == "42"
+    assert validate(QuestionView(1, "?", QuestionType.bool, True), "Да") == "yes"
+    assert validate(QuestionView(1, "?", QuestionType.choice, True, OPTS), "нужно обсудить") == "maybe"
+    assert validate(QuestionView(1, "?", QuestionType.multi, True, OPTS), "maybe, yes") == "yes,maybe"
+    # choice без вариантов отвечается текстом
+    assert validate(QuestionView(1, "?", QuestionType.choice, True), "свободно") == "свободно"
+    for q, raw in [
+        (QuestionView(1, "?", QuestionType.int, True), "много"),
+        (QuestionView(1, "?", QuestionType.bool, True), "может быть"),
+        (QuestionView(1, "?", QuestionType.choice, True, OPTS), "другое"),
+        (QuestionView(1, "?", QuestionType.text, True), "   "),
+    ]:
+        with pytest.raises(ValueError):
+            validate(q, raw)
+
+
+def test_multi_keyboard_roundtrip():
+    q = QuestionView(7, "?", QuestionType.multi, False, OPTS)
+    kb = keyboard(q, 3, mask=0b001)
+    data = [b.callback_data for row in kb.inline_keyboard for b in row]
+    assert data == ["fill:m:3:0", "fill:m:3:3", "fill:m:3:5", "fill:d:3:1", "fill:s:3"]
+    assert all(len(d.encode()) <= 64 for d in data)
+    assert parse_callback("fill:d:3:5") == ("d", 3, 5)
+    assert parse_callback("fill:x:oops") is None
+    assert multi_value(q, 5) == "yes,maybe"
+
+
+def test_question_set_cached_until_meeting_changes():
+    async def inner():
+        async with SessionLocal() as db:
+            qs = await get_question_set(db, 1)
+            assert [q.type for q in qs.questions] == [QuestionType.text, QuestionType.choice]
+            assert [o.value for o in qs.questions[1].options] == ["yes", "no", "maybe"]
+            assert await get_question_set(db, 1) is qs       # из кэша
+
+            await repo.add_question(db, 1, "Ещё вопрос")
+            fresh = await get_question_set(db, 1)
+            assert fresh is not qs and len(fresh.questions) == 3
+
+            await repo.set_meeting_status(db, 1, "closed")
+            assert not (await get_question_set(db, 1)).is_open
+
+    asyncio.run(inner())
+
+
+def test_record_answer_in_both_stores():
+    async def inner():
+        for store in (MemoryStateStore(), SqliteStateStore()):
+            await store.set(7, FillState(meeting_id=1))
+            st = await store.record_answer(7, 1, "план")
+            st = await store.record_answer(7, 2, "yes")
+            assert st.current_q_idx == 2 and st.answers == {1: "план", 2: "yes"}
+
+        st = await SqliteStateStore().get(7)                 # после «перезапуска»
+        assert st.current_q_idx == 2 and st.answers == {1: "план", 2: "yes"}
+
+    asyncio.run(inner())
+
+
+def test_fill_only_in_private_chats():
+    from sqlalchemy import select
+    from telegram import Update
+    from bot.app.bot import FILL_PRIVATE_ONLY, build_app
+    from bot.app.localapi import LocalTelegramRequest
+    from bot.app.models import Answer, Response
+
+    def message(i, sender, chat, text):
+        chat_type = "private" if chat > 0 else "group"
+        msg = {"message_id": i, "date": 0, "text": text, "chat": {"id": chat, "type": chat_type},
+               "from": {"id": sender, "is_bot": False, "first_name": str(sender)}}
+        if text.startswith("/"):
+            msg["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": i, "message": msg}
+
+    async def inner():
+        async with SessionLocal() as db:
+            await repo.set_active_session(db, 777, 1)   # admin
+            await repo.set_active_session(db, 778, 3)   # user1
+        api = LocalTelegramRequest()
+        app = build_app(request=api)
+        await app.initialize()
+        # в группе: анкета не начинается, чужой текст ответом не становится
+        steps = [(777, -100, "/fill 2"), (778, -100, "ответ из группы"), (777, -100, "ещё текст"),
+                 # в личных чатах — у каждого своя анкета, сообщения вперемешку
+                 (777, 777, "/fill 2"), (778, 778, "/fill 2"), (778, 778, "ответ user1"),
+                 (777, 777, "ответ admin")]
+        for i, (sender, chat, text) in enumerate(steps, start=1):
+            await app.process_update(Update.de_json(message(i, sender, chat, text), app.bot))
+        await app.process_update(Update.de_json({"update_id": 99, "callback_query": {
+            "id": "1", "chat_instance": "g", "data": "fill:c:0:0",
+            "from": {"id": 778, "is_bot": False, "first_name": "778"},
+            "message": {"message_id": 1, "date": 0, "chat": {"id": -100, "type": "group"}},
+        }}, app.bot))
+        await app.shutdown()
+
+        # в группу — только отказ и обычный ответ на текст, вопросов анкеты нет
+        assert {t for chat, t in api.sent if chat == -100} == {
+            FILL_PRIVATE_ONLY, "Неизвестная команда. Используйте /help."}
+        assert api.calls["answerCallbackQuery"] == 1
+        async with SessionLocal() as db:
+            rows = (await db.execute(
+                select(Response.user_id, Answer.value).join(Answer, Answer.response_id == Response.id)
+                .where(Response.meeting_id == 2).order_by(Response.user_id)
+            )).all()
+        assert [tuple(r) for r in rows] == [(1, "ответ admin"), (3, "ответ user1")]
+
+    asyncio.run(inner())
@@ -1,7 +1,6 @@
 import asyncio
 from sqlalchemy import select
 
-from bot.reset_and_check_db import reset_db
 from bot.app.db import SessionLocal
 from bot.app import repo
 from bot.app.models import Role
@@ -9,8 +8,6 @@ from bot.app.models import Role
 
 
 def test_repo_auth_and_roles():
-    reset_db()
-
     async def inner():
         async with SessionLocal() as db:
             # роли уже есть
@@ -8,8 +8,8 @@ from bot.app.models import Role, User
 
 
 
-def test_reset_and_models():
-    reset_db()
+def test_reset_and_models(test_db):
+    reset_db(test_db)  # движок теста ещё не открывал соединений — подхватит новый файл
 
     async def inner():
         async with SessionLocal() as session:
@@ -0,0 +1,55 @@
+import asyncio
+import statistics
+
+import pytest
+
+from bot.app.db import SessionLocal
+from bot.app.models import Question, QuestionType
+from bot.app import repo, results
+
+
+def _linear_percentile(values, p):
+    values = sorted(values)
+    r = p / 100 * (len(values) - 1)
+    lo, hi = int(r), min(int(r) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (r - lo)
+
+
+def test_numeric_summary_matches_expanded_values():
+    counts = {1: 3, 4: 1, 7: 5, 20: 2}
+    values = [k for k, c in counts.items() for _ in range(c)]
+    s = results.numeric_summary(counts, 4)
+    assert s.count == len(values) and s.min == 1 and s.max == 20
+    assert s.mean == pytest.approx(statistics.mean(values))
+    assert s.median == pytest.approx(statistics.median(values))
+    for p in results.PERCENTILES:
+        assert s.percentiles[p] == pytest.approx(_linear_percentile(values, p))
+    assert sum(c for _, _, c in s.histogram) == len(values)
+
+
+def test_results_update_incrementally():
+    async def inner():
+        async with SessionLocal() as db:
+            db.add(Question(meeting_id=1, text="Оценка", order_idx=3, type=QuestionType.int))
+            await db.commit()
+            u1 = await repo.authenticate_user(db, "user1", "user123")
+
+            res = await results.get_results(db, 1)
+            assert res.total_responses == 0
+            qid_int = max(res.questions)
+
+            await repo.add_answers_batch(db, [(u1.id, 2, "yes"), (u1.id, qid_int, "4")], submit=True)
+            await repo.add_answer(db, 1, 2, "maybe")
+            await repo.add_answer(db, 1, qid_int, "10")
+            await repo.add_answer(db, 1, qid_int, "6")         # повторный ответ заменяет "10"
+
+            cached = await results.get_results(db, 1)
+            assert cached is res                                  # тот же объект, обновлён на месте
+            fresh = await results.compute(db, res.qs)
+            assert res.responses == fresh.responses == {"submitted": 1, "draft": 1}
+            for qid, q in fresh.questions.items():
+                assert (res.questions[qid].answered, res.questions[qid].counts) == (q.answered, q.counts)
+            assert res.questions[qid_int].summary().mean == 5
+            assert "Нужно обсудить: 1 (50%)" in "\n".join(results.render(res))
+
+    asyncio.run(inner())
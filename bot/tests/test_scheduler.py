@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bot.app.db import SessionLocal
+from bot.app.scheduler import CLOSE, OPEN, REMIND, DeadlineScheduler
+from bot.app import repo
+
+
+def test_meeting_opens_reminds_and_closes_on_time():
+    async def inner():
+        events = []
+
+        async def notifier(kind, meeting_id):
+            events.append((kind, meeting_id))
+
+        # время планировщика двигает тест: цикл не запускается, шаги — tick()
+        base = datetime.utcnow()
+        now = [base]
+        sched = DeadlineScheduler(notifier=notifier, remind_before=timedelta(minutes=30), clock=lambda: now[0])
+        async with SessionLocal() as db:
+            m = await repo.create_meeting(db, "Авто", "", "", "", None, 1)
+            await repo.set_meeting_schedule(
+                db, m.id, opens_at=base + timedelta(hours=1), deadline_at=base + timedelta(hours=5),
+            )
+        await sched.load()
+        assert [e.kind for e in sorted(sched._heap) if e.meeting_id == m.id] == [OPEN, REMIND, CLOSE]
+
+        # встречи из init.sql с прошедшими дедлайнами закрываются на первом шаге
+        await sched.tick()
+        assert (CLOSE, 1) in events and (CLOSE, 2) in events
+        assert not [e for e in events if e[1] == m.id]
+
+        now[0] = base + timedelta(hours=1)
+        await sched.tick()
+        # перенос дедлайна — таймеры встречи перевзводятся, старые события устаревают
+        async with SessionLocal() as db:
+            await repo.set_meeting_schedule(db, m.id, deadline_at=base + timedelta(hours=2))
+        await sched.rearm(m.id)
+        now[0] = base + timedelta(hours=1, minutes=30)
+        await sched.tick()
+        now[0] = base + timedelta(hours=2)
+        await sched.tick()
+        now[0] = base + timedelta(hours=6)
+        await sched.tick()
+
+        assert [e for e in events if e[1] == m.id] == [(OPEN, m.id), (REMIND, m.id), (CLOSE, m.id)]
+        async with SessionLocal() as db:
+            row = await repo.get_meeting_schedule(db, m.id)
+        assert row.status.value == "closed"
+        assert sched.stale >= 1  # события со старым дедлайном отброшены
+        assert len(sched) == 0
+
+    asyncio.run(inner())
+
+
+def test_manual_status_change_wins():
+    async def inner():
+        async with SessionLocal() as db:
+            m = await repo.create_meeting(db, "Ручная", "", "", "", None, 1)
+            await repo.set_meeting_schedule(db, m.id, opens_at=datetime.utcnow() - timedelta(seconds=1))
+            await repo.set_meeting_status(db, m.id, "closed")
+            # открытие по расписанию не трогает уже закрытую встречу
+            assert not await repo.transition_meeting(db, m.id, ("scheduled",), "open")
+
+    asyncio.run(inner())
+
+
+class _Message:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def _schedule(telegram_id, *args):
+    from bot.app.bot import schedule_cmd
+
+    msg = _Message()
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=telegram_id), message=msg)
+    asyncio.run(schedule_cmd(update, SimpleNamespace(args=list(args))))
+    return msg.replies
+
+
+def test_schedule_leaves_open_and_closed_meetings_alone():
+    async def setup():
+        async with SessionLocal() as db:
+            await repo.set_active_session(db, 777, 1)  # admin
+            ids = {}
+            for status in ("open", "closed", "draft"):
+                m = await repo.create_meeting(db, status, "", "", "", None, 1)
+                await repo.set_meeting_status(db, m.id, status)
+                ids[status] = m.id
+            return ids
+
+    ids = asyncio.run(setup())
+    when = (datetime.utcnow() + timedelta(days=1)).strftime("%Y-%m-%d")
+    for status in ("open", "closed"):
+        [reply] = _schedule(777, str(ids[status]), when)
+        assert reply.startswith("❌")
+    [reply] = _schedule(777, str(ids["draft"]), when)
+    assert reply.startswith("🗓")
+
+    async def statuses():
+        async with SessionLocal() as db:
+            return {s: (await repo.get_meeting_schedule(db, mid)) for s, mid in ids.items()}
+
+    rows = asyncio.run(statuses())
+    assert rows["open"].status.value == "open" and rows["open"].opens_at is None
+    assert rows["closed"].status.value == "closed" and rows["closed"].opens_at is None
+    assert rows["draft"].status.value == "scheduled"
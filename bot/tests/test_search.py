@@ -0,0 +1,113 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine
+
+from bot.app.db import SessionLocal
+from bot.app.migrations import run_migrations
+from bot.app import repo, search
+
+
+def test_match_expression_and_snippet():
+    assert search.build_match("Что улучшить?") == '"что"* "улучшить"*'
+    assert search.build_match('ёлка OR "x" NEAR') == '"елка"* "or"* "x" "near"*'
+    words = search.terms("улучш")
+    s = search.snippet("Надо <срочно> улучшить процессы", words, width=200)
+    assert s == "Надо &lt;срочно&gt; <b>улучшить</b> процессы"
+    long = "слово " * 50 + "Ёлка в конце"
+    assert "<b>Ёлка</b>" in search.snippet(long, search.terms("елк"), width=40)
+
+
+def test_index_follows_answers_and_meetings(monkeypatch):
+    monkeypatch.setattr(search.settings, "SEARCH_PAGE_SIZE", 2)
+
+    async def inner():
+        async with SessionLocal() as db:
+            await repo.add_answers_batch(db, [(1, 3, "Улучшить ревью кода"), (2, 3, "Ещё улучшение тестов"),
+                                              (3, 1, "улучшить планирование")])
+            first = await search.get_page(db, "улучш")
+            assert first.text.count("💬") == 2 and first.markup is not None
+            second = await search.get_page(db, "улучш", 1)
+            assert second.text.count("💬") == 1 and "стр. 2" in second.text
+
+            assert "💬" in (await search.get_page(db, "еще")).text         # «ё» в ответе
+            await repo.add_answer(db, 1, 3, "Всё устраивает")              # upsert заменяет ответ в индексе
+            assert len(await repo.search(db, search.build_match("ревью"), 10)) == 0
+            assert len(await repo.search(db, search.build_match("устраивает"), 10)) == 1
+
+            rows = await repo.search(db, search.build_match("ретроспектива"), 10)
+            assert [(r.kind, r.meeting_id) for r in rows] == [("meeting", 2)]
+            await repo.delete_meeting(db, 2)                                # каскад чистит индексы
+            assert await repo.search(db, search.build_match("ретроспектива улучш"), 10) == []
+            assert len(await repo.search(db, search.build_match("улучш"), 10)) == 1
+
+    asyncio.run(inner())
+
+
+def test_migration_builds_index_for_existing_rows(test_db):
+    con = sqlite3.connect(test_db)
+    # база до поиска: ни индексов, ни триггеров
+    for fts in ("meetings_fts", "questions_fts", "answers_fts"):
+        con.execute(f"DROP TABLE {fts}")
+        for suffix in ("ai", "ad", "au"):
+            con.execute(f"DROP TRIGGER {fts}_{suffix}")
+    con.execute("INSERT INTO responses (id, meeting_id, user_id, status) VALUES (50, 2, 1, 'draft')")
+    con.execute("INSERT INTO answers (response_id, question_id, value) VALUES (50, 3, 'Стендапы слишком длинные')")
+    con.commit()
+    con.close()
+
+    engine = create_engine(f"sqlite:///{test_db}")
+    with engine.begin() as conn:
+        run_migrations(conn)
+    engine.dispose()
+
+    async def inner():
+        async with SessionLocal() as db:
+            assert [r.kind for r in await repo.search(db, search.build_match("стендап"), 10)] == ["answer"]
+            assert {r.kind for r in await repo.search(db, search.build_match("квартал"), 10)} == {"question", "meeting"}
+
+    asyncio.run(inner())
+
+
+def test_search_handlers_without_fts5_or_role(test_db):
+    from bot.app.bot import search_callback, search_cmd
+    from bot.app.cache import identity_cache
+
+    con = sqlite3.connect(test_db)
+    # сборка SQLite без FTS5: миграция индексы не создала
+    for fts in ("meetings_fts", "questions_fts", "answers_fts"):
+        con.execute(f"DROP TABLE {fts}")
+        for suffix in ("ai", "ad", "au"):
+            con.execute(f"DROP TRIGGER {fts}_{suffix}")
+    con.commit()
+    con.close()
+
+    replies, alerts = [], []
+
+    async def reply_text(text, **kwargs):
+        replies.append(text)
+
+    async def answer(text=None, **kwargs):
+        alerts.append(text)
+
+    def callback(telegram_id):
+        data = f"sr:{search.query_token('план')}:0"
+        return SimpleNamespace(effective_user=SimpleNamespace(id=telegram_id),
+                               callback_query=SimpleNamespace(data=data, answer=answer))
+
+    async def inner():
+        async with SessionLocal() as db:
+            await repo.set_active_session(db, 777, 1)      # администратор
+        identity_cache.set(778, SimpleNamespace(id=3, role=None))   # пользователь без роли
+        await search_cmd(SimpleNamespace(effective_user=SimpleNamespace(id=777),
+                                         message=SimpleNamespace(reply_text=reply_text)),
+                         SimpleNamespace(args=["план"]))
+        await search_callback(callback(777), None)
+        await search_callback(callback(778), None)
+        await search_callback(callback(779), None)         # не авторизован
+
+    asyncio.run(inner())
+    assert replies == ["❌ Полнотекстовый поиск недоступен: SQLite собран без FTS5."]
+    assert alerts == ["❌ Полнотекстовый поиск недоступен: SQLite собран без FTS5.",
+                      "⛔ Недостаточно прав.", "⛔ Недостаточно прав."]
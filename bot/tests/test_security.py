@@ -0,0 +1,52 @@
+import asyncio
+
+from sqlalchemy import select
+
+from bot.app.db import SessionLocal
+from bot.app import repo, security
+from bot.app.models import User
+
+
+def test_legacy_plaintext_is_rehashed_on_login():
+    async def inner():
+        async with SessionLocal() as db:
+            # в init.sql пароли лежат открытым текстом
+            assert await repo.authenticate_user(db, "user1", "wrong") is None
+            u = await repo.authenticate_user(db, "user1", "user123")
+            assert u is not None
+
+            stored = (await db.execute(select(User.password_hash).where(User.username == "user1"))).scalar_one()
+            assert security.is_hashed(stored)
+            assert await repo.authenticate_user(db, "user1", "user123") is not None
+            assert await repo.authenticate_user(db, "user1", "wrong") is None
+
+    asyncio.run(inner())
+
+
+def test_login_rate_limiter():
+    limiter = security.LoginRateLimiter(max_attempts=2, window=60)
+    assert limiter.allow(1) and limiter.allow(1)
+    assert not limiter.allow(1)
+    assert limiter.allow(2)
+    assert limiter.retry_after(1) > 0
+    limiter.reset(1)
+    assert limiter.allow(1)
+
+
+def test_unknown_login_costs_a_bcrypt_verify(monkeypatch):
+    checked = []
+    real_verify = repo.verify_password
+
+    async def counting_verify(password, stored):
+        checked.append(stored)
+        return await real_verify(password, stored)
+
+    monkeypatch.setattr(repo, "verify_password", counting_verify)
+
+    async def inner():
+        async with SessionLocal() as db:
+            assert await repo.authenticate_user(db, "nobody", "secret") is None
+            assert await repo.authenticate_user(db, "nobody2", "secret") is None
+
+    asyncio.run(inner())
+    assert len(checked) == 2 and checked[0] == checked[1] and security.is_hashed(checked[0])
@@ -0,0 +1,32 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, update
+
+from bot.app.db import SessionLocal
+from bot.app import repo
+from bot.app.models import TgSession
+
+
+def test_sessions_upsert_expiry_and_prune():
+    async def inner():
+        async with SessionLocal() as db:
+            for user_id in (1, 2, 3, 3):
+                s = await repo.set_active_session(db, 777, user_id)
+            assert s.is_active and s.user_id == 3
+            count = (await db.execute(select(func.count()).select_from(TgSession))).scalar_one()
+            assert count == 1
+            assert (await repo.get_active_user(db, 777)).id == 3
+
+            # истёкшая сессия не даёт входа
+            await db.execute(update(TgSession).values(expires_at=datetime.utcnow() - timedelta(minutes=1)))
+            await db.commit()
+            assert await repo.get_active_user(db, 777) is None
+
+            # свежий выход ещё хранится, старый — удаляется
+            await repo.set_active_session(db, 888, 1)
+            await repo.logout(db, 888)
+            assert await repo.prune_sessions(db, timedelta(days=1)) == 0
+            assert await repo.prune_sessions(db, timedelta(0)) == 2
+
+    asyncio.run(inner())
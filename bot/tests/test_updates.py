@@ -0,0 +1,75 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.app.updates import ChatOrderedUpdateProcessor
+
+
+def _update(chat_id, text="привет"):
+    return SimpleNamespace(
+        effective_chat=SimpleNamespace(id=chat_id),
+        effective_user=SimpleNamespace(id=chat_id),
+        effective_message=SimpleNamespace(text=text),
+    )
+
+
+def test_same_chat_in_order_other_chats_in_parallel():
+    async def inner():
+        proc = ChatOrderedUpdateProcessor(max_concurrent=4, heavy_concurrent=1, max_pending=100,
+                                          heavy_commands=frozenset())
+        await proc.initialize()
+        log = []
+        active = {"now": 0, "peak": 0}
+
+        async def handle(chat, n, delay):
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(delay)
+            log.append((chat, n))
+            active["now"] -= 1
+
+        # первый ответ чата 1 обрабатывается дольше второго — порядок всё равно сохраняется
+        jobs = [
+            proc.process_update(_update(1), handle(1, 1, 0.05)),
+            proc.process_update(_update(1), handle(1, 2, 0.0)),
+            proc.process_update(_update(2), handle(2, 1, 0.01)),
+            proc.process_update(_update(3), handle(3, 1, 0.01)),
+        ]
+        await asyncio.gather(*jobs)
+        assert [n for c, n in log if c == 1] == [1, 2]
+        assert active["peak"] == 3  # чаты 1, 2, 3 одновременно, второй апдейт чата 1 ждёт
+        st = proc.stats()
+        assert st["processed"] == 4 and st["queued"] == 0 and st["chats"] == 0
+        assert st["max_queued"] >= 1 and st["wait_max_ms"] >= 40
+
+    asyncio.run(inner())
+
+
+def test_heavy_lane_is_bounded_and_does_not_block_default():
+    async def inner():
+        proc = ChatOrderedUpdateProcessor(max_concurrent=2, heavy_concurrent=1, max_pending=100,
+                                          heavy_commands=frozenset({"exportjson"}))
+        await proc.initialize()
+        assert proc.lane_of(_update(1, "/exportjson@bot ndjson")) == "heavy"
+        assert proc.lane_of(_update(1, "/meetings")) == "default"
+        release = asyncio.Event()
+        seen = []
+
+        async def heavy(n):
+            seen.append(("heavy", n, proc.stats()["heavy_running"]))
+            await release.wait()
+
+        async def light():
+            seen.append(("light", proc.stats()["running"]))
+
+        tasks = [asyncio.create_task(proc.process_update(_update(c, "/exportjson"), heavy(c)))
+                 for c in (1, 2)]
+        await asyncio.sleep(0.01)
+        await proc.process_update(_update(3, "/meetings"), light())
+        # вторая выгрузка ждёт слота тяжёлой полосы, обычная команда прошла сразу
+        assert seen == [("heavy", 1, 1), ("light", 1)]
+        assert proc.stats()["queued"] == 1
+        release.set()
+        await asyncio.gather(*tasks)
+        assert seen[-1] == ("heavy", 2, 1)
+
+    asyncio.run(inner())
@@ -0,0 +1,76 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from bot.app.bot import build_app
+from bot.app.localapi import LocalTelegramRequest
+from bot.app.webhook import SECRET_HEADER, WebhookServer, serve
+
+
+async def _request(port, method, path, body=None, headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\nContent-Length: {len(payload)}\r\n"
+    head += "".join(f"{k}: {v}\r\n" for k, v in (headers or {}).items())
+    writer.write(head.encode() + b"\r\n" + payload)
+    raw = await reader.read()
+    writer.close()
+    status = int(raw.split(b" ", 2)[1])
+    return status, raw.split(b"\r\n\r\n", 1)[1]
+
+
+def _message(update_id, text, chat_id=555):
+    return {"update_id": update_id, "message": {
+        "message_id": update_id, "date": 0, "text": text,
+        "chat": {"id": chat_id, "type": "private"},
+        "from": {"id": chat_id, "is_bot": False, "first_name": "T"},
+        "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        if text.startswith("/") else [],
+    }}
+
+
+def test_secret_dedup_and_drain():
+    async def inner():
+        app = SimpleNamespace(update_queue=asyncio.Queue(), bot=None, running=True)
+        srv = WebhookServer(app, path="/tg", secret="s3cret")
+        _, port = await srv.start("127.0.0.1", 0)
+        ok = {SECRET_HEADER: "s3cret"}
+        assert (await _request(port, "POST", "/tg", _message(1, "hi")))[0] == 403
+        assert (await _request(port, "POST", "/tg", _message(1, "hi"), ok))[0] == 200
+        assert (await _request(port, "POST", "/tg", _message(1, "hi"), ok))[0] == 200  # повтор
+        assert (await _request(port, "POST", "/tg", {"x": 1}, ok))[0] == 400
+        assert app.update_queue.qsize() == 1
+        status, body = await _request(port, "GET", "/healthz")
+        assert status == 200 and json.loads(body)["duplicates"] == 1
+        status, body = await _request(port, "GET", "/metrics")
+        assert status == 200 and b"# TYPE bot_handler_latency_seconds histogram" in body
+
+        app.update_queue.get_nowait()
+        app.update_queue.task_done()
+        srv.draining = True
+        assert (await _request(port, "POST", "/tg", _message(2, "hi"), ok))[0] == 503
+        assert (await _request(port, "GET", "/readyz"))[0] == 503
+        assert await srv.drain(timeout=1)
+
+    asyncio.run(inner())
+
+
+def test_serve_processes_updates_through_local_api():
+    async def inner():
+        api = LocalTelegramRequest()
+        app = build_app(request=api)
+        app.post_init = app.post_shutdown = None  # без фоновых задач и БД
+        server = WebhookServer(app)
+        stop = asyncio.Event()
+        task = asyncio.create_task(serve(app, stop, host="127.0.0.1", port=0, server=server))
+        while not app.running:
+            await asyncio.sleep(0.01)
+        port = server.address[1]
+        for i in range(1, 6):
+            assert (await _request(port, "POST", "/telegram", _message(i, "/start", chat_id=i)))[0] == 200
+        stop.set()
+        await task  # drain: все принятые апдейты обработаны до остановки
+        assert api.calls["sendMessage"] == 5
+        assert {c for c, _ in api.sent} == {1, 2, 3, 4, 5}
+
+    asyncio.run(inner())
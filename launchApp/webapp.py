@@ -1,16 +1,55 @@
-from flask import Flask
+import json
+import os
+import urllib.error
+import urllib.request
+
+from flask import Flask, Response
 
 # Создаём Flask-приложение
 app = Flask(__name__)
 
+# Встроенный HTTP-сервер бота (webhook-режим или STATUS_SERVER=1, bot/app/webhook.py)
+BOT_HEALTH_URL = os.getenv("BOT_HEALTH_URL", f"http://127.0.0.1:{os.getenv('WEBHOOK_PORT', '8080')}")
+
+
 @app.route("/")
 def index():
     return "🤖 Bot WebApp is running!"
 
+
 @app.route("/ping")
 def ping():
     return "pong"
 
+
+def _bot_probe(path: str) -> Response:
+    # проксируем проверку в процесс бота; бот недоступен — 503
+    try:
+        with urllib.request.urlopen(BOT_HEALTH_URL + path, timeout=2) as r:
+            return Response(r.read(), status=r.status, content_type=r.headers.get("Content-Type"))
+    except urllib.error.HTTPError as e:
+        return Response(e.read(), status=e.code, content_type=e.headers.get("Content-Type"))
+    except (urllib.error.URLError, OSError) as e:
+        body = json.dumps({"status": "down", "error": str(e)}, ensure_ascii=False)
+        return Response(body, status=503, mimetype="application/json")
+
+
+@app.route("/healthz")
+def healthz():
+    return _bot_probe("/healthz")
+
+
+@app.route("/readyz")
+def readyz():
+    return _bot_probe("/readyz")
+
+
+@app.route("/metrics")
+def metrics():
+    # метрики обработчиков в текстовом формате Prometheus
+    return _bot_probe("/metrics")
+
+
 # Локальный запуск
 if __name__ == "__main__":
     # локально можно зайти на http://127.0.0.1:5000/
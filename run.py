@@ -1,11 +1,11 @@
 # run.py
-from bot.app.bot import build_app
+from bot.app.bot import build_app, start
 
 
 def main():
     app = build_app()
     print("🤖 Bot is running... Press Ctrl+C to stop.")
-    app.run_polling()
+    start(app)
 
 
 if __name__ == "__main__":